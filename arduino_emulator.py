@@ -0,0 +1,553 @@
+"""Emulador del protocolo serial de version_arduino.ino, para probar y medir el envío sin hardware.
+
+FirmwareEmulado corre setup() y loop() del sketch en un hilo y escribe las mismas líneas de log: el
+banner de arranque (con la ejecución automática de lo guardado), secuencias sueltas con RLE, !S con
+el guardado en EEPROM y su límite MAX_COMMAND_LENGTH, !E, !C y el streaming !T con créditos. La
+EEPROM es un bytearray con el mismo formato (flag 'V', longitud y la cadena) que sobrevive a
+reiniciar(), y el buffer de recepción de 64 bytes pierde lo que llega mientras el robot se mueve,
+como en el AVR. Los delay() se multiplican por `escala_tiempo` (1.0 = tiempo real, 0.001 = mil
+veces más rápido, 0 = sin esperas) y `tiempo_simulado_ms` acumula lo que habría tardado el robot.
+No se modela el tiempo de transmisión a 9600 baudios.
+
+Dos transportes:
+  - PuertoEmulado: en el mismo proceso, con la parte de la interfaz de serial.Serial que usa
+    path_sender (write, readline con timeout, in_waiting, isOpen, close).
+  - EmuladorPty: detrás de un pseudo-terminal (solo POSIX), para abrirlo con pyserial o
+    path_sender.abrir_conexion como un Arduino real.
+
+Uso desde la línea de comandos:
+    python arduino_emulator.py --pty --escala 0.01           # deja un Arduino falso en /dev/pts/N
+    python arduino_emulator.py --benchmark --escala 0.001    # latencia y throughput de path_sender
+    python arduino_emulator.py --benchmark -o envio.json     # lo mismo, guardado como JSON
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+from laberinth_algorithms import MODELO_MOVIMIENTO, MAX_LONGITUD_EEPROM
+
+# --- Constantes de version_arduino.ino ---
+MAX_COMMAND_LENGTH = MAX_LONGITUD_EEPROM
+EEPROM_ADDR_FLAG = 0
+EEPROM_ADDR_LENGTH = 1
+EEPROM_ADDR_STRING_START = 2
+FLAG_VALIDO = ord('V')
+TAMANO_EEPROM = 1024             # ATmega328P (Uno, Nano); una EEPROM sin estrenar tiene 0xFF en todas las celdas
+TAMANO_BUFFER_STREAM = 32
+LOTE_CREDITOS = 8
+RETRASO_INICIO_S = 5             # Espera antes de ejecutar al arranque lo que hay en la EEPROM
+TAMANO_BUFFER_SERIAL = 64        # Buffer de recepción del AVR: guarda 63 bytes, el resto se pierde
+TIMEOUT_SERIAL_S = 1.0           # Timeout de readStringUntil; no se escala porque no se modela la transmisión
+
+LINEAS_BANNER = (
+    "-------------------------------------",
+    "Sistema de Carrito con EEPROM Iniciado",
+    "Comandos disponibles por Serial:",
+    "  'secuencia' (ej: FFRFLF o F2RFLF) -> Ejecutar",
+    "  '!Ssecuencia' (ej: !SF2RFLF) -> GUARDAR y ejecutar",
+    "  '!E' -> Ejecutar desde EEPROM",
+    "  '!C' -> Borrar EEPROM",
+    "  '!T' -> Modo streaming (fragmentos '>FFRF', fin con '.')",
+    "-------------------------------------",
+)
+# Las etiquetas de giro están cruzadas en el sketch (girarDerecha imprime "Izquierda"); se copian tal cual
+LINEA_MOVIMIENTO = {'F': "Moviendo Adelante", 'R': "Girando Izquierda (sobre eje)", 'L': "Girando Derecha (sobre eje)"}
+DURACION_MOVIMIENTO = {'F': 'avance_ms', 'R': 'giro_ms', 'L': 'giro_ms'}
+
+
+class _Apagado(Exception):
+    """Corta el hilo del firmware desde dentro de una espera."""
+
+
+class FirmwareEmulado:
+    """El sketch corriendo en un hilo. `recibir(datos)` es lo que llega por el cable y `salida(bytes)`
+    se llama con cada línea que imprime (terminada en \\r\\n, como println). `modelo` cambia los tiempos
+    de MODELO_MOVIMIENTO. Contadores para las pruebas: `tiempo_simulado_ms`, `comandos_ejecutados`,
+    `bytes_descartados` (desbordes del buffer de recepción) y `escrituras_eeprom`."""
+
+    def __init__(self, salida, escala_tiempo=1.0, eeprom=None, modelo=None, arrancar=True):
+        self._salida = salida
+        self.escala_tiempo = escala_tiempo
+        self.modelo = {**MODELO_MOVIMIENTO, **(modelo or {})}
+        self.eeprom = bytearray(eeprom) if eeprom is not None else bytearray(b"\xff" * TAMANO_EEPROM)
+        self.tiempo_simulado_ms = 0
+        self.comandos_ejecutados = 0
+        self.bytes_descartados = 0
+        self.escrituras_eeprom = 0
+        self._rx = bytearray()
+        self._condicion = threading.Condition()
+        self._moviendo = False # Dentro de un delay(): lo que no cabe en el buffer de recepción se pierde
+        self._apagado = threading.Event()
+        self._hilo = None
+        if arrancar: self.arrancar()
+
+    # --- Ciclo de vida ---
+    def arrancar(self):
+        """Enciende el Arduino: estado de RAM limpio, setup() y luego loop() hasta detener()."""
+        self._apagado.clear()
+        with self._condicion:
+            self._rx.clear()
+        self._modo_stream = False
+        self._hilo = threading.Thread(target=self._principal, name="firmware emulado", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._apagado.set()
+        with self._condicion:
+            self._condicion.notify_all()
+        if self._hilo is not None and self._hilo is not threading.current_thread():
+            self._hilo.join()
+        self._hilo = None
+
+    def reiniciar(self):
+        """Como el reset al abrir el puerto: se pierde la RAM y se conserva la EEPROM."""
+        self.detener()
+        self.arrancar()
+
+    def _principal(self):
+        try:
+            self._setup()
+            while True:
+                self._loop()
+        except _Apagado:
+            pass
+
+    # --- Serial ---
+    def recibir(self, datos):
+        with self._condicion:
+            if self._moviendo:
+                espacio = max(0, TAMANO_BUFFER_SERIAL - 1 - len(self._rx))
+                self.bytes_descartados += max(0, len(datos) - espacio)
+                datos = datos[:espacio]
+            self._rx += datos
+            self._condicion.notify_all()
+
+    def _println(self, texto):
+        self._salida((texto + "\r\n").encode('utf-8'))
+
+    def _esperar_datos(self, timeout=None):
+        """Espera (con el candado tomado) a que llegue algo; devuelve False si pasó `timeout`."""
+        llego = self._condicion.wait(timeout)
+        if self._apagado.is_set(): raise _Apagado()
+        return llego
+
+    def _leer_linea(self):
+        """Serial.available() + readStringUntil('\\n'): espera el primer byte y después el fin de línea,
+        o devuelve lo que haya si pasa TIMEOUT_SERIAL_S sin recibir nada nuevo."""
+        with self._condicion:
+            while not self._rx:
+                self._esperar_datos()
+            while b"\n" not in self._rx:
+                recibidos = len(self._rx)
+                if not self._esperar_datos(TIMEOUT_SERIAL_S) and len(self._rx) == recibidos:
+                    break
+            fin = self._rx.find(b"\n")
+            fin = len(self._rx) if fin < 0 else fin
+            linea = bytes(self._rx[:fin])
+            del self._rx[:fin + 1]
+        return linea.decode('utf-8', errors='replace')
+
+    def _delay(self, ms):
+        self.tiempo_simulado_ms += ms
+        if self.escala_tiempo > 0:
+            self._moviendo = True
+            try:
+                if self._apagado.wait(ms / 1000.0 * self.escala_tiempo): raise _Apagado()
+            finally:
+                self._moviendo = False
+        elif self._apagado.is_set():
+            raise _Apagado()
+
+    # --- Movimiento ---
+    def _ejecutar_comando(self, instruccion):
+        self._println(f"Procesando: {instruccion}")
+        if instruccion in LINEA_MOVIMIENTO:
+            self._println(LINEA_MOVIMIENTO[instruccion])
+            self._delay(self.modelo[DURACION_MOVIMIENTO[instruccion]])
+            self._println("Motores Detenidos")
+            self.comandos_ejecutados += 1
+        else:
+            self._println(f"Instruccion desconocida: '{instruccion}'")
+
+    def _ejecutar_instrucciones(self, instrucciones):
+        if not instrucciones:
+            self._println("No hay instrucciones para ejecutar.")
+            return
+        self._println(f"Ejecutando secuencia: {instrucciones}")
+        primer_comando = True
+        i = 0
+        while i < len(instrucciones):
+            instruccion = instrucciones[i]
+            i += 1
+            repeticiones = 0
+            while i < len(instrucciones) and '0' <= instrucciones[i] <= '9': # isDigit solo acepta ASCII
+                repeticiones = repeticiones * 10 + int(instrucciones[i])
+                i += 1
+            for _ in range(repeticiones or 1):
+                if not primer_comando:
+                    self._delay(self.modelo['pausa_ms'])
+                primer_comando = False
+                self._ejecutar_comando(instruccion)
+        self._println("Secuencia de instrucciones completada.")
+
+    # --- Streaming ---
+    def _iniciar_stream(self):
+        self._modo_stream = True
+        self._fin_stream = False
+        self._primer_comando_stream = True
+        self._buffer_stream = []
+        self._creditos_por_devolver = 0
+        self._println(f"CREDITO {TAMANO_BUFFER_STREAM}")
+
+    def _devolver_creditos(self):
+        self._println(f"CREDITO {self._creditos_por_devolver}")
+        self._creditos_por_devolver = 0
+
+    def _recibir_stream(self, esperar):
+        with self._condicion:
+            if esperar and not self._rx:
+                self._esperar_datos() # El loop del sketch gira sin hacer nada hasta que llega algo
+            leidos = 0
+            while not self._fin_stream and len(self._buffer_stream) < TAMANO_BUFFER_STREAM and leidos < len(self._rx):
+                c = chr(self._rx[leidos])
+                leidos += 1
+                if c == '.':
+                    self._fin_stream = True
+                elif c in "FRL":
+                    self._buffer_stream.append(c)
+            del self._rx[:leidos]
+
+    def _atender_stream(self):
+        self._recibir_stream(esperar=not self._buffer_stream and not self._fin_stream)
+        if self._buffer_stream:
+            instruccion = self._buffer_stream.pop(0)
+            if not self._primer_comando_stream:
+                self._delay(self.modelo['pausa_ms'])
+            self._primer_comando_stream = False
+            self._ejecutar_comando(instruccion)
+            self._creditos_por_devolver += 1
+            if self._creditos_por_devolver >= LOTE_CREDITOS or (not self._buffer_stream and not self._fin_stream):
+                self._devolver_creditos()
+        elif self._fin_stream:
+            self._modo_stream = False
+            self._println("Secuencia de instrucciones completada.")
+            self._println("Esperando nuevos comandos por Serial...")
+
+    # --- EEPROM ---
+    def _escribir_eeprom(self, direccion, valor):
+        self.eeprom[direccion] = valor
+        self.escrituras_eeprom += 1
+
+    def _guardar_en_eeprom(self, texto):
+        datos = texto.encode('utf-8')
+        if not datos or len(datos) > MAX_COMMAND_LENGTH:
+            self._println("Error: Cadena vacía o demasiado larga para EEPROM.")
+            self._escribir_eeprom(EEPROM_ADDR_FLAG, 0)
+            return
+        self._escribir_eeprom(EEPROM_ADDR_FLAG, FLAG_VALIDO)
+        self._escribir_eeprom(EEPROM_ADDR_LENGTH, len(datos))
+        for i, byte in enumerate(datos):
+            self._escribir_eeprom(EEPROM_ADDR_STRING_START + i, byte)
+        self._println(f"Guardado en EEPROM: {texto}")
+
+    def leer_eeprom(self):
+        """La cadena guardada, o "" si no hay una válida (como leerStringDesdeEEPROM)."""
+        if self.eeprom[EEPROM_ADDR_FLAG] != FLAG_VALIDO:
+            return ""
+        longitud = self.eeprom[EEPROM_ADDR_LENGTH]
+        if longitud == 0 or longitud > MAX_COMMAND_LENGTH:
+            return ""
+        datos = self.eeprom[EEPROM_ADDR_STRING_START:EEPROM_ADDR_STRING_START + longitud]
+        return bytes(datos).split(b"\0", 1)[0].decode('utf-8', errors='replace')
+
+    def _borrar_eeprom(self):
+        self._escribir_eeprom(EEPROM_ADDR_FLAG, 0)
+        self._escribir_eeprom(EEPROM_ADDR_LENGTH, 0)
+        self._println("Comandos borrados de la EEPROM.")
+
+    # --- setup() y loop() ---
+    def _setup(self):
+        self._println("Motores Detenidos") # detenerMotores()
+        for linea in LINEAS_BANNER:
+            self._println(linea)
+        guardados = self.leer_eeprom()
+        if guardados:
+            self._println(f"Comandos encontrados en EEPROM: {guardados}")
+            self._println(f"Esperando {RETRASO_INICIO_S} segundos antes de ejecutar automáticamente...")
+            self._delay(RETRASO_INICIO_S * 1000)
+            self._println("Ejecutando automáticamente desde EEPROM...")
+            self._ejecutar_instrucciones(guardados)
+        else:
+            self._println("No hay comandos en EEPROM para ejecución automática al inicio.")
+        self._println("Esperando nuevos comandos por Serial...")
+
+    def _loop(self):
+        if self._modo_stream:
+            self._atender_stream()
+            return
+        comando = self._leer_linea().strip()
+        if not comando:
+            return
+        self._println(f"Comando recibido por Serial: {comando}")
+        if comando.startswith("!S"): # startsWith distingue mayúsculas, los demás usan equalsIgnoreCase
+            secuencia = comando[2:]
+            if secuencia:
+                self._guardar_en_eeprom(secuencia)
+                self._ejecutar_instrucciones(secuencia)
+            else:
+                self._println("Comando !S sin secuencia para guardar.")
+        elif comando.upper() == "!E":
+            guardados = self.leer_eeprom()
+            if guardados:
+                self._ejecutar_instrucciones(guardados)
+            else:
+                self._println("No hay nada en EEPROM para ejecutar con !E.")
+        elif comando.upper() == "!C":
+            self._borrar_eeprom()
+        elif comando.upper() == "!T":
+            self._iniciar_stream()
+            return
+        else:
+            self._ejecutar_instrucciones(comando)
+        self._println("Esperando nuevos comandos por Serial...")
+
+
+class PuertoEmulado:
+    """Sustituto de serial.Serial en el mismo proceso con un FirmwareEmulado detrás. Abrirlo arranca
+    el firmware (como el reset al abrir un puerto real); pasar la `eeprom` de otro puerto simula
+    reconectar el mismo robot."""
+
+    def __init__(self, escala_tiempo=1.0, eeprom=None, modelo=None, timeout=1.0, name="emulado"):
+        self.timeout = timeout
+        self.name = name
+        self.is_open = True
+        self._tx = bytearray()
+        self._condicion = threading.Condition()
+        self.firmware = FirmwareEmulado(self._al_imprimir, escala_tiempo, eeprom, modelo)
+
+    def _al_imprimir(self, datos):
+        with self._condicion:
+            self._tx += datos
+            self._condicion.notify_all()
+
+    def isOpen(self):
+        return self.is_open
+
+    def write(self, datos):
+        if not self.is_open: raise OSError("Puerto emulado cerrado")
+        self.firmware.recibir(bytes(datos))
+        return len(datos)
+
+    @property
+    def in_waiting(self):
+        with self._condicion:
+            return len(self._tx)
+
+    def _esperar(self, listo):
+        """Espera hasta que `listo()` o hasta el timeout del puerto (None: sin límite)."""
+        limite = None if self.timeout is None else time.monotonic() + self.timeout
+        while not listo():
+            restante = None if limite is None else limite - time.monotonic()
+            if restante is not None and restante <= 0: return
+            self._condicion.wait(restante)
+
+    def readline(self):
+        with self._condicion:
+            self._esperar(lambda: b"\n" in self._tx)
+            fin = self._tx.find(b"\n") + 1 or len(self._tx) # Sin fin de línea: lo que llegó, como pyserial
+            linea = bytes(self._tx[:fin])
+            del self._tx[:fin]
+            return linea
+
+    def read(self, n=1):
+        with self._condicion:
+            self._esperar(lambda: len(self._tx) >= n)
+            datos = bytes(self._tx[:n])
+            del self._tx[:n]
+            return datos
+
+    def reset_input_buffer(self):
+        with self._condicion:
+            self._tx.clear()
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.firmware.detener()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EmuladorPty:
+    """FirmwareEmulado detrás de un pseudo-terminal: `puerto` (/dev/pts/N) se abre con pyserial como
+    uno real. El firmware arranca al crear el objeto, así que el banner queda esperando en el buffer."""
+
+    def __init__(self, escala_tiempo=1.0, eeprom=None, modelo=None):
+        import os
+        import pty
+        import tty
+        self._maestro, self._esclavo = pty.openpty()
+        tty.setraw(self._esclavo) # Sin eco ni traducción de fines de línea, como un puerto serial
+        self.puerto = os.ttyname(self._esclavo)
+        self._abierto = True
+        self.firmware = FirmwareEmulado(self._al_imprimir, escala_tiempo, eeprom, modelo)
+        self._hilo = threading.Thread(target=self._leer, name=f"pty {self.puerto}", daemon=True)
+        self._hilo.start()
+
+    def _al_imprimir(self, datos):
+        import os
+        try:
+            os.write(self._maestro, datos)
+        except OSError: # Se cerró el pty
+            pass
+
+    def _leer(self):
+        import os
+        while self._abierto:
+            try:
+                datos = os.read(self._maestro, 4096)
+            except OSError:
+                return
+            if not datos: return
+            self.firmware.recibir(datos)
+
+    def cerrar(self):
+        import os
+        if not self._abierto: return
+        self._abierto = False
+        self.firmware.detener()
+        os.close(self._esclavo)
+        os.close(self._maestro)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# --- Benchmark de path_sender sobre el emulador ---
+LADO_LABERINTO_BENCHMARK = 41
+
+def ruta_de_prueba(lado=LADO_LABERINTO_BENCHMARK, semilla=1):
+    """Instrucciones (RLE) del camino más corto de un laberinto generado con semilla fija."""
+    from laberinth_algorithms import (parse_laberinto, encontrar_camino_mas_corto, convertir_camino_a_instrucciones,
+                                      comprimir_instrucciones)
+    from labrinth_creator import generar_laberinto
+    laberinto_num, inicio, fin, alto, ancho = parse_laberinto(generar_laberinto(lado, lado, semilla=semilla))
+    camino = encontrar_camino_mas_corto(laberinto_num, inicio, fin, alto, ancho)
+    return comprimir_instrucciones(convertir_camino_a_instrucciones(camino))
+
+
+def _abrir_transporte(transporte, escala_tiempo, pila):
+    """(conexión, firmware) del transporte pedido; la pila cierra ambos al terminar."""
+    if transporte == 'emulado':
+        from path_sender import leer_respuestas_arduino
+        puerto = pila.enter_context(PuertoEmulado(escala_tiempo))
+        for _ in leer_respuestas_arduino(puerto, 5.0): pass # El banner de arranque termina en LINEA_ESPERANDO
+        return puerto, puerto.firmware
+    from path_sender import abrir_conexion # pty: pyserial sobre un pseudo-terminal, como un puerto real
+    emulador = pila.enter_context(EmuladorPty(escala_tiempo))
+    conexion = abrir_conexion(emulador.puerto, espera_reinicio_s=0.1, registrar=lambda mensaje: None)
+    pila.callback(conexion.close)
+    return conexion, emulador.firmware
+
+
+def medir_envio(transporte='emulado', escala_tiempo=0.001, repeticiones=5, ruta=None):
+    """Corre cada caso `repeticiones` veces con enviar_instrucciones / enviar_instrucciones_streaming
+    y devuelve una lista de dicts con la latencia de pared (mínima y mediana), el tiempo que el robot
+    habría tardado según el firmware, la sobrecarga del envío (pared - simulado * escala) y los
+    comandos por segundo. '!C' no mueve el robot, así que su latencia es la de ida y vuelta del
+    protocolo. `ruta` (por defecto ruta_de_prueba()) se recorta a MAX_COMMAND_LENGTH para !S."""
+    import contextlib
+    from path_sender import enviar_instrucciones, enviar_instrucciones_streaming
+    ruta = ruta or ruta_de_prueba()
+    ruta_eeprom = ruta
+    if len(ruta_eeprom) > MAX_COMMAND_LENGTH:
+        ruta_eeprom = ruta_eeprom[:MAX_COMMAND_LENGTH].rstrip("0123456789") # Sin cortar un número de repeticiones
+    casos = (("ida_y_vuelta", "!C", False), ("secuencia", ruta, False), ("guardar", "!S" + ruta_eeprom, False),
+             ("eeprom", "!E", False), ("streaming", ruta, True))
+    silencio = lambda mensaje: None
+    resultados = []
+    with contextlib.ExitStack() as pila:
+        conexion, firmware = _abrir_transporte(transporte, escala_tiempo, pila)
+        for nombre, comando, streaming in casos:
+            enviar = enviar_instrucciones_streaming if streaming else enviar_instrucciones
+            tiempos = []
+            estados = set()
+            simulado_ms, comandos = firmware.tiempo_simulado_ms, firmware.comandos_ejecutados
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                estados.add(enviar(conexion, comando, silencio, registrar=silencio))
+                tiempos.append(time.perf_counter() - inicio)
+            simulado_ms = (firmware.tiempo_simulado_ms - simulado_ms) / repeticiones
+            comandos = (firmware.comandos_ejecutados - comandos) // repeticiones
+            minimo = min(tiempos)
+            resultados.append({
+                "transporte": transporte, "caso": nombre, "comandos": comandos, "estado": "/".join(sorted(estados)),
+                "min_ms": round(minimo * 1000.0, 3), "mediana_ms": round(statistics.median(tiempos) * 1000.0, 3),
+                "simulado_ms": simulado_ms,
+                "sobrecarga_ms": round((minimo - simulado_ms / 1000.0 * escala_tiempo) * 1000.0, 3),
+                "comandos_por_s": round(comandos / minimo, 1) if comandos else None,
+                "bytes_descartados": firmware.bytes_descartados,
+            })
+    return resultados
+
+
+def formatear(r):
+    por_s = f"{r['comandos_por_s']:>10.1f}" if r['comandos_por_s'] is not None else f"{'-':>10}"
+    return (f"{r['transporte']:<8} {r['caso']:<13}{r['comandos']:>6}{r['min_ms']:>11.3f}{r['mediana_ms']:>11.3f}"
+            f"{r['sobrecarga_ms']:>11.3f}{por_s}  {r['estado']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emulador del sketch version_arduino.ino (pty o benchmark de path_sender).")
+    modo = parser.add_mutually_exclusive_group(required=True)
+    modo.add_argument("--pty", action="store_true", help="Dejar un Arduino emulado en un pseudo-terminal hasta Ctrl+C")
+    modo.add_argument("--benchmark", action="store_true", help="Medir latencia y throughput de path_sender contra el emulador")
+    parser.add_argument("--escala", type=float, default=None,
+                        help="Factor de los delay() del sketch (por defecto 1.0 con --pty y 0.001 con --benchmark)")
+    parser.add_argument("--transportes", nargs="+", choices=("emulado", "pty"), default=["emulado", "pty"])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--lado", type=int, default=LADO_LABERINTO_BENCHMARK, help="Lado del laberinto de la ruta de prueba")
+    parser.add_argument("-o", "--salida", help="Archivo JSON donde guardar los resultados del benchmark")
+    args = parser.parse_args(argv)
+
+    if args.pty:
+        with EmuladorPty(1.0 if args.escala is None else args.escala) as emulador:
+            print(f"Arduino emulado en {emulador.puerto} (escala de tiempo {emulador.firmware.escala_tiempo:g}). Ctrl+C para terminar.")
+            try:
+                while True: time.sleep(3600)
+            except KeyboardInterrupt:
+                print(f"\nTiempo simulado: {emulador.firmware.tiempo_simulado_ms / 1000.0:.1f} s, "
+                      f"{emulador.firmware.comandos_ejecutados} comandos ejecutados.")
+        return 0
+
+    escala = 0.001 if args.escala is None else args.escala
+    ruta = ruta_de_prueba(args.lado)
+    print(f"Ruta de prueba ({args.lado}x{args.lado}): {ruta} — escala de tiempo {escala:g}")
+    print(f"{'transp.':<8} {'caso':<13}{'cmds':>6}{'min ms':>11}{'mediana ms':>11}{'sobrec. ms':>11}{'cmds/s':>10}  estado")
+    resultados = []
+    for transporte in args.transportes:
+        try:
+            medidos = medir_envio(transporte, escala, args.repeticiones, ruta)
+        except ImportError as e: # pty necesita pyserial
+            print(f"{transporte}: omitido ({e})", file=sys.stderr)
+            continue
+        for r in medidos: print(formatear(r))
+        resultados.extend(medidos)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({"escala_tiempo": escala, "ruta": ruta, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+    return 0 if all(r["estado"] == 'completado' for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""Benchmark de los solvers sobre una matriz de tamaños y tipos de laberinto.
+
+Uso:
+    python benchmark_solvers.py -o base.json                      # corre la matriz y guarda los resultados
+    python benchmark_solvers.py --comparar base.json -o nuevo.json # además marca regresiones contra base.json
+    python benchmark_solvers.py --rapido --solvers bfs dfs k_cortos
+    python benchmark_solvers.py --solo-importacion                 # solo el costo de importar los módulos
+
+Para cada (tipo, tamaño, solver) se mide el tiempo de pared (mínimo de varias repeticiones), los nodos
+expandidos (consultas a la lista de adyacencia, por celda o por cruce, junto con los contadores de
+laberinth_metricas en "contadores") y el pico de memoria con tracemalloc, cada cosa en una ejecución aparte para que la medición no contamine a las demás. Cada caso
+corre en un proceso hijo con tiempo límite, porque los enumeradores BFS/DFS son exponenciales en
+laberintos con ciclos. Los laberintos salen de generar_laberinto con semilla fija, así que dos corridas
+en la misma máquina son comparables. Solo usa la biblioteca estándar (fork, así que Linux/macOS).
+
+Antes de la matriz se mide el arranque: tiempo y pico de memoria de importar cada módulo de
+MODULOS_IMPORTACION en un intérprete nuevo. Si alguno carga un módulo de MODULOS_PESADOS (matplotlib,
+networkx, pyserial, numpy) la corrida termina con error aunque no haya base contra la que comparar.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import laberinth_algorithms
+import laberinth_graph
+import laberinth_metricas
+from laberinth_algorithms import (parse_laberinto, laberinto_real, encontrar_camino_seguidor_pared, encontrar_N_caminos_bfs,
+                                  encontrar_N_caminos_dfs, k_caminos_mas_cortos, encontrar_camino_tiempo_minimo,
+                                  encontrar_camino_mas_corto, iterar_caminos, convertir_camino_a_instrucciones)
+from labrinth_creator import generar_laberinto
+
+TAMANOS = (21, 41, 81, 161)
+TAMANOS_RAPIDO = (21, 41)
+TIPOS = {
+    'perfecto': {},                        # un único camino simple entre cada par de celdas
+    'trenzado': {'trenzado': 0.5},         # la mitad de los callejones abiertos: muchos ciclos
+    'habitaciones': {'habitaciones': 4},   # zonas abiertas sin muros interiores
+    'real': None,                          # laberinto_real, de un solo tamaño
+}
+CAMINOS_POR_SOLVER = 5 # N de bfs/dfs y k de k_cortos
+SEMILLA = 12345
+TIEMPO_LIMITE_CASO_S = 5.0
+TOLERANCIA = 0.15      # Aumento relativo que se considera regresión
+MINIMO_MS = 1.0        # Diferencias de tiempo menores se consideran ruido
+MINIMO_KB = 64.0
+# El arranque dura unos pocos ms y varía varias veces eso de una corrida a otra (disco, caché del sistema
+# de archivos), así que tiene su propio umbral: solo cuenta un aumento grande y de al menos 25 ms sobre
+# el mínimo de muchas corridas. Lo que sí se detecta siempre es cargar MODULOS_PESADOS (problemas_importacion).
+REPETICIONES_IMPORTACION = 10
+TOLERANCIA_IMPORTACION = 0.5
+MINIMO_MS_IMPORTACION = 25.0
+MODULOS_IMPORTACION = ('laberinth_algorithms', 'laberinth_batch') # Deben arrancar rápido: solo resuelven
+MODULOS_PESADOS = ('matplotlib', 'networkx', 'serial', 'numpy')   # No deben cargarse al importarlos
+
+_SCRIPT_IMPORTACION = """
+import json, sys, time, tracemalloc
+modulo, con_memoria = sys.argv[1], sys.argv[2] == '1'
+if con_memoria: tracemalloc.start()
+inicio = time.perf_counter()
+__import__(modulo)
+tiempo_ms = (time.perf_counter() - inicio) * 1000.0
+pico = tracemalloc.get_traced_memory()[1] if con_memoria else 0
+print(json.dumps({"tiempo_ms": tiempo_ms, "memoria_pico_kb": pico / 1024.0,
+                  "pesados": [m for m in sys.argv[3:] if m in sys.modules]}))
+"""
+
+
+def _pared(tipo):
+    return lambda c: encontrar_camino_seguidor_pared(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho'], tipo)
+
+
+def _pared_grafo(tipo):
+    return lambda c: laberinth_graph.encontrar_camino_seguidor_pared_grafo(c['grafo'], tipo, c['alto'], c['ancho'])
+
+
+SOLVERS = {
+    'pared_izquierda': _pared('izquierda'),
+    'pared_derecha': _pared('derecha'),
+    'bfs': lambda c: encontrar_N_caminos_bfs(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho'], CAMINOS_POR_SOLVER, set()),
+    'dfs': lambda c: encontrar_N_caminos_dfs(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho'], CAMINOS_POR_SOLVER, set()),
+    'k_cortos': lambda c: k_caminos_mas_cortos(c['laberinto_num'], c['inicio'], c['fin'], CAMINOS_POR_SOLVER),
+    'corto': lambda c: encontrar_camino_mas_corto(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho']),
+    'k_tiempo': lambda c: list(itertools.islice(iterar_caminos(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho'], orden='tiempo'), CAMINOS_POR_SOLVER)),
+    'tiempo': lambda c: encontrar_camino_tiempo_minimo(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho']),
+    'instrucciones': lambda c: convertir_camino_a_instrucciones(c['camino']),
+    'grafo': lambda c: laberinth_graph.construir_grafo_cruces(c['laberinto_num'], c['inicio'], c['fin'], c['alto'], c['ancho']),
+    'pared_izquierda_grafo': _pared_grafo('izquierda'),
+    'bfs_grafo': lambda c: laberinth_graph.encontrar_N_caminos_bfs_grafo(c['grafo'], CAMINOS_POR_SOLVER, set()),
+    'dfs_grafo': lambda c: laberinth_graph.encontrar_N_caminos_dfs_grafo(c['grafo'], CAMINOS_POR_SOLVER, set()),
+    'k_cortos_grafo': lambda c: laberinth_graph.k_caminos_mas_cortos_grafo(c['grafo'], CAMINOS_POR_SOLVER),
+}
+
+
+class _ListaContadora(list):
+    """Lista que cuenta los accesos por índice: con ella se cuentan las expansiones sin tocar los solvers."""
+    def __init__(self, datos, registro):
+        super().__init__(datos)
+        self.consultas = 0
+        registro.append(self)
+
+    def __getitem__(self, i):
+        self.consultas += 1
+        return list.__getitem__(self, i)
+
+
+class _DictContador(dict):
+    def __init__(self, datos, registro):
+        super().__init__(datos)
+        self.consultas = 0
+        registro.append(self)
+
+    def __getitem__(self, clave):
+        self.consultas += 1
+        return dict.__getitem__(self, clave)
+
+
+def _contar_nodos(funcion, contexto):
+    """Ejecuta `funcion` con las estructuras de adyacencia envueltas en contadores y con laberinth_metricas
+    activo. Devuelve (total de consultas o None si no se pudo contar, contadores de las métricas). Solo se
+    llama dentro del proceso hijo, así que los reemplazos no afectan al resto."""
+    registro = []
+    for modulo, nombre in ((laberinth_algorithms, '_mascaras_vecinos'), (laberinth_algorithms, '_construir_vecinos'),
+                           (laberinth_algorithms, '_podar_callejones'), (laberinth_graph, '_construir_vecinos')):
+        original = getattr(modulo, nombre)
+        setattr(modulo, nombre, lambda *args, _original=original: _ListaContadora(_original(*args), registro))
+    if contexto.get('grafo') is not None:
+        contexto = dict(contexto)
+        grafo = laberinth_graph.GrafoCruces.__new__(laberinth_graph.GrafoCruces)
+        grafo.__dict__.update(contexto['grafo'].__dict__)
+        grafo.adyacencia = _DictContador(grafo.adyacencia, registro)
+        contexto['grafo'] = grafo
+    laberinth_metricas.activar()
+    funcion(contexto)
+    metricas = laberinth_metricas.desactivar()
+    contadores = dict(metricas.contadores, **{f"{nombre}_max": valor for nombre, valor in metricas.maximos.items()})
+    # 0 significa que el solver recorre una estructura propia (p. ej. el seguidor de pared del grafo)
+    return sum(estructura.consultas for estructura in registro) or None, contadores
+
+
+def _resumir(resultado):
+    """Resumen comparable del resultado: longitud de un camino, longitudes de una lista de caminos, etc."""
+    if resultado is None: return None
+    if isinstance(resultado, laberinth_graph.GrafoCruces): return [resultado.num_nodos(), resultado.num_pasillos()]
+    if isinstance(resultado, list) and resultado and isinstance(resultado[0], (list, tuple)) and \
+       not (isinstance(resultado[0], tuple) and len(resultado[0]) == 2 and isinstance(resultado[0][0], int)):
+        return [len(camino) for camino in resultado]
+    return len(resultado)
+
+
+def _medir(funcion, contexto, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(contexto)
+        tiempos.append((time.perf_counter() - inicio) * 1000.0)
+        if tiempos[-1] > 1000.0: break # Casos lentos: una sola medición alcanza
+    tiempos.sort()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    funcion(contexto)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodos, contadores = _contar_nodos(funcion, contexto)
+    if funcion is SOLVERS['instrucciones']: nodos = None
+    return {
+        "estado": "ok", "tiempo_ms": round(tiempos[0], 4), "tiempo_mediana_ms": round(tiempos[len(tiempos) // 2], 4),
+        "repeticiones": len(tiempos), "nodos": nodos, "contadores": contadores, "memoria_pico_kb": round(pico / 1024.0, 1),
+        "resultado": _resumir(resultado)
+    }
+
+
+def _medir_en_hijo(conexion, funcion, contexto, repeticiones):
+    try:
+        conexion.send(_medir(funcion, contexto, repeticiones))
+    except Exception as e:
+        conexion.send({"estado": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conexion.close()
+
+
+def medir_caso(nombre_solver, contexto, repeticiones=3, tiempo_limite_s=TIEMPO_LIMITE_CASO_S):
+    """Mide un solver en un proceso hijo; si no termina en `tiempo_limite_s` se corta y se informa 'tiempo_agotado'."""
+    ctx = multiprocessing.get_context('fork')
+    receptor, emisor = ctx.Pipe(duplex=False)
+    proceso = ctx.Process(target=_medir_en_hijo, args=(emisor, SOLVERS[nombre_solver], contexto, repeticiones))
+    proceso.start()
+    emisor.close()
+    if receptor.poll(tiempo_limite_s):
+        try:
+            medicion = receptor.recv()
+        except EOFError:
+            medicion = {"estado": "error", "error": "El proceso terminó sin resultado"}
+    else:
+        proceso.terminate()
+        medicion = {"estado": "tiempo_agotado", "tiempo_limite_s": tiempo_limite_s}
+    proceso.join()
+    return medicion
+
+
+def medir_importacion(modulo, repeticiones=REPETICIONES_IMPORTACION):
+    """Importa `modulo` en intérpretes nuevos (sin nada en sys.modules): tiempo mínimo de varias corridas,
+    pico de memoria con tracemalloc en una corrida aparte y qué módulos de MODULOS_PESADOS quedaron cargados."""
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    corridas = []
+    for con_memoria in [False] * repeticiones + [True]:
+        salida = subprocess.run([sys.executable, "-c", _SCRIPT_IMPORTACION, modulo, "1" if con_memoria else "0", *MODULOS_PESADOS],
+                                cwd=directorio, capture_output=True, text=True)
+        if salida.returncode != 0:
+            return {"modulo": modulo, "estado": "error", "error": salida.stderr.strip().splitlines()[-1:]}
+        corridas.append(json.loads(salida.stdout))
+    return {"modulo": modulo, "estado": "ok", "tiempo_ms": round(min(c["tiempo_ms"] for c in corridas[:-1]), 3),
+            "memoria_pico_kb": round(corridas[-1]["memoria_pico_kb"], 1), "pesados": corridas[-1]["pesados"]}
+
+
+def preparar_contexto(filas):
+    """Parsea el laberinto y precalcula lo que comparten los solvers (grafo de cruces y un camino para 'instrucciones')."""
+    laberinto_num, inicio, fin, alto, ancho = parse_laberinto(filas)
+    grafo = laberinth_graph.construir_grafo_cruces(laberinto_num, inicio, fin, alto, ancho)
+    caminos = laberinth_graph.k_caminos_mas_cortos_grafo(grafo, 1)
+    camino = laberinth_graph.expandir_camino(grafo, caminos[0]) if caminos else []
+    return {"laberinto_num": laberinto_num, "inicio": inicio, "fin": fin, "alto": alto, "ancho": ancho,
+            "grafo": grafo, "camino": camino}
+
+
+def casos(tipos, tamanos):
+    """Genera (tipo, tamaño, filas) de la matriz; 'real' aparece una sola vez con su propio tamaño."""
+    for tipo in tipos:
+        if TIPOS[tipo] is None:
+            yield tipo, len(laberinto_real), laberinto_real
+            continue
+        for tamano in tamanos:
+            yield tipo, tamano, generar_laberinto(tamano, tamano, semilla=SEMILLA, **TIPOS[tipo])
+
+
+def correr(tipos, tamanos, solvers, repeticiones=3, tiempo_limite_s=TIEMPO_LIMITE_CASO_S, mostrar=print,
+           modulos_importacion=MODULOS_IMPORTACION):
+    importacion = []
+    for modulo in modulos_importacion:
+        importacion.append(medir_importacion(modulo, max(repeticiones, REPETICIONES_IMPORTACION)))
+        mostrar(formatear_importacion(importacion[-1]))
+    resultados = []
+    for tipo, tamano, filas in casos(tipos, tamanos):
+        contexto = preparar_contexto(filas)
+        for nombre_solver in solvers:
+            medicion = medir_caso(nombre_solver, contexto, repeticiones, tiempo_limite_s)
+            resultados.append({"tipo": tipo, "tamano": tamano, "solver": nombre_solver, **medicion})
+            mostrar(formatear(resultados[-1]))
+    return {
+        "meta": {"fecha": datetime.datetime.now().isoformat(timespec='seconds'), "python": platform.python_version(),
+                 "plataforma": platform.platform(), "semilla": SEMILLA, "repeticiones": repeticiones,
+                 "caminos_por_solver": CAMINOS_POR_SOLVER, "tiempo_limite_s": tiempo_limite_s},
+        "importacion": importacion,
+        "resultados": resultados
+    }
+
+
+def formatear(r):
+    caso = f"{r['tipo']:<13}{r['tamano']:>5}  {r['solver']:<22}"
+    if r["estado"] != "ok":
+        return caso + f"{r['estado']}"
+    nodos = "-" if r["nodos"] is None else r["nodos"]
+    return caso + f"{r['tiempo_ms']:>11.3f} ms {nodos:>11} nodos {r['memoria_pico_kb']:>10.1f} KB"
+
+
+def formatear_importacion(r):
+    caso = f"{'importar':<13}{'':>5}  {r['modulo']:<22}"
+    if r["estado"] != "ok":
+        return caso + f"{r['estado']}: {' '.join(r['error'])}"
+    pesados = f"  carga {', '.join(r['pesados'])}" if r["pesados"] else ""
+    return caso + f"{r['tiempo_ms']:>11.3f} ms {'':>17} {r['memoria_pico_kb']:>10.1f} KB{pesados}"
+
+
+def problemas_importacion(datos):
+    """Módulos que no se pudieron importar o que cargan dependencias pesadas; no necesita una base."""
+    problemas = []
+    for r in datos.get("importacion", []):
+        if r["estado"] != "ok":
+            problemas.append(f"importar {r['modulo']}: {' '.join(r['error'])}")
+        elif r["pesados"]:
+            problemas.append(f"importar {r['modulo']} carga {', '.join(r['pesados'])}")
+    return problemas
+
+
+def comparar(base, nuevo, tolerancia=TOLERANCIA, minimo_ms=MINIMO_MS, minimo_kb=MINIMO_KB,
+             tolerancia_importacion=TOLERANCIA_IMPORTACION, minimo_ms_importacion=MINIMO_MS_IMPORTACION):
+    """Compara dos corridas caso por caso. Devuelve la lista de regresiones (strings): más tiempo o memoria
+    que la base por encima de la tolerancia, más nodos expandidos, un resultado distinto, o un caso que
+    antes terminaba y ahora no. El arranque (importacion) se compara por memoria igual que los casos y
+    por tiempo con tolerancia_importacion y minimo_ms_importacion. Los casos que solo están en una de
+    las dos corridas se ignoran."""
+    por_clave = {(r["tipo"], r["tamano"], r["solver"]): r for r in base["resultados"]}
+    regresiones = []
+    importacion_base = {r["modulo"]: r for r in base.get("importacion", []) if r["estado"] == "ok"}
+    for r in nuevo.get("importacion", []):
+        b = importacion_base.get(r["modulo"])
+        if b is None or r["estado"] != "ok": continue
+        if r["tiempo_ms"] > b["tiempo_ms"] * (1 + tolerancia_importacion) and r["tiempo_ms"] - b["tiempo_ms"] > minimo_ms_importacion:
+            regresiones.append(f"importar {r['modulo']}: tiempo {b['tiempo_ms']:.3f} -> {r['tiempo_ms']:.3f} ms")
+        if r["memoria_pico_kb"] > b["memoria_pico_kb"] * (1 + tolerancia) and r["memoria_pico_kb"] - b["memoria_pico_kb"] > minimo_kb:
+            regresiones.append(f"importar {r['modulo']}: memoria {b['memoria_pico_kb']:.1f} -> {r['memoria_pico_kb']:.1f} KB")
+    for r in nuevo["resultados"]:
+        b = por_clave.get((r["tipo"], r["tamano"], r["solver"]))
+        if b is None or b["estado"] != "ok": continue
+        caso = f"{r['tipo']} {r['tamano']} {r['solver']}"
+        if r["estado"] != "ok":
+            regresiones.append(f"{caso}: {r['estado']} (antes {b['tiempo_ms']:.3f} ms)")
+            continue
+        if r["tiempo_ms"] > b["tiempo_ms"] * (1 + tolerancia) and r["tiempo_ms"] - b["tiempo_ms"] > minimo_ms:
+            regresiones.append(f"{caso}: tiempo {b['tiempo_ms']:.3f} -> {r['tiempo_ms']:.3f} ms (x{r['tiempo_ms'] / b['tiempo_ms']:.2f})")
+        if r["memoria_pico_kb"] > b["memoria_pico_kb"] * (1 + tolerancia) and r["memoria_pico_kb"] - b["memoria_pico_kb"] > minimo_kb:
+            regresiones.append(f"{caso}: memoria {b['memoria_pico_kb']:.1f} -> {r['memoria_pico_kb']:.1f} KB")
+        if r["nodos"] is not None and b["nodos"] is not None and r["nodos"] > b["nodos"]:
+            regresiones.append(f"{caso}: nodos {b['nodos']} -> {r['nodos']}")
+        if r["resultado"] != b["resultado"]:
+            regresiones.append(f"{caso}: resultado distinto ({b['resultado']} -> {r['resultado']})")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los solvers de laberinth_algorithms y laberinth_graph.")
+    parser.add_argument("-o", "--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", metavar="BASE", help="JSON de una corrida anterior contra el que buscar regresiones")
+    parser.add_argument("--tipos", nargs="+", choices=list(TIPOS), default=list(TIPOS))
+    parser.add_argument("--tamanos", nargs="+", type=int, default=None, help=f"Lados de los laberintos (por defecto {TAMANOS})")
+    parser.add_argument("--solvers", nargs="+", choices=list(SOLVERS), default=list(SOLVERS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--tiempo-limite", type=float, default=TIEMPO_LIMITE_CASO_S, help="Segundos por caso antes de cortarlo")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="Aumento relativo permitido al comparar (0.15 = 15%%)")
+    parser.add_argument("--rapido", action="store_true", help=f"Solo tamaños {TAMANOS_RAPIDO} y una repetición")
+    parser.add_argument("--solo-importacion", action="store_true", help="Medir solo el arranque (importar MODULOS_IMPORTACION)")
+    args = parser.parse_args(argv)
+
+    tamanos = args.tamanos or (TAMANOS_RAPIDO if args.rapido else TAMANOS)
+    repeticiones = 1 if args.rapido else args.repeticiones
+    if args.solo_importacion:
+        datos = correr([], tamanos, [], repeticiones, args.tiempo_limite)
+    else:
+        datos = correr(args.tipos, tamanos, args.solvers, repeticiones, args.tiempo_limite)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=1, ensure_ascii=False)
+        print(f"Resultados guardados en {args.salida}")
+
+    problemas = problemas_importacion(datos)
+    if problemas:
+        print(f"\n{len(problemas)} problemas de arranque:")
+        for linea in problemas: print(f"  {linea}")
+        return 1
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        regresiones = comparar(base, datos, tolerancia=args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones contra {args.comparar}:")
+            for linea in regresiones: print(f"  {linea}")
+            return 1
+        print(f"\nSin regresiones contra {args.comparar}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
+import array
 import collections
-import networkx as nx
-import matplotlib.pyplot as plt
-import traceback # Para imprimir errores detallados
-import serial    # Para la comunicación con Arduino
+import heapq
+import itertools
+import operator
+import re
 import time      # Para pausas y timeouts
+import laberinth_metricas as metricas # Contadores y tiempos por etapa (apagados salvo con --profile)
+# networkx, matplotlib y pyserial se importan solo donde se usan (los grafos de caminos están en
+# laberinth_plot y el envío en path_sender): los solvers y la generación de instrucciones se pueden
+# usar, por ejemplo desde laberinth_batch.py, sin tenerlos instalados y sin pagar su importación.
 
 # --- Definiciones del Laberinto ---
 WALL_CHAR = '#'
@@ -27,6 +32,14 @@ NEIGHBOR_ORDER_global = ['E', 'S', 'W', 'N'] # Preferencia para DFS y BFS están
 DIR_TO_IDX = {(-1,0):0, (0,1):1, (1,0):2, (0,-1):3} 
 IDX_TO_DR_DC = {0:(-1,0), 1:(0,1), 2:(1,0), 3:(0,-1)}
 
+# --- Modelo de movimiento del robot (tiempos de version_arduino.ino, en ms) ---
+MODELO_MOVIMIENTO = {
+    'avance_ms': 1650, # TIEMPO_AVANCE_F
+    'giro_ms': 1500,   # TIEMPO_GIRO_90_GRADOS
+    'pausa_ms': 200    # PAUSA_ENTRE_COMANDOS (entre comandos, no después del último)
+}
+MAX_LONGITUD_EEPROM = 50 # MAX_COMMAND_LENGTH: caracteres que el sketch guarda en EEPROM con !S
+
 # --- Representacion grafica de nuestro laberinto real ---
 laberinto_real = [
         "###########",
@@ -42,6 +55,7 @@ laberinto_real = [
         "#########E#"] 
 
 # --- Funciones de Procesamiento del Laberinto y Búsqueda de Caminos ---
+@metricas.medido('parse')
 def parse_laberinto(laberinto_str_list):
     """Convierte el laberinto de strings a una representación numérica y encuentra S y E."""
     mapa_numerico = []
@@ -82,89 +96,863 @@ def parse_laberinto(laberinto_str_list):
         raise ValueError("No se encontró el punto de fin 'E' en el laberinto.")
     return mapa_numerico, pos_inicio, pos_fin, height, width
 
-def encontrar_camino_seguidor_pared(laberinto_num, inicio, fin, height, width, tipo_seguidor):
-    camino_actual = [inicio]
-    r, c = inicio
-    dir_mirada_idx = -1
-    for dr_char_init in NEIGHBOR_ORDER_global: 
-        dr_init, dc_init = DIRECTIONS_map[dr_char_init]
-        nr_init, nc_init = r + dr_init, c + dc_init
-        if 0 <= nr_init < height and 0 <= nc_init < width and laberinto_num[nr_init][nc_init] != WALL:
-            dir_mirada_idx = DIR_TO_IDX[(dr_init, dc_init)]
-            r, c = nr_init, nc_init
-            camino_actual.append((r,c))
-            break 
-    if dir_mirada_idx == -1: return None
-    max_pasos_simulacion = height * width * 2
-    pasos_realizados = 0 
-    while (r, c) != fin and pasos_realizados < max_pasos_simulacion:
-        pasos_realizados += 1
-        if tipo_seguidor == 'izquierda':
-            idx_orden_prueba = [(dir_mirada_idx - 1 + 4) % 4, dir_mirada_idx, (dir_mirada_idx + 1) % 4, (dir_mirada_idx + 2) % 4]
-        else: 
-            idx_orden_prueba = [(dir_mirada_idx + 1) % 4, dir_mirada_idx, (dir_mirada_idx - 1 + 4) % 4, (dir_mirada_idx + 2) % 4]
-        movimiento_efectuado_este_paso = False
-        for idx_nueva_direccion_mirada in idx_orden_prueba:
-            dr_new, dc_new = IDX_TO_DR_DC[idx_nueva_direccion_mirada]
-            nr_new, nc_new = r + dr_new, c + dc_new
-            if 0 <= nr_new < height and 0 <= nc_new < width and laberinto_num[nr_new][nc_new] != WALL:
-                r, c = nr_new, nc_new
-                camino_actual.append((r,c))
-                dir_mirada_idx = idx_nueva_direccion_mirada
-                movimiento_efectuado_este_paso = True
-                break 
-        if not movimiento_efectuado_este_paso: return None 
-    if (r,c) == fin: return camino_actual
-    else: return None
+@metricas.medido('seguidor_pared')
+def encontrar_camino_seguidor_pared(laberinto_num, inicio, fin, height, width, tipo_seguidor, tablas=None):
+    """Sigue la pared izquierda o derecha desde el inicio. Cada paso es una consulta a la tabla de
+    transiciones (ver tabla_seguidor_pared; se puede pasar en `tablas` para compartirla entre los dos
+    seguidores) y un bytearray de estados visitados detecta el ciclo en cuanto un estado se repite,
+    así que un laberinto sin salida para el seguidor devuelve None enseguida."""
+    tipo = 'izquierda' if tipo_seguidor == 'izquierda' else 'derecha'
+    if tablas is None: tablas = tabla_seguidor_pared(laberinto_num, height, width, tipos=(tipo,))
+    tabla = tablas[tipo]
+    inicio_idx = inicio[0] * width + inicio[1]
+    fin_idx = fin[0] * width + fin[1]
+    # Primer paso: la primera dirección abierta en NEIGHBOR_ORDER_global
+    estado = -1
+    for dr_char_init in NEIGHBOR_ORDER_global:
+        dir_idx = DIR_TO_IDX[DIRECTIONS_map[dr_char_init]]
+        if tablas['mascaras'][inicio_idx] >> dir_idx & 1:
+            estado = (inicio_idx + _desplazamiento_idx(dir_idx, width)) * 4 + dir_idx
+            break
+    if estado == -1: return None
+
+    visitados = bytearray(len(tabla))
+    estados = [inicio_idx * 4]
+    while estado >> 2 != fin_idx:
+        if visitados[estado]: return None # Ciclo: el seguidor nunca llegará al fin
+        visitados[estado] = 1
+        estados.append(estado)
+        estado = tabla[estado]
+    estados.append(estado)
+    return [divmod(e >> 2, width) for e in estados]
+
+# Orden en que cada seguidor prueba las direcciones, como giro relativo a la orientación actual
+# (3: izquierda, 0: recto, 1: derecha, 2: vuelta en U).
+_GIROS_SEGUIDOR = {'izquierda': (3, 0, 1, 2), 'derecha': (1, 0, 3, 2)}
+
+def _desplazamiento_idx(dir_idx, width):
+    dr, dc = IDX_TO_DR_DC[dir_idx]
+    return dr * width + dc
+
+@metricas.medido('tabla_seguidor_pared')
+def tabla_seguidor_pared(laberinto_num, height, width, tipos=('izquierda', 'derecha')):
+    """Tablas de transición de los seguidores de pared, calculadas una vez por laberinto. El estado es
+    idx*4 + orientación de llegada (0:N, 1:E, 2:S, 3:W) y `tablas['izquierda'][estado]` es el estado
+    siguiente. Las celdas de muro apuntan a sí mismas (nunca se alcanzan)."""
+    mascaras = _mascaras_vecinos(laberinto_num, height, width)
+    tablas = {'mascaras': mascaras}
+    for tipo in tipos:
+        giros = _GIROS_SEGUIDOR[tipo]
+        # salto[m][d]: cuánto cambia el estado idx*4+d al salir de una celda con máscara m mirando hacia d
+        salto = []
+        for mascara in range(16):
+            por_dir = []
+            for dir_actual in range(4):
+                nueva = next(((dir_actual + g) % 4 for g in giros if mascara >> ((dir_actual + g) % 4) & 1), dir_actual)
+                por_dir.append(_desplazamiento_idx(nueva, width) * 4 + nueva - dir_actual if mascara else 0)
+            salto.append(tuple(por_dir))
+        relativos = itertools.chain.from_iterable(map(salto.__getitem__, mascaras))
+        tablas[tipo] = array.array('l', map(operator.add, range(4 * len(mascaras)), relativos))
+    return tablas
+
+def _mascaras_vecinos(laberinto_num, height, width):
+    """Máscara de 4 bits por celda (índice r*width+c): el bit i indica que la celda está abierta hacia
+    IDX_TO_DR_DC[i]. Los muros tienen máscara 0. Devuelve un bytearray (un byte por celda, indexar da un
+    int) que los solvers pueden modificar; si el laberinto ya trae las máscaras (LaberintoGrid) se copia
+    su buffer uint8 tal cual, sin pasar por listas de Python."""
+    mascaras = getattr(laberinto_num, 'mascaras', None)
+    if mascaras is not None: return bytearray(mascaras.tobytes())
+    mascaras = bytearray(height * width)
+    for r in range(height):
+        fila = laberinto_num[r]
+        for c in range(width):
+            if fila[c] == WALL: continue
+            mascara = 0
+            for dir_idx, (dr, dc) in IDX_TO_DR_DC.items():
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < height and 0 <= nc < width and laberinto_num[nr][nc] != WALL:
+                    mascara |= 1 << dir_idx
+            mascaras[r * width + c] = mascara
+    return mascaras
+
+@metricas.medido('vecinos')
+def _construir_vecinos(laberinto_num, height, width):
+    """Precalcula, para cada celda (índice r*width+c), sus vecinos transitables en orden NEIGHBOR_ORDER_global.
+    Así los buscadores no repiten comprobaciones de límites en cada expansión."""
+    desplazamiento_idx = {0: -width, 1: 1, 2: width, 3: -1}
+    orden_idx = [DIR_TO_IDX[DIRECTIONS_map[d]] for d in NEIGHBOR_ORDER_global]
+    por_mascara = [tuple(desplazamiento_idx[i] for i in orden_idx if mascara >> i & 1) for mascara in range(16)]
+    return [tuple([idx + d for d in por_mascara[mascara]]) if mascara else ()
+            for idx, mascara in enumerate(_mascaras_vecinos(laberinto_num, height, width))]
+
+_GRADO_MASCARA = [bin(mascara).count('1') for mascara in range(16)]
+_RELLENADA = 0x10 # Marca de celda rellenada en _rellenar_desde: cabe en un byte y no es una máscara de 4 bits
+
+@metricas.medido('rellenar_callejones')
+def rellenar_callejones(laberinto_num, inicio, fin, height, width):
+    """Rellena con muro los callejones sin salida: toda celda abierta con tres o cuatro paredes, salvo S
+    y E, pasa a muro, y se repite con las que quedan así hasta que no queda ninguna. Los caminos simples
+    de S a E no cambian, pero los buscadores ya no entran en ramas que no llevan a E (en un laberinto
+    perfecto solo queda el pasillo de la solución).
+
+    Devuelve (laberinto reducido, celdas rellenadas) sin modificar el original; el reducido es del mismo
+    tipo que `laberinto_num` y lo aceptan todos los solvers. Con LaberintoGrid el trabajo es vectorizado."""
+    if hasattr(laberinto_num, 'rellenar_callejones'):
+        reducido, cantidad = laberinto_num.rellenar_callejones(inicio, fin)
+        metricas.contar('rellenar.celdas', cantidad)
+        return reducido, cantidad
+    mascaras = _mascaras_vecinos(laberinto_num, height, width)
+    candidatas = [r * width + c for r in range(height) for c, celda in enumerate(laberinto_num[r])
+                  if celda != WALL and _GRADO_MASCARA[mascaras[r * width + c]] <= 1]
+    reducido = [list(fila) for fila in laberinto_num]
+    rellenadas = _rellenar_desde(mascaras, width, candidatas, (inicio[0] * width + inicio[1], fin[0] * width + fin[1]))
+    for idx in rellenadas:
+        r, c = divmod(idx, width)
+        reducido[r][c] = WALL
+    metricas.contar('rellenar.celdas', len(rellenadas))
+    return reducido, len(rellenadas)
+
+def _rellenar_desde(mascaras, width, candidatas, conservar):
+    """Barrido lineal con cola de rellenar_callejones: parte de las celdas abiertas `candidatas` de grado
+    <= 1 y devuelve los índices que pasan a muro. Modifica `mascaras`: las celdas rellenadas quedan con
+    _RELLENADA, que no es una máscara válida."""
+    desplazamiento_idx = (-width, 1, width, -1)
+    cola = [idx for idx in candidatas if idx not in conservar]
+    rellenadas = []
+    while cola:
+        idx = cola.pop()
+        mascara = mascaras[idx]
+        if mascara == _RELLENADA: continue # Llegó a la cola con grado 1 y luego con grado 0
+        rellenadas.append(idx)
+        mascaras[idx] = _RELLENADA
+        for dir_idx in range(4):
+            if not mascara >> dir_idx & 1: continue
+            idx_next = idx + desplazamiento_idx[dir_idx]
+            mascaras[idx_next] &= ~(1 << (dir_idx ^ 2))
+            if _GRADO_MASCARA[mascaras[idx_next]] <= 1 and idx_next not in conservar:
+                cola.append(idx_next)
+    return rellenadas
+
+def _reconstruir_camino(nodo, celdas, padres, width):
+    """Construye la lista de coordenadas de un nodo siguiendo los punteros al padre (-1 en la raíz)."""
+    camino = []
+    while nodo != -1:
+        camino.append(divmod(celdas[nodo], width))
+        nodo = padres[nodo]
+    camino.reverse()
+    return camino
+
+def _mover_marca(en_camino, celdas, padres, profundidades, marcado, destino):
+    """Cambia las marcas de `en_camino` del camino del nodo `marcado` al del nodo `destino`, tocando solo
+    las celdas por debajo de su ancestro común. Devuelve `destino`, que pasa a ser el nodo marcado."""
+    pendientes = []
+    while profundidades[marcado] > profundidades[destino]:
+        en_camino[celdas[marcado]] = 0; marcado = padres[marcado]
+    nodo = destino
+    while profundidades[nodo] > profundidades[marcado]:
+        pendientes.append(celdas[nodo]); nodo = padres[nodo]
+    while marcado != nodo:
+        en_camino[celdas[marcado]] = 0; marcado = padres[marcado]
+        pendientes.append(celdas[nodo]); nodo = padres[nodo]
+    for idx in pendientes: en_camino[idx] = 1
+    return destino
 
+# --- Huellas de caminos ---
+# Hash polinomial (Horner) módulo el primo de Mersenne 2^61-1 sobre un código por celda. Se extiende en
+# O(1) al agregar una celda (h' = h*BASE + código), así que los buscadores la llevan al día mientras
+# construyen el camino y descartan repetidos sin materializar coordenadas ni hashear tuplas completas.
+MOD_HUELLA = (1 << 61) - 1
+BASE_HUELLA = 0x1B873593A2C3F5D
+HUELLA_VACIA = 0
+
+def codigo_celda(r, c):
+    return (r << 20 | c) + 1
+
+def huella_camino(camino_coordenadas):
+    huella = HUELLA_VACIA
+    for r, c in camino_coordenadas:
+        huella = (huella * BASE_HUELLA + (r << 20 | c) + 1) % MOD_HUELLA
+    return huella
+
+def _codigos_por_idx(height, width):
+    return [codigo_celda(r, c) for r in range(height) for c in range(width)]
+
+class ConjuntoCaminos:
+    """Conjunto de caminos indexado por huella. Guarda referencias a los caminos (no copias en tuplas) y
+    solo los compara celda a celda cuando dos huellas coinciden. `camino in conjunto` funciona con
+    listas o tuplas de coordenadas; los buscadores usan contiene(huella, construir) para no armar el
+    camino salvo cuando su huella ya está. En las métricas, 'huellas.coincidencias' cuenta las veces que
+    hubo que comparar y 'huellas.colisiones' solo las que la huella coincidía con un camino distinto."""
+
+    def __init__(self, caminos=()):
+        self._por_huella = {}
+        self._cantidad = 0
+        for camino in caminos: self.add(camino)
+
+    @classmethod
+    def desde(cls, caminos):
+        """Devuelve `caminos` si ya es un ConjuntoCaminos; si no (p. ej. un set de tuplas), lo convierte."""
+        return caminos if isinstance(caminos, cls) else cls(caminos or ())
+
+    def add(self, camino, huella=None):
+        if huella is None: huella = huella_camino(camino)
+        iguales = self._por_huella.setdefault(huella, [])
+        if iguales:
+            metricas.contar('huellas.coincidencias')
+            if any(_mismo_camino(otro, camino) for otro in iguales): return
+            metricas.contar('huellas.colisiones')
+        iguales.append(camino)
+        self._cantidad += 1
+
+    def contiene(self, huella, camino):
+        """`camino` puede ser el camino o una función que lo construye; solo se usa si la huella ya está."""
+        iguales = self._por_huella.get(huella)
+        if not iguales: return False
+        metricas.contar('huellas.coincidencias')
+        if callable(camino):
+            camino = camino()
+            metricas.contar('caminos.copias')
+        if any(_mismo_camino(otro, camino) for otro in iguales): return True
+        metricas.contar('huellas.colisiones')
+        return False
+
+    def __contains__(self, camino):
+        return self.contiene(huella_camino(camino), camino)
+
+    def __len__(self):
+        return self._cantidad
+
+    def __iter__(self):
+        for iguales in self._por_huella.values(): yield from iguales
+
+def _mismo_camino(a, b):
+    return len(a) == len(b) and all(map(operator.eq, a, b))
+
+@metricas.medido('dfs')
 def encontrar_N_caminos_dfs(laberinto_num, inicio, fin, height, width, N_caminos_max, caminos_existentes_coords_set):
+    # DFS con retroceso: un único camino compartido y un bytearray de pertenencia (O(1)) en lugar de
+    # copiar el camino parcial en cada push. Los vecinos se recorren en orden inverso para reproducir
+    # el orden LIFO de la pila original. Si hay caminos existentes, la huella de cada prefijo se lleva
+    # en una pila paralela y un repetido se descarta al llegar a E sin construir sus coordenadas.
     caminos_encontrados_dfs = []
-    laberinto_transitable = [list(fila) for fila in laberinto_num]
-    if laberinto_transitable[inicio[0]][inicio[1]] == START: laberinto_transitable[inicio[0]][inicio[1]] = PATH
-    if laberinto_transitable[fin[0]][fin[1]] == END: laberinto_transitable[fin[0]][fin[1]] = PATH
-    pila = collections.deque([(inicio, [inicio])]) 
+    vistos = ConjuntoCaminos.desde(caminos_existentes_coords_set)
+    vecinos = _construir_vecinos(laberinto_num, height, width)
+    inicio_idx = inicio[0] * width + inicio[1]
+    fin_idx = fin[0] * width + fin[1]
+    if inicio_idx == fin_idx:
+        if [inicio] not in vistos: caminos_encontrados_dfs.append([inicio])
+        return caminos_encontrados_dfs
+    en_camino = bytearray(height * width)
+    en_camino[inicio_idx] = 1
+    camino_idx = [inicio_idx]
+    codigos = _codigos_por_idx(height, width) if vistos else None
+    huellas = [codigos[inicio_idx]] if vistos else None
+    nodos = 1
+
+    def camino_actual():
+        camino = [divmod(idx, width) for idx in camino_idx]; camino.append(fin)
+        return camino
+
+    pila = [reversed(vecinos[inicio_idx])]
     while pila:
-        (r_curr, c_curr), camino_parcial = pila.pop()
-        if (r_curr, c_curr) == fin:
-            camino_tuple = tuple(camino_parcial)
-            if camino_tuple not in caminos_existentes_coords_set:
-                caminos_encontrados_dfs.append(list(camino_parcial))
-                if len(caminos_encontrados_dfs) >= N_caminos_max: return caminos_encontrados_dfs
-            continue 
-        for dr_char in NEIGHBOR_ORDER_global:
-            dr, dc = DIRECTIONS_map[dr_char]
-            nr_next, nc_next = r_curr + dr, c_curr + dc
-            if 0 <= nr_next < height and 0 <= nc_next < width and \
-               laberinto_transitable[nr_next][nc_next] != WALL and \
-               (nr_next, nc_next) not in camino_parcial: 
-                nuevo_camino_parcial = list(camino_parcial); nuevo_camino_parcial.append((nr_next, nc_next))
-                pila.append(((nr_next, nc_next), nuevo_camino_parcial))
+        for idx_next in pila[-1]:
+            if not en_camino[idx_next]: break
+        else:
+            pila.pop(); en_camino[camino_idx.pop()] = 0
+            if huellas is not None: huellas.pop()
+            continue
+        if idx_next == fin_idx:
+            if huellas is None or not vistos.contiene((huellas[-1] * BASE_HUELLA + codigos[fin_idx]) % MOD_HUELLA, camino_actual):
+                caminos_encontrados_dfs.append(camino_actual())
+                if len(caminos_encontrados_dfs) >= N_caminos_max: break
+            else: metricas.contar('dfs.duplicados')
+            continue
+        nodos += 1
+        en_camino[idx_next] = 1
+        camino_idx.append(idx_next)
+        if huellas is not None: huellas.append((huellas[-1] * BASE_HUELLA + codigos[idx_next]) % MOD_HUELLA)
+        pila.append(reversed(vecinos[idx_next]))
+    if metricas.ACTIVAS is not None:
+        metricas.ACTIVAS.sumar('dfs.nodos', nodos)
+        metricas.ACTIVAS.sumar('caminos.copias', len(caminos_encontrados_dfs))
     return caminos_encontrados_dfs
 
+@metricas.medido('bfs')
 def encontrar_N_caminos_bfs(laberinto_num, inicio, fin, height, width, N_caminos_max, caminos_existentes_coords_set):
+    # Cada camino parcial es un nodo (entero) con su celda, su padre y su profundidad guardados en arrays
+    # paralelos, así que los prefijos se comparten. La cola queda en orden lexicográfico, de modo que la
+    # marca de pertenencia solo se mueve entre nodos consecutivos hasta su ancestro común. Si hay caminos
+    # existentes, cada nodo guarda además la huella de su prefijo.
     caminos_encontrados_bfs = []
-    laberinto_transitable = [list(fila) for fila in laberinto_num]
-    if laberinto_transitable[inicio[0]][inicio[1]] == START: laberinto_transitable[inicio[0]][inicio[1]] = PATH
-    if laberinto_transitable[fin[0]][fin[1]] == END: laberinto_transitable[fin[0]][fin[1]] = PATH
-    queue = collections.deque([(inicio, [inicio])])
+    vistos = ConjuntoCaminos.desde(caminos_existentes_coords_set)
+    vecinos = _construir_vecinos(laberinto_num, height, width)
+    inicio_idx = inicio[0] * width + inicio[1]
+    fin_idx = fin[0] * width + fin[1]
+    en_camino = bytearray(height * width)
+    celdas = array.array('l', [inicio_idx]); padres = array.array('l', [-1]); profundidades = array.array('l', [0])
+    codigos = _codigos_por_idx(height, width) if vistos else None
+    huellas = array.array('Q', [codigos[inicio_idx]]) if vistos else None
+    en_camino[inicio_idx] = 1
+    marcado = 0
+    queue = collections.deque([0])
+    while queue:
+        nodo = queue.popleft()
+        marcado = _mover_marca(en_camino, celdas, padres, profundidades, marcado, nodo)
+        profundidad_hijo = profundidades[nodo] + 1
+        for idx_next in vecinos[celdas[nodo]]:
+            if en_camino[idx_next]: continue
+            if idx_next == fin_idx:
+                construir = lambda: _reconstruir_camino(nodo, celdas, padres, width) + [fin]
+                if huellas is None or not vistos.contiene((huellas[nodo] * BASE_HUELLA + codigos[fin_idx]) % MOD_HUELLA, construir):
+                    caminos_encontrados_bfs.append(construir())
+                    if len(caminos_encontrados_bfs) >= N_caminos_max:
+                        queue.clear(); break
+                else: metricas.contar('bfs.duplicados')
+            else:
+                queue.append(len(celdas))
+                celdas.append(idx_next); padres.append(nodo); profundidades.append(profundidad_hijo)
+                if huellas is not None: huellas.append((huellas[nodo] * BASE_HUELLA + codigos[idx_next]) % MOD_HUELLA)
+    if metricas.ACTIVAS is not None:
+        metricas.ACTIVAS.sumar('bfs.nodos', len(celdas))
+        metricas.ACTIVAS.sumar('caminos.copias', len(caminos_encontrados_bfs))
+        metricas.ACTIVAS.maximo('bfs.frontera', _pico_cola(padres))
+    return caminos_encontrados_bfs
+
+def _pico_cola(padres):
+    """Tamaño máximo que alcanzó la cola de un BFS cuyos nodos se crearon en orden con estos padres: al
+    sacar el nodo n la cola tiene los creados hasta entonces menos los n ya sacados. Solo para métricas."""
+    hijos = collections.Counter(padres)
+    creados, pico = 1, 0
+    for nodo in range(len(padres)):
+        if creados - nodo > pico: pico = creados - nodo
+        creados += hijos[nodo]
+    return pico
+
+def _distancias_bfs(vecinos, origen_idx):
+    """Distancia en pasos desde `origen_idx` a cada celda (-1 si no es alcanzable)."""
+    distancias = array.array('l', [-1]) * len(vecinos)
+    distancias[origen_idx] = 0
+    queue = collections.deque([origen_idx])
+    while queue:
+        idx = queue.popleft()
+        d_sig = distancias[idx] + 1
+        for idx_next in vecinos[idx]:
+            if distancias[idx_next] == -1:
+                distancias[idx_next] = d_sig
+                queue.append(idx_next)
+    return distancias
+
+def _celdas_con_borde(laberinto_num, height, width):
+    """Bytes del laberinto numérico con un borde de muros, fila a fila de width+2 (como LaberintoGrid.datos):
+    los vecinos de una celda interior son siempre ±1 y ±(width+2) sin comprobar límites."""
+    datos = getattr(laberinto_num, 'datos', None)
+    if datos is not None: return datos.tobytes()
+    muro = bytes([WALL])
+    fila_muros = muro * (width + 2)
+    return fila_muros + b''.join(muro + bytes(fila) + muro for fila in laberinto_num) + fila_muros
+
+@metricas.medido('bfs_bidireccional')
+def _bfs_bidireccional(laberinto_num, inicio, fin, height, width):
+    """BFS por niveles desde `inicio` y desde `fin` a la vez, expandiendo siempre el frente más chico y
+    parando en cuanto se tocan. Devuelve (padres desde inicio, padres desde fin, celda de encuentro,
+    distancia) en índices del laberinto con borde, o None si no hay camino.
+
+    El primer encuentro ya es óptimo: un nodo del frente que se expande nunca fue visitado por el otro
+    lado (se habría detectado al descubrirlo), así que el vecino que toca está en el frente actual del
+    otro lado y todos los encuentros de este nivel dan la misma distancia."""
+    ancho_borde = width + 2
+    celdas = _celdas_con_borde(laberinto_num, height, width)
+    inicio_idx = (inicio[0] + 1) * ancho_borde + inicio[1] + 1
+    fin_idx = (fin[0] + 1) * ancho_borde + fin[1] + 1
+    if celdas[inicio_idx] == WALL or celdas[fin_idx] == WALL: return None
+    desplazamientos = [DIRECTIONS_map[d][0] * ancho_borde + DIRECTIONS_map[d][1] for d in NEIGHBOR_ORDER_global]
+    padres = (array.array('l', [-1]) * len(celdas), array.array('l', [-1]) * len(celdas))
+    padres[0][inicio_idx] = inicio_idx; padres[1][fin_idx] = fin_idx # La raíz es su propio padre
+    if inicio_idx == fin_idx: return padres[0], padres[1], inicio_idx, 0
+    frentes = [[inicio_idx], [fin_idx]]
+    niveles = [0, 0]
+    while frentes[0] and frentes[1]:
+        lado = 0 if len(frentes[0]) <= len(frentes[1]) else 1
+        propios, otros = padres[lado], padres[1 - lado]
+        siguiente = []
+        for idx in frentes[lado]:
+            for d in desplazamientos:
+                idx_next = idx + d
+                if propios[idx_next] != -1 or celdas[idx_next] == WALL: continue
+                propios[idx_next] = idx
+                if otros[idx_next] != -1:
+                    return padres[0], padres[1], idx_next, niveles[0] + niveles[1] + 1
+                siguiente.append(idx_next)
+        frentes[lado] = siguiente
+        niveles[lado] += 1
+        if metricas.ACTIVAS is not None:
+            metricas.ACTIVAS.sumar('bfs_bidireccional.nodos', len(siguiente))
+            metricas.ACTIVAS.maximo('bfs_bidireccional.frontera', len(siguiente))
+    return None
+
+@metricas.medido('camino_mas_corto')
+def encontrar_camino_mas_corto(laberinto_num, inicio, fin, height, width):
+    """Camino más corto en celdas con BFS bidireccional (arrays de padres, sin copiar caminos), o None si
+    no hay. Con empates en longitud puede elegir un camino distinto al del primer BFS de
+    encontrar_N_caminos_bfs."""
+    resultado = _bfs_bidireccional(laberinto_num, inicio, fin, height, width)
+    if resultado is None: return None
+    padres_inicio, padres_fin, encuentro, _ = resultado
+    ancho_borde = width + 2
+    mitad_inicio = [encuentro]
+    while padres_inicio[mitad_inicio[-1]] != mitad_inicio[-1]:
+        mitad_inicio.append(padres_inicio[mitad_inicio[-1]])
+    mitad_inicio.reverse()
+    idx = encuentro
+    while padres_fin[idx] != idx:
+        idx = padres_fin[idx]
+        mitad_inicio.append(idx)
+    return [(idx // ancho_borde - 1, idx % ancho_borde - 1) for idx in mitad_inicio]
+
+def distancia_mas_corta(laberinto_num, inicio, fin, height, width):
+    """Pasos del camino más corto de inicio a fin (celdas - 1), o -1 si no hay camino."""
+    resultado = _bfs_bidireccional(laberinto_num, inicio, fin, height, width)
+    return -1 if resultado is None else resultado[3]
+
+def _podar_callejones(vecinos, conservar):
+    """Quita de la adyacencia las celdas de grado 1 (y las que quedan así al quitarlas), salvo `conservar`."""
+    vecinos = list(vecinos)
+    grado = [len(v) for v in vecinos]
+    queue = collections.deque(idx for idx, g in enumerate(grado) if g == 1 and idx not in conservar)
+    eliminadas = set()
     while queue:
-        (r_curr, c_curr), camino_parcial = queue.popleft()
-        for dr_char in NEIGHBOR_ORDER_global:
-            dr, dc = DIRECTIONS_map[dr_char]
-            nr_next, nc_next = r_curr + dr, c_curr + dc
-            if 0 <= nr_next < height and 0 <= nc_next < width and \
-               laberinto_transitable[nr_next][nc_next] != WALL and \
-               (nr_next, nc_next) not in camino_parcial:
-                nuevo_camino_parcial = list(camino_parcial); nuevo_camino_parcial.append((nr_next, nc_next))
-                if (nr_next, nc_next) == fin:
-                    camino_tuple = tuple(nuevo_camino_parcial)
-                    if camino_tuple not in caminos_existentes_coords_set:
-                        caminos_encontrados_bfs.append(nuevo_camino_parcial)
-                        if len(caminos_encontrados_bfs) >= N_caminos_max: return caminos_encontrados_bfs
+        idx = queue.popleft()
+        eliminadas.add(idx)
+        for idx_next in vecinos[idx]:
+            if idx_next in eliminadas: continue
+            grado[idx_next] -= 1
+            if grado[idx_next] == 1 and idx_next not in conservar: queue.append(idx_next)
+        vecinos[idx] = ()
+    if eliminadas:
+        for idx, vecinos_celda in enumerate(vecinos):
+            if vecinos_celda and any(v in eliminadas for v in vecinos_celda):
+                vecinos[idx] = tuple(v for v in vecinos_celda if v not in eliminadas)
+    return vecinos
+
+def _buscar_desvio(vecinos, dist_fin, spur_idx, fin_idx, marca, sello, prohibidos):
+    """A* desde `spur_idx` hasta `fin_idx` sin pisar celdas con `marca == sello` ni salir del spur por
+    `prohibidos`. La heurística es la distancia exacta al fin en el laberinto completo (árbol BFS inverso).
+    En una cuadrícula cada paso cambia esa distancia en ±1, así que f solo sube de 2 en 2 y bastan dos
+    pilas (capa actual y siguiente) en lugar de un heap; dentro de la capa se avanza en profundidad, y
+    si el camino del árbol está libre se sigue sin expandir nada más. Devuelve (desvío o None, celdas
+    expandidas)."""
+    padres = {}
+    pila = [(spur_idx, -1)]
+    siguiente = []
+    while pila or siguiente:
+        if not pila:
+            pila, siguiente = siguiente, pila
+            pila.reverse()
+        idx, padre = pila.pop()
+        if idx in padres: continue
+        padres[idx] = padre
+        if idx == fin_idx:
+            desvio = []
+            while idx != -1:
+                desvio.append(idx); idx = padres[idx]
+            desvio.reverse()
+            return desvio, len(padres)
+        h = dist_fin[idx]
+        for idx_next in reversed(vecinos[idx]):
+            if marca[idx_next] == sello or idx_next in padres: continue
+            if idx == spur_idx and idx_next in prohibidos: continue
+            h_next = dist_fin[idx_next]
+            if h_next < 0: continue
+            if h_next < h: pila.append((idx_next, idx))
+            else: siguiente.append((idx_next, idx))
+    return None, len(padres)
+
+_GIROS_ENTRE = (0, 1, 2, 1) # Giros de 90° entre dos orientaciones, por (nueva - actual) % 4
+
+def _tiempos_hasta_fin(vecinos, fin_idx, costos, width):
+    """Dijkstra inverso sobre estados (celda, orientación de llegada): tiempos[idx*4 + d] es el costo
+    mínimo para llegar a `fin_idx` desde idx mirando hacia d, con `costos` = (costo_paso, costo_giro),
+    o -1 si no se llega. Es la heurística exacta (sin prefijos marcados) de _buscar_desvio_tiempo."""
+    costo_paso, costo_giro = costos
+    desplazamiento_idx = (-width, 1, width, -1)
+    tiempos = array.array('q', [-1]) * (4 * len(vecinos))
+    heap = [(0, fin_idx * 4 + d) for d in range(4)]
+    while heap:
+        t, estado = heapq.heappop(heap)
+        if tiempos[estado] >= 0: continue
+        tiempos[estado] = t
+        idx, dir_salida = estado >> 2, estado & 3
+        # Quien llega a idx avanzando hacia dir_salida sale de idx_previo con cualquier orientación d
+        idx_previo = idx - desplazamiento_idx[dir_salida]
+        if idx_previo not in vecinos[idx]: continue
+        t_paso = t + costo_paso
+        for d in range(4):
+            estado_previo = idx_previo * 4 + d
+            if tiempos[estado_previo] < 0:
+                heapq.heappush(heap, (t_paso + costo_giro * _GIROS_ENTRE[(dir_salida - d) % 4], estado_previo))
+    return tiempos
+
+def _buscar_desvio_tiempo(vecinos, tiempos_fin, spur_idx, dir_llegada, fin_idx, marca, sello, prohibidos, costos, width):
+    """Como _buscar_desvio pero minimizando el tiempo: A* sobre estados (celda, orientación) como
+    encontrar_camino_tiempo_minimo, partiendo de `spur_idx` con orientación `dir_llegada` (-1: sin
+    orientación, el primer avance no gira). La heurística es _tiempos_hasta_fin. El spur no se vuelve a
+    pisar; con eso el mejor recorrido ya es un camino simple (cortar un lazo siempre ahorra pasos sin
+    sumar giros). Devuelve (desvío o None, costo del desvío, estados expandidos)."""
+    costo_paso, costo_giro = costos
+    direccion = {-width: 0, 1: 1, width: 2, -1: 3}
+    inicial = -1 # El estado inicial no tiene orientación propia: se expande aparte
+    g = {}
+    padres = {}
+    heap = []
+    for idx_next in vecinos[spur_idx]:
+        if marca[idx_next] == sello or idx_next in prohibidos: continue
+        dir_idx = direccion[idx_next - spur_idx]
+        estado_next = idx_next * 4 + dir_idx
+        if tiempos_fin[estado_next] < 0: continue
+        g_next = costo_paso + (0 if dir_llegada < 0 else costo_giro * _GIROS_ENTRE[(dir_idx - dir_llegada) % 4])
+        g[estado_next] = g_next; padres[estado_next] = inicial
+        heapq.heappush(heap, (g_next + tiempos_fin[estado_next], g_next, estado_next))
+    cerrados = set()
+    while heap:
+        _, g_actual, estado = heapq.heappop(heap)
+        if estado in cerrados: continue
+        cerrados.add(estado)
+        idx, dir_actual = estado >> 2, estado & 3
+        if idx == fin_idx:
+            desvio = []
+            while estado != inicial:
+                desvio.append(estado >> 2); estado = padres[estado]
+            desvio.append(spur_idx)
+            desvio.reverse()
+            return desvio, g_actual, len(cerrados)
+        for idx_next in vecinos[idx]:
+            if idx_next == spur_idx or marca[idx_next] == sello: continue
+            dir_idx = direccion[idx_next - idx]
+            estado_next = idx_next * 4 + dir_idx
+            if estado_next in cerrados or tiempos_fin[estado_next] < 0: continue
+            g_next = g_actual + costo_paso + costo_giro * _GIROS_ENTRE[(dir_idx - dir_actual) % 4]
+            if g_next < g.get(estado_next, g_next + 1):
+                g[estado_next] = g_next; padres[estado_next] = estado
+                heapq.heappush(heap, (g_next + tiempos_fin[estado_next], g_next, estado_next))
+    return None, None, len(cerrados)
+
+class IteradorCaminos:
+    """Caminos simples distintos de inicio a fin, en orden no decreciente de costo, calculados de a uno
+    a medida que se piden (Yen/Lawler perezoso celda por celda).
+
+    Cada camino aceptado recuerda de qué camino se desvió y en qué índice, así que los prefijos comunes
+    y las aristas ya usadas desde cada prefijo se consultan sin recalcular. Los desvíos candidatos se
+    evalúan de forma perezosa: entran al heap con una cota inferior (prefijo + 1 + distancia del árbol
+    BFS inverso) y solo se calcula el A* del desvío cuando la cota llega al frente del heap. Para el
+    orden por longitud k_caminos_mas_cortos es varias veces más rápido (Yen sobre el grafo de cruces);
+    este iterador es el que se usa para ordenar por tiempo, porque el costo de los giros depende de la
+    celda por la que se entra y se sale de cada cruce.
+
+    `orden` 'longitud' cuenta celdas; 'tiempo' usa el costo de encontrar_camino_tiempo_minimo (avances
+    y giros de `modelo`), que ordena igual que estimar_tiempo_instrucciones_ms. `tiempo_limite_s` y
+    `max_nodos` (celdas o estados expandidos) son presupuestos opcionales: se revisan entre una búsqueda
+    de desvío y la siguiente, y cada búsqueda es lineal en el tamaño del laberinto, así que la iteración
+    termina aunque el laberinto tenga una cantidad enorme de caminos. Al terminar, `motivo_fin` dice
+    por qué: 'agotado' (no hay más caminos), 'tiempo_agotado' o 'nodos_agotados'."""
+
+    def __init__(self, laberinto_num, inicio, fin, height, width, orden='longitud', modelo=None,
+                 tiempo_limite_s=None, max_nodos=None):
+        if orden not in ('longitud', 'tiempo'):
+            raise ValueError(f"Orden desconocido: {orden}. Use 'longitud' o 'tiempo'.")
+        self.orden = orden
+        self.tiempo_limite_s = tiempo_limite_s
+        self.max_nodos = max_nodos
+        self.nodos_expandidos = 0
+        self.motivo_fin = None
+        if orden == 'tiempo':
+            modelo = modelo or MODELO_MOVIMIENTO
+            self._costos = (modelo['avance_ms'] + modelo['pausa_ms'], modelo['giro_ms'] + modelo['pausa_ms'])
+        else:
+            self._costos = (1, 0)
+        self._generador = self._generar(laberinto_num, inicio, fin, height, width)
+
+    def __iter__(self):
+        return self
+
+    @metricas.medido('iterar_caminos')
+    def __next__(self):
+        return next(self._generador)
+
+    def _sin_presupuesto(self, inicio_t):
+        if self.max_nodos is not None and self.nodos_expandidos >= self.max_nodos:
+            self.motivo_fin = 'nodos_agotados'
+        elif self.tiempo_limite_s is not None and time.perf_counter() - inicio_t >= self.tiempo_limite_s:
+            self.motivo_fin = 'tiempo_agotado'
+        return self.motivo_fin is not None
+
+    def _generar(self, laberinto_num, inicio, fin, height, width):
+        inicio_t = time.perf_counter()
+        if height == 0:
+            self.motivo_fin = 'agotado'
+            return
+        costo_paso, costo_giro = self._costos
+        por_tiempo = self.orden == 'tiempo'
+        vecinos = _construir_vecinos(laberinto_num, height, width)
+        inicio_idx = inicio[0] * width + inicio[1]
+        fin_idx = fin[0] * width + fin[1]
+        # Un callejón sin salida nunca forma parte de un camino simple: se poda antes de buscar.
+        vecinos = _podar_callejones(vecinos, (inicio_idx, fin_idx))
+        dist_fin = _distancias_bfs(vecinos, fin_idx)
+        if dist_fin[inicio_idx] < 0:
+            self.motivo_fin = 'agotado'
+            return
+        if por_tiempo:
+            tiempos_fin = _tiempos_hasta_fin(vecinos, fin_idx, self._costos, width)
+            self.nodos_expandidos += len(vecinos)
+            metricas.contar('iterar.nodos', len(vecinos))
+        direccion = {-width: 0, 1: 1, width: 2, -1: 3}
+        marca = array.array('l', [0]) * len(vecinos)
+        sello = 0
+
+        def costo_paso_desde(anterior, idx, idx_next):
+            # Costo de avanzar de idx a idx_next habiendo llegado a idx desde `anterior` (-1: inicio)
+            if anterior < 0 or not costo_giro: return costo_paso
+            return costo_paso + costo_giro * _GIROS_ENTRE[(direccion[idx_next - idx] - direccion[idx - anterior]) % 4]
+
+        def cota_resto(idx, idx_next):
+            # Cota inferior (exacta sin prefijo marcado) del costo desde idx_next hasta el fin
+            if por_tiempo: return tiempos_fin[idx_next * 4 + direccion[idx_next - idx]]
+            return dist_fin[idx_next] * costo_paso
+
+        if por_tiempo:
+            sello += 1
+            primero, _, expandidos = _buscar_desvio_tiempo(vecinos, tiempos_fin, inicio_idx, -1, fin_idx, marca, sello, (), self._costos, width)
+            self.nodos_expandidos += expandidos
+            metricas.contar('iterar.nodos', expandidos)
+        else:
+            # Camino más corto: descenso directo por el árbol BFS inverso.
+            primero = [inicio_idx]
+            while primero[-1] != fin_idx:
+                d_sig = dist_fin[primero[-1]] - 1
+                primero.append(next(v for v in vecinos[primero[-1]] if dist_fin[v] == d_sig))
+
+        caminos = []           # caminos aceptados como listas de índices
+        costos_prefijo = []    # costos_prefijo[id][i]: costo de caminos[id][0..i]
+        origen_desvio = []     # (id del camino padre, índice de desvío) de cada camino aceptado
+        desvios = {}           # (id del dueño del prefijo, i) -> celdas siguientes ya usadas desde ese prefijo
+        aceptados = set()
+        heap = []
+        contador = 0
+
+        def duenio_prefijo(id_camino, i):
+            # El prefijo camino[0..i] pertenece al primer camino aceptado que lo contiene.
+            while origen_desvio[id_camino][0] != -1 and i <= origen_desvio[id_camino][1]:
+                id_camino = origen_desvio[id_camino][0]
+            return id_camino
+
+        def prohibidos_en(id_camino, i):
+            duenio = duenio_prefijo(id_camino, i)
+            prohibidos = set(desvios.get((duenio, i), ()))
+            prohibidos.add(caminos[duenio][i + 1])
+            return prohibidos
+
+        def aceptar(camino, id_padre, i_desvio):
+            nonlocal sello, contador
+            id_camino = len(caminos)
+            acumulado = [0]
+            for j in range(1, len(camino)):
+                acumulado.append(acumulado[-1] + costo_paso_desde(camino[j - 2] if j > 1 else -1, camino[j - 1], camino[j]))
+            caminos.append(camino); costos_prefijo.append(acumulado)
+            origen_desvio.append((id_padre, i_desvio)); aceptados.add(tuple(camino))
+            if id_padre != -1:
+                desvios.setdefault((duenio_prefijo(id_padre, i_desvio), i_desvio), set()).add(camino[i_desvio + 1])
+            # Cotas inferiores de cada desvío posible, marcando el prefijo de forma incremental.
+            sello += 1
+            for idx in camino[:i_desvio]: marca[idx] = sello
+            for i in range(i_desvio, len(camino) - 1):
+                spur_idx = camino[i]
+                anterior = camino[i - 1] if i > 0 else -1
+                prohibidos = prohibidos_en(id_camino, i)
+                cota = None
+                for idx_next in vecinos[spur_idx]:
+                    if marca[idx_next] == sello or idx_next in prohibidos or dist_fin[idx_next] < 0: continue
+                    cota_next = costo_paso_desde(anterior, spur_idx, idx_next) + cota_resto(spur_idx, idx_next)
+                    if cota is None or cota_next < cota: cota = cota_next
+                if cota is not None:
+                    contador += 1
+                    heapq.heappush(heap, (acumulado[i] + cota, contador, id_camino, i, None))
+                marca[spur_idx] = sello
+            if metricas.ACTIVAS is not None:
+                metricas.ACTIVAS.sumar('iterar.caminos')
+                metricas.ACTIVAS.sumar('caminos.copias')
+                metricas.ACTIVAS.maximo('iterar.frontera', len(heap))
+            return [divmod(idx, width) for idx in camino]
+
+        yield aceptar(primero, -1, 0)
+        while heap:
+            if self._sin_presupuesto(inicio_t): return
+            costo, _, id_camino, i, candidato = heapq.heappop(heap)
+            if candidato is not None and tuple(candidato) in aceptados:
+                candidato = None
+                metricas.contar('iterar.duplicados')
+            if candidato is None:
+                camino = caminos[id_camino]
+                sello += 1
+                for idx in camino[:i]: marca[idx] = sello
+                if por_tiempo:
+                    anterior = camino[i - 1] if i > 0 else -1
+                    dir_llegada = direccion[camino[i] - anterior] if anterior >= 0 else -1
+                    desvio, costo_desvio, expandidos = _buscar_desvio_tiempo(vecinos, tiempos_fin, camino[i], dir_llegada, fin_idx,
+                                                                             marca, sello, prohibidos_en(id_camino, i), self._costos, width)
                 else:
-                    queue.append(((nr_next, nc_next), nuevo_camino_parcial))
-    return caminos_encontrados_bfs 
+                    desvio, expandidos = _buscar_desvio(vecinos, dist_fin, camino[i], fin_idx, marca, sello, prohibidos_en(id_camino, i))
+                    costo_desvio = len(desvio) - 1 if desvio is not None else None
+                self.nodos_expandidos += expandidos
+                if metricas.ACTIVAS is not None:
+                    metricas.ACTIVAS.sumar('iterar.desvios')
+                    metricas.ACTIVAS.sumar('iterar.nodos', expandidos)
+                if desvio is None: continue
+                candidato = camino[:i] + desvio
+                metricas.contar('caminos.copias')
+                costo_candidato = costos_prefijo[id_camino][i] + costo_desvio
+                if costo_candidato > costo:
+                    metricas.contar('iterar.reencolados')
+                    contador += 1
+                    heapq.heappush(heap, (costo_candidato, contador, id_camino, i, candidato))
+                    continue
+            yield aceptar(candidato, id_camino, i)
+        self.motivo_fin = 'agotado'
+
+def iterar_caminos(laberinto_num, inicio, fin, height, width, orden='longitud', modelo=None, tiempo_limite_s=None, max_nodos=None):
+    """Iterador perezoso de caminos simples en orden de `orden` ('longitud' o 'tiempo'): se toman con
+    next() o itertools.islice y solo se calcula lo que se consume. Ver IteradorCaminos."""
+    return IteradorCaminos(laberinto_num, inicio, fin, height, width, orden, modelo, tiempo_limite_s, max_nodos)
+
+def k_caminos_mas_cortos(laberinto_num, inicio, fin, k):
+    """Devuelve hasta k caminos simples de inicio a fin en orden no decreciente de longitud (Yen/Lawler).
+
+    Comprime el laberinto en el grafo de cruces y corre Yen sobre los pasillos
+    (laberinth_graph.k_caminos_mas_cortos_grafo): con k=50 en laberintos trenzados de 301x301 tarda
+    entre 0.3 y 0.9 s contando la construcción del grafo y la expansión a celdas, contra 0.4-2.7 s del
+    Yen celda por celda. Las longitudes son las mismas; el Yen por celdas (IteradorCaminos) queda solo
+    para ordenar por tiempo, donde los giros hacen que el costo no sea el de los pasillos."""
+    if k <= 0: return []
+    import laberinth_graph # Import diferido: laberinth_graph importa de este módulo
+    height = len(laberinto_num)
+    width = len(laberinto_num[0]) if height > 0 else 0
+    grafo = laberinth_graph.construir_grafo_cruces(laberinto_num, inicio, fin, height, width)
+    return [laberinth_graph.expandir_camino(grafo, camino) for camino in laberinth_graph.k_caminos_mas_cortos_grafo(grafo, k)]
+
+@metricas.medido('comprimir_instrucciones')
+def comprimir_instrucciones(instrucciones_str):
+    """Codifica una secuencia F/R/L en formato RLE: cada comando va seguido de sus repeticiones si son
+    más de una ('FFFFRFFRRF' -> 'F4RF2R2F'). version_arduino.ino la expande al ejecutar, así que
+    cabe en MAX_LONGITUD_EEPROM una ruta varias veces más larga."""
+    partes = []
+    for comando, grupo in itertools.groupby(instrucciones_str):
+        repeticiones = sum(1 for _ in grupo)
+        partes.append(comando if repeticiones == 1 else f"{comando}{repeticiones}")
+    return "".join(partes)
+
+def expandir_instrucciones(instrucciones_str):
+    """Inverso de comprimir_instrucciones. Una secuencia sin números queda igual, y una cuenta 0 vale 1
+    como en el sketch."""
+    return re.sub(r'([A-Za-z])(\d+)', lambda m: m.group(1) * max(1, int(m.group(2))), instrucciones_str)
+
+def estimar_tiempo_instrucciones_ms(instrucciones_str, modelo=None):
+    """Tiempo de ejecución estimado de una secuencia F/R/L (normal o RLE) según el modelo de movimiento."""
+    modelo = modelo or MODELO_MOVIMIENTO
+    instrucciones_str = expandir_instrucciones(instrucciones_str)
+    estimated_time_ms = 0
+    for i, char_command in enumerate(instrucciones_str):
+        if char_command.upper() == 'F':
+            estimated_time_ms += modelo['avance_ms']
+        elif char_command.upper() == 'R' or char_command.upper() == 'L':
+            estimated_time_ms += modelo['giro_ms']
+        if i < len(instrucciones_str) - 1: # No hay pausa después del último comando
+            estimated_time_ms += modelo['pausa_ms']
+    return estimated_time_ms
+
+@metricas.medido('tiempo_minimo')
+def encontrar_camino_tiempo_minimo(laberinto_num, inicio, fin, height, width, modelo=None):
+    """A* sobre estados (celda, orientación) con costos del modelo de movimiento: devuelve el camino
+    cuya secuencia de instrucciones (convertir_camino_a_instrucciones) tarda menos en ejecutarse.
+
+    Cada paso cuesta un avance más su pausa, y cada giro de 90° un giro más su pausa (la vuelta en U
+    son dos giros, 'RRF'). El primer avance no gira porque el robot arranca mirando hacia el primer
+    movimiento. La heurística es la distancia BFS a E por el costo de un avance, que nunca sobreestima."""
+    modelo = modelo or MODELO_MOVIMIENTO
+    costo_paso = modelo['avance_ms'] + modelo['pausa_ms']
+    costo_giro = modelo['giro_ms'] + modelo['pausa_ms']
+    costo_por_giro = (costo_paso, costo_paso + costo_giro, costo_paso + 2 * costo_giro, costo_paso + costo_giro)
+    mascaras = _mascaras_vecinos(laberinto_num, height, width)
+    desplazamientos = {0: -width, 1: 1, 2: width, 3: -1}
+    inicio_idx = inicio[0] * width + inicio[1]
+    fin_idx = fin[0] * width + fin[1]
+    if inicio_idx == fin_idx: return [inicio]
+    dist_fin = _distancias_bfs(_construir_vecinos(laberinto_num, height, width), fin_idx)
+    if dist_fin[inicio_idx] < 0: return None
+
+    # Estado = idx * 4 + orientación; -1 es el inicio, que todavía no tiene orientación.
+    g = {}
+    padres = {}
+    heap = []
+    for dir_idx in range(4):
+        if mascaras[inicio_idx] >> dir_idx & 1:
+            idx_next = inicio_idx + desplazamientos[dir_idx]
+            estado = idx_next * 4 + dir_idx
+            g[estado] = costo_paso; padres[estado] = -1
+            heapq.heappush(heap, (costo_paso + dist_fin[idx_next] * costo_paso, costo_paso, estado))
+    cerrados = set()
+    while heap:
+        _, g_actual, estado = heapq.heappop(heap)
+        if estado in cerrados: continue
+        cerrados.add(estado)
+        idx, dir_actual = divmod(estado, 4)
+        if idx == fin_idx:
+            if metricas.ACTIVAS is not None:
+                metricas.ACTIVAS.sumar('tiempo_minimo.estados', len(cerrados))
+                metricas.ACTIVAS.sumar('tiempo_minimo.generados', len(g))
+            camino = []
+            while estado != -1:
+                camino.append(divmod(estado // 4, width)); estado = padres[estado]
+            camino.append(inicio)
+            camino.reverse()
+            return camino
+        mascara = mascaras[idx]
+        for dir_idx in range(4):
+            if not mascara >> dir_idx & 1: continue
+            idx_next = idx + desplazamientos[dir_idx]
+            if idx_next == inicio_idx: continue
+            estado_next = idx_next * 4 + dir_idx
+            g_next = g_actual + costo_por_giro[(dir_idx - dir_actual) % 4]
+            if estado_next not in cerrados and g_next < g.get(estado_next, g_next + 1):
+                g[estado_next] = g_next; padres[estado_next] = estado
+                heapq.heappush(heap, (g_next + dist_fin[idx_next] * costo_paso, g_next, estado_next))
+    metricas.contar('tiempo_minimo.estados', len(cerrados))
+    return None
 
+@metricas.medido('simplificar_camino')
+def simplificar_camino(camino_coordenadas):
+    """Quita de un camino los ciclos, las idas y vueltas a callejones y los rodeos: al llegar a una celda
+    que ya está en el camino, o que es vecina de una celda anterior (dos celdas transitables vecinas
+    siempre se conectan), se descarta todo lo recorrido desde ahí. Tiempo lineal: cada celda entra y
+    sale del camino a lo sumo una vez y sus 4 vecinas se buscan en un dict."""
+    simplificado = []
+    posicion = {}
+    for celda in camino_coordenadas:
+        r, c = celda
+        corte = posicion.get(celda, len(simplificado))
+        for vecina in ((r - 1, c), (r, c + 1), (r + 1, c), (r, c - 1)):
+            i = posicion.get(vecina)
+            if i is not None and i + 1 < corte: corte = i + 1
+        for quitada in simplificado[corte:]: del posicion[quitada]
+        del simplificado[corte:]
+        posicion[celda] = len(simplificado)
+        simplificado.append(celda)
+    metricas.contar('simplificar.celdas_quitadas', len(camino_coordenadas) - len(simplificado))
+    return simplificado
+
+def contar_giros(instrucciones_str):
+    """Giros de 90° (R o L) en una secuencia de instrucciones sin comprimir."""
+    return instrucciones_str.count('R') + instrucciones_str.count('L')
+
+@metricas.medido('instrucciones')
 def convertir_camino_a_instrucciones(camino_coordenadas):
     if not camino_coordenadas or len(camino_coordenadas) < 2: return ""
     instrucciones = []
@@ -194,222 +982,287 @@ def visualizar_camino_en_laberinto(laberinto_str_list, camino_coordenadas):
         lab_visual[camino_coordenadas[-1][0]][camino_coordenadas[-1][1]] = END_CHAR
     return ["Laberinto con camino marcado (*):"] + ["".join(fila) for fila in lab_visual]
 
-def camino_a_grafo_ponderado(camino_coordenadas):
-    if not camino_coordenadas or len(camino_coordenadas) < 2: return nx.Graph(), {}, {}
-    G = nx.Graph(); pos_layout = {}; edge_labels = {}
-    nodo_grafo_actual = camino_coordenadas[0]
-    G.add_node(nodo_grafo_actual)
-    pos_layout[nodo_grafo_actual] = (camino_coordenadas[0][1], -camino_coordenadas[0][0])
-    pasos_segmento = 0
-    dr_seg, dc_seg = (camino_coordenadas[1][0] - camino_coordenadas[0][0], camino_coordenadas[1][1] - camino_coordenadas[0][1])
-    dir_actual_segmento = (dr_seg, dc_seg)
-    for i in range(len(camino_coordenadas) - 1):
-        pasos_segmento += 1
-        coord_sig = camino_coordenadas[i+1]
-        es_final = (i + 1 == len(camino_coordenadas) - 1)
-        cambio_dir = False
-        if not es_final:
-            dr_prox, dc_prox = (camino_coordenadas[i+2][0] - coord_sig[0], camino_coordenadas[i+2][1] - coord_sig[1])
-            if (dr_prox, dc_prox) != dir_actual_segmento: cambio_dir = True
-        if es_final or cambio_dir:
-            nuevo_nodo = coord_sig
-            G.add_node(nuevo_nodo); pos_layout[nuevo_nodo] = (nuevo_nodo[1], -nuevo_nodo[0])
-            G.add_edge(nodo_grafo_actual, nuevo_nodo, weight=pasos_segmento)
-            edge_labels[(nodo_grafo_actual, nuevo_nodo)] = pasos_segmento
-            nodo_grafo_actual = nuevo_nodo; pasos_segmento = 0
-            if not es_final: dir_actual_segmento = (dr_prox, dc_prox)
-    return G, pos_layout, edge_labels
-
-def visualizar_grafo_de_camino(G, pos, edge_labels, title):
-    if not G.nodes(): print(f"Grafo para '{title}' vacío."); return
-    plt.figure(num=title, figsize=(9, 7)) 
-    node_labels = {node: f"({node[0]},{node[1]})" for node in G.nodes()}
-    nx.draw(G, pos, with_labels=True, labels=node_labels, node_color='lightgreen', node_size=1000, font_size=7, font_weight='normal')
-    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_color='darkred', font_size=7)
-    plt.title(title, fontsize=10) 
-    plt.draw(); plt.pause(0.01) 
-
-# --- Función para Enviar Instrucciones a Arduino (de path_sender.py) ---
-def enviar_instrucciones(arduino_serial, instrucciones_str):
-    """Función para enviar instrucciones al Arduino y manejar el feedback."""
-    if not arduino_serial.isOpen():
-        print("La conexión serial no está abierta.")
-        return
-
-    print(f"Enviando instrucciones: {instrucciones_str}")
-    arduino_serial.write((instrucciones_str + '\n').encode('utf-8')) # Añadir terminador de línea
-    
-    # Estimación de tiempo y manejo de feedback (lógica de path_sender.py)
-    estimated_time_ms = 0
-    tiempo_de_espera_total = 0
-
-    # Casos especiales para !E y !C
-    if instrucciones_str.upper() == "!E":
-        print("Comando !E detectado, usando tiempo de espera extendido para Arduino.")
-        tiempo_de_espera_total = 20.0 
-    elif instrucciones_str.upper() == "!C":
-        print("Comando !C detectado, usando tiempo de espera corto.")
-        tiempo_de_espera_total = 3.0
-    else: 
-        # Cálculo para secuencias de movimiento (ej. !SFFRF o FFRF)
-        comandos_reales = instrucciones_str
-        if instrucciones_str.upper().startswith("!S") and len(instrucciones_str) > 2:
-            comandos_reales = instrucciones_str[2:] # Solo la parte de los movimientos
-
-        for i, char_command in enumerate(comandos_reales):
-            if char_command.upper() == 'F':
-                estimated_time_ms += 500 
-            elif char_command.upper() == 'R' or char_command.upper() == 'L':
-                estimated_time_ms += 1500
-            
-            # PAUSA_ENTRE_COMANDOS (si aplica también para el último comando, ajustar)
-            if i < len(comandos_reales) - 1: # No añadir pausa después del último comando
-                estimated_time_ms += 200 
-        
-        estimated_time_s = estimated_time_ms / 1000.0
-        print(f"Tiempo estimado de ejecución en Arduino (para '{comandos_reales}'): {estimated_time_s:.2f} segundos.")
-        # Buffer adicional para comunicación, procesamiento en Arduino, etc.
-        tiempo_de_espera_total = estimated_time_s + 4.0 # 4 segundos de búfer general
-
-    print(f"Esperando hasta {tiempo_de_espera_total:.2f} segundos para el feedback de Arduino...")
-    start_time = time.time()
-    
-    # Bucle para leer feedback
-    buffer_arduino = ""
-    while time.time() - start_time < tiempo_de_espera_total:
-        if arduino_serial.in_waiting > 0:
-            try:
-                # Leer bytes y decodificar, acumulando hasta encontrar un '\n'
-                byte_leido = arduino_serial.read(arduino_serial.in_waiting)
-                buffer_arduino += byte_leido.decode('utf-8', errors='ignore')
-                
-                while '\n' in buffer_arduino:
-                    respuesta, buffer_arduino = buffer_arduino.split('\n', 1)
-                    respuesta = respuesta.rstrip() # Quitar \r si existe
-                    if respuesta: # Solo imprimir si no está vacío
-                        print(f"Arduino: {respuesta}")
-            except Exception as e:
-                print(f"Error leyendo de Arduino: {e}")
-                # Podríamos romper el bucle aquí si el error es crítico
-        time.sleep(0.05) # Pequeña pausa para no saturar CPU
-    
-    # Imprimir cualquier resto en el buffer que no terminó en \n (si es relevante)
-    if buffer_arduino.strip():
-        print(f"Arduino (buffer restante): {buffer_arduino.strip()}")
-
-    print("Lectura de feedback de Arduino finalizada (o tiempo de espera agotado).")
-
+def __getattr__(nombre):
+    # camino_a_grafo_ponderado y visualizar_grafo_de_camino viven en laberinth_plot; se siguen pudiendo
+    # importar desde aquí, pero solo se carga ese módulo (y networkx/matplotlib) cuando se piden.
+    if nombre in ('camino_a_grafo_ponderado', 'visualizar_grafo_de_camino'):
+        import laberinth_plot
+        return getattr(laberinth_plot, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 # --- Procesamiento Principal ---
 if __name__ == "__main__":
+    import argparse
+    import cProfile
+    import json
+    import traceback # Para imprimir errores detallados
+    parser = argparse.ArgumentParser(description="Resuelve laberinto_real, rankea los caminos y los envía al Arduino.")
+    parser.add_argument("--profile", action="store_true", help="Imprimir contadores y tiempos por etapa de los solvers antes del envío")
+    parser.add_argument("--profile-json", metavar="RUTA", help="Guardar además esas métricas en RUTA como JSON (implica --profile)")
+    parser.add_argument("--cprofile", metavar="RUTA", help="Perfilar la resolución con cProfile y guardar las estadísticas en RUTA (python -m pstats RUTA)")
+    parser.add_argument("--headless", action="store_true", help="Sin gráficos: no construye los grafos de camino ni importa matplotlib/networkx")
+    parser.add_argument("--refrescar", action="store_true", help="Ignorar la caché de soluciones: volver a resolver y reemplazar lo guardado")
+    args = parser.parse_args()
+    if args.profile or args.profile_json: metricas.activar()
+    perfil_c = cProfile.Profile() if args.cprofile else None
+    if perfil_c is not None: perfil_c.enable()
+
+    def terminar_perfil():
+        """Detiene cProfile y las métricas y escribe sus reportes; las llamadas siguientes no hacen nada."""
+        global perfil_c
+        if perfil_c is not None:
+            perfil_c.disable(); perfil_c.dump_stats(args.cprofile); perfil_c = None
+            print(f"\nEstadísticas de cProfile guardadas en {args.cprofile} (python -m pstats {args.cprofile}).")
+        datos_metricas = metricas.desactivar()
+        if datos_metricas is not None:
+            print("\n" + datos_metricas.reporte())
+            if args.profile_json:
+                with open(args.profile_json, 'w', encoding='utf-8') as f:
+                    json.dump(datos_metricas.a_dict(), f, indent=2, ensure_ascii=False)
+                print(f"Métricas guardadas en {args.profile_json}.")
+
     arduino_conn = None # Mover la inicialización aquí para el bloque finally
+    cache_soluciones = None # Igual que arduino_conn: se cierra en el finally
     caminos_ordenados_por_longitud = [] # Para accederla en la sección de envío
 
     try:
-        print("Parseando laberinto...")
-        laberinto_num, pos_inicio, pos_fin, alto, ancho = parse_laberinto(laberinto_real)
-        print(f"Laberinto parseado. Inicio: {pos_inicio}, Fin: {pos_fin}, Dimensiones: {alto}x{ancho}")
-        
-        caminos_finales_para_mostrar = []
-        coords_caminos_vistos = set() 
+        USAR_GRID_NUMPY = False # True: laberinto sobre LaberintoGrid (array uint8 con máscaras de vecinos, requiere numpy)
+        RELLENAR_CALLEJONES = True # Vuelve muro los callejones sin salida antes de buscar (los caminos simples de S a E no cambian)
+        USAR_GRAFO_CRUCES = True # Seguidores de pared del modo 'mixto' y k mejores por 'longitud' sobre el grafo de cruces y pasillos
         MAX_CAMINOS_A_MOSTRAR = 6 # Modifica según necesites
+        MODO_BUSQUEDA = 'k_cortos' # 'k_cortos': los k mejores caminos simples; 'mixto': seguidores de pared y se completa con los mejores
+        CRITERIO_RANKING = 'tiempo' # 'tiempo': segundos estimados con MODELO_MOVIMIENTO; 'longitud': celdas. También ordena la búsqueda
+        PRESUPUESTO_BUSQUEDA = {'tiempo_limite_s': 10.0, 'max_nodos': 2_000_000} # Corta iterar_caminos en laberintos con demasiados caminos
+        COMPRIMIR_INSTRUCCIONES = True # Envía las rutas en formato RLE (F4RF2...) que entiende version_arduino.ino
+        SIMPLIFICAR_CAMINOS = {'pared': True} # Solvers cuyos caminos pasan por simplificar_camino antes de convertirse
+        USAR_CACHE = True # Reutiliza los caminos rankeados de laberinth_cache.sqlite3 si el laberinto y esta configuración no cambiaron
+        REFRESCAR_CACHE = args.refrescar # True: descarta la entrada guardada, vuelve a resolver y la reemplaza
+        MOSTRAR_GRAFOS = not args.headless # False: ni grafos de camino ni matplotlib/networkx (arranque rápido, sin pantalla)
+        EXPORTAR_IMAGENES = None # Directorio: PNG de cada camino rankeado, todos juntos y una hoja de contactos (laberinth_render, Agg)
+
+        plt = None # Solo se importa si se van a mostrar grafos
+        if MOSTRAR_GRAFOS:
+            try:
+                import matplotlib.pyplot as plt
+                import networkx # laberinth_plot lo importa recién al graficar; se comprueba aquí que esté
+                from laberinth_plot import camino_a_grafo_ponderado, visualizar_grafo_de_camino
+            except ImportError as e_import:
+                plt = None # matplotlib puede haberse importado aunque falte networkx
+                print(f"Sin gráficos ({e_import}); se continúa como con --headless.")
+
+        caminos_finales_para_mostrar = []
         info_caminos_para_ordenar = []
+        busqueda_cortada = False # Un ranking cortado por PRESUPUESTO_BUSQUEDA no se guarda en la caché
+        if USAR_CACHE:
+            from laberinth_cache import CacheSoluciones, clave_cache, caminos_desde_cache
+            cache_soluciones = CacheSoluciones()
+            clave_soluciones = clave_cache(laberinto_real, {
+                "modo": MODO_BUSQUEDA, "max_caminos": MAX_CAMINOS_A_MOSTRAR, "grafo_cruces": USAR_GRAFO_CRUCES, "rellenar": RELLENAR_CALLEJONES,
+                "comprimir": COMPRIMIR_INSTRUCCIONES, "simplificar": SIMPLIFICAR_CAMINOS, "modelo": MODELO_MOVIMIENTO,
+                "criterio": CRITERIO_RANKING, "presupuesto": PRESUPUESTO_BUSQUEDA
+            })
+            if REFRESCAR_CACHE:
+                cache_soluciones.invalidar(clave_soluciones)
+            else:
+                caminos_en_cache = cache_soluciones.obtener(clave_soluciones)
+                if caminos_en_cache:
+                    info_caminos_para_ordenar = caminos_desde_cache(caminos_en_cache)
+                    print(f"Caché: {len(info_caminos_para_ordenar)} caminos recuperados sin resolver (--refrescar para recalcular).")
+
+        if not info_caminos_para_ordenar:
+            print("Parseando laberinto...")
+            if USAR_GRID_NUMPY:
+                from laberinth_grid import parse_laberinto_np
+                laberinto_num, pos_inicio, pos_fin, alto, ancho = parse_laberinto_np(laberinto_real)
+            else:
+                laberinto_num, pos_inicio, pos_fin, alto, ancho = parse_laberinto(laberinto_real)
+            print(f"Laberinto parseado. Inicio: {pos_inicio}, Fin: {pos_fin}, Dimensiones: {alto}x{ancho}")
+            if RELLENAR_CALLEJONES:
+                laberinto_num, celdas_rellenadas = rellenar_callejones(laberinto_num, pos_inicio, pos_fin, alto, ancho)
+                print(f"Callejones rellenados: {celdas_rellenadas} celdas pasaron a muro.")
+
+            # Yen sobre el grafo de cruces: varias veces más rápido que por celdas, pero sin costo de giros
+            k_cortos_en_grafo = USAR_GRAFO_CRUCES and MODO_BUSQUEDA == 'k_cortos' and CRITERIO_RANKING == 'longitud'
+            if USAR_GRAFO_CRUCES and (MODO_BUSQUEDA == 'mixto' or k_cortos_en_grafo):
+                import laberinth_graph
+                grafo_cruces = laberinth_graph.construir_grafo_cruces(laberinto_num, pos_inicio, pos_fin, alto, ancho)
+                print(f"Grafo de cruces: {grafo_cruces.num_nodos()} nodos y {grafo_cruces.num_pasillos()} pasillos ({grafo_cruces.celdas_transitables} celdas transitables).")
+            coords_caminos_vistos = ConjuntoCaminos() # Caminos ya elegidos, por huella
+            # Caminos simples en orden de CRITERIO_RANKING, calculados a medida que se piden
+            mejores_caminos = iterar_caminos(laberinto_num, pos_inicio, pos_fin, alto, ancho, orden=CRITERIO_RANKING, **PRESUPUESTO_BUSQUEDA)
+
+            if MODO_BUSQUEDA == 'k_cortos':
+                if k_cortos_en_grafo:
+                    print(f"\nBuscando los {MAX_CAMINOS_A_MOSTRAR} caminos simples más cortos (Yen perezoso sobre el grafo de cruces)...")
+                    caminos_k = [laberinth_graph.expandir_camino(grafo_cruces, c)
+                                 for c in laberinth_graph.k_caminos_mas_cortos_grafo(grafo_cruces, MAX_CAMINOS_A_MOSTRAR)]
+                elif CRITERIO_RANKING == 'longitud':
+                    print(f"\nBuscando los {MAX_CAMINOS_A_MOSTRAR} caminos simples más cortos (Yen perezoso sobre el grafo de cruces)...")
+                    caminos_k = k_caminos_mas_cortos(laberinto_num, pos_inicio, pos_fin, MAX_CAMINOS_A_MOSTRAR)
+                else: # Yen por celdas: el único que ordena con el costo de los giros
+                    print(f"\nBuscando los {MAX_CAMINOS_A_MOSTRAR} mejores caminos simples por {CRITERIO_RANKING} (Yen perezoso)...")
+                    caminos_k = list(itertools.islice(mejores_caminos, MAX_CAMINOS_A_MOSTRAR))
+                print(f"Se encontraron {len(caminos_k)} caminos.")
+                for idx, c_k in enumerate(caminos_k):
+                    caminos_finales_para_mostrar.append({"camino": c_k, "nombre": f"K-Mejor {idx+1}", "solver": "k_cortos"}); coords_caminos_vistos.add(c_k)
+            else:
+                # 1. Seguidor de Pared Izquierda
+                print("\nBuscando camino 'Seguidor de Pared Izquierda'...")
+                if USAR_GRAFO_CRUCES:
+                    cam_izq = laberinth_graph.expandir_camino(grafo_cruces, laberinth_graph.encontrar_camino_seguidor_pared_grafo(grafo_cruces, 'izquierda', alto, ancho))
+                else:
+                    tablas_pared = tabla_seguidor_pared(laberinto_num, alto, ancho) # Compartida por ambos seguidores
+                    cam_izq = encontrar_camino_seguidor_pared(laberinto_num, pos_inicio, pos_fin, alto, ancho, 'izquierda', tablas_pared)
+                if cam_izq:
+                    print(f"Camino 'Izquierda' encontrado (longitud {len(cam_izq)}).")
+                    caminos_finales_para_mostrar.append({"camino": cam_izq, "nombre": "Pared Izquierda", "solver": "pared"})
+                    coords_caminos_vistos.add(cam_izq)
+                else: print("No se encontró camino 'Seguidor de Pared Izquierda'.")
+
+                # 2. Seguidor de Pared Derecha
+                if len(caminos_finales_para_mostrar) < MAX_CAMINOS_A_MOSTRAR:
+                    print("\nBuscando camino 'Seguidor de Pared Derecha'...")
+                    if USAR_GRAFO_CRUCES:
+                        cam_der = laberinth_graph.expandir_camino(grafo_cruces, laberinth_graph.encontrar_camino_seguidor_pared_grafo(grafo_cruces, 'derecha', alto, ancho))
+                    else:
+                        cam_der = encontrar_camino_seguidor_pared(laberinto_num, pos_inicio, pos_fin, alto, ancho, 'derecha', tablas_pared)
+                    if cam_der:
+                        if cam_der not in coords_caminos_vistos:
+                            print(f"Camino 'Derecha' encontrado (longitud {len(cam_der)}).")
+                            caminos_finales_para_mostrar.append({"camino": cam_der, "nombre": "Pared Derecha", "solver": "pared"})
+                            coords_caminos_vistos.add(cam_der)
+                        else: print("Camino 'Derecha' es idéntico a uno ya encontrado.")
+                    else: print("No se encontró camino 'Seguidor de Pared Derecha'.")
+
+                # 3. Se completa con los mejores caminos que todavía no estén
+                if len(caminos_finales_para_mostrar) < MAX_CAMINOS_A_MOSTRAR:
+                    print(f"\nCompletando hasta {MAX_CAMINOS_A_MOSTRAR} caminos con los mejores por {CRITERIO_RANKING}...")
+                    num_adicionales = 0
+                    for c_extra in mejores_caminos:
+                        if c_extra in coords_caminos_vistos: continue
+                        num_adicionales += 1
+                        caminos_finales_para_mostrar.append({"camino": c_extra, "nombre": f"Adicional {num_adicionales}", "solver": "k_cortos"}); coords_caminos_vistos.add(c_extra)
+                        if len(caminos_finales_para_mostrar) >= MAX_CAMINOS_A_MOSTRAR: break
+                    print(f"Se agregaron {num_adicionales} caminos.")
+
+            busqueda_cortada = mejores_caminos.motivo_fin in ('tiempo_agotado', 'nodos_agotados')
+            if busqueda_cortada:
+                print(f"Búsqueda cortada por presupuesto ({mejores_caminos.motivo_fin}, {mejores_caminos.nodos_expandidos} nodos expandidos); el resultado no se guarda en la caché.")
 
-        # 1. Seguidor de Pared Izquierda
-        print("\nBuscando camino 'Seguidor de Pared Izquierda'...")
-        cam_izq = encontrar_camino_seguidor_pared(laberinto_num, pos_inicio, pos_fin, alto, ancho, 'izquierda')
-        if cam_izq:
-            print(f"Camino 'Izquierda' encontrado (longitud {len(cam_izq)}).")
-            caminos_finales_para_mostrar.append({"camino": cam_izq, "nombre": "Pared Izquierda"})
-            coords_caminos_vistos.add(tuple(cam_izq))
-        else: print("No se encontró camino 'Seguidor de Pared Izquierda'.")
-
-        # 2. Seguidor de Pared Derecha
-        if len(caminos_finales_para_mostrar) < MAX_CAMINOS_A_MOSTRAR:
-            print("\nBuscando camino 'Seguidor de Pared Derecha'...")
-            cam_der = encontrar_camino_seguidor_pared(laberinto_num, pos_inicio, pos_fin, alto, ancho, 'derecha')
-            if cam_der:
-                if tuple(cam_der) not in coords_caminos_vistos:
-                    print(f"Camino 'Derecha' encontrado (longitud {len(cam_der)}).")
-                    caminos_finales_para_mostrar.append({"camino": cam_der, "nombre": "Pared Derecha"})
-                    coords_caminos_vistos.add(tuple(cam_der))
-                else: print("Camino 'Derecha' es idéntico a uno ya encontrado.")
-            else: print("No se encontró camino 'Seguidor de Pared Derecha'.")
-
-        # 3. Caminos Adicionales con BFS y DFS
-        num_caminos_faltantes_total = MAX_CAMINOS_A_MOSTRAR - len(caminos_finales_para_mostrar)
-        if num_caminos_faltantes_total > 0:
-            num_bfs_necesarios = num_caminos_faltantes_total // 2
-            if num_bfs_necesarios > 0:
-                print(f"\nBuscando hasta {num_bfs_necesarios} caminos adicionales con BFS...")
-                caminos_bfs = encontrar_N_caminos_bfs(laberinto_num, pos_inicio, pos_fin, alto, ancho, num_bfs_necesarios, coords_caminos_vistos)
-                print(f"BFS encontró {len(caminos_bfs)} caminos adicionales nuevos.")
-                for idx, c_bfs in enumerate(caminos_bfs):
-                    ct = tuple(c_bfs); 
-                    if ct not in coords_caminos_vistos: 
-                        caminos_finales_para_mostrar.append({"camino": c_bfs, "nombre": f"BFS Adicional {idx+1}"}); coords_caminos_vistos.add(ct)
-            num_dfs_necesarios = MAX_CAMINOS_A_MOSTRAR - len(caminos_finales_para_mostrar)
-            if num_dfs_necesarios > 0:
-                print(f"\nBuscando hasta {num_dfs_necesarios} caminos adicionales con DFS...")
-                caminos_dfs = encontrar_N_caminos_dfs(laberinto_num, pos_inicio, pos_fin, alto, ancho, num_dfs_necesarios, coords_caminos_vistos)
-                print(f"DFS encontró {len(caminos_dfs)} caminos adicionales nuevos.")
-                for idx, c_dfs in enumerate(caminos_dfs):
-                    ct = tuple(c_dfs); 
-                    if ct not in coords_caminos_vistos: 
-                        caminos_finales_para_mostrar.append({"camino": c_dfs, "nombre": f"DFS Adicional {idx+1}"}); coords_caminos_vistos.add(ct)
-        
-        if not caminos_finales_para_mostrar:
+            # Camino más corto (BFS bidireccional): referencia óptima barata que se agrega siempre si es nueva
+            print("\nBuscando el camino más corto (BFS bidireccional)...")
+            cam_corto = encontrar_camino_mas_corto(laberinto_num, pos_inicio, pos_fin, alto, ancho)
+            if cam_corto:
+                if cam_corto not in coords_caminos_vistos:
+                    print(f"Camino 'Más Corto' encontrado (longitud {len(cam_corto)}).")
+                    caminos_finales_para_mostrar.append({"camino": cam_corto, "nombre": "Más Corto", "solver": "corto"})
+                    coords_caminos_vistos.add(cam_corto)
+                else: print(f"El camino más corto (longitud {len(cam_corto)}) ya está entre los caminos encontrados.")
+            else: print("No se encontró camino más corto.")
+
+            # Ruta de menor tiempo estimado (penaliza giros según MODELO_MOVIMIENTO); se agrega siempre si es nueva
+            print("\nBuscando la ruta de menor tiempo estimado (A* sobre celda y orientación)...")
+            cam_tiempo = encontrar_camino_tiempo_minimo(laberinto_num, pos_inicio, pos_fin, alto, ancho)
+            if cam_tiempo:
+                if cam_tiempo not in coords_caminos_vistos:
+                    print(f"Ruta 'Tiempo Mínimo' encontrada (longitud {len(cam_tiempo)}).")
+                    caminos_finales_para_mostrar.append({"camino": cam_tiempo, "nombre": "Tiempo Mínimo", "solver": "tiempo"})
+                    coords_caminos_vistos.add(cam_tiempo)
+                else: print("La ruta de tiempo mínimo ya está entre los caminos encontrados.")
+            else: print("No se encontró ruta de tiempo mínimo.")
+
+        if not caminos_finales_para_mostrar and not info_caminos_para_ordenar:
             print("\nNo se encontró ningún camino para visualizar.")
         else:
-            print(f"\n--- Procesamiento de {len(caminos_finales_para_mostrar)} Caminos Seleccionados ---")
+            if caminos_finales_para_mostrar:
+                print(f"\n--- Procesamiento de {len(caminos_finales_para_mostrar)} Caminos Seleccionados ---")
             for i, data_camino_info in enumerate(caminos_finales_para_mostrar):
                 camino_actual = data_camino_info["camino"]
                 nombre_del_camino = data_camino_info["nombre"]
                 longitud_camino_actual = len(camino_actual)
                 print(f"\n{i+1}. Procesando: {nombre_del_camino} (Celdas: {longitud_camino_actual})")
                 instrucciones_camino = convertir_camino_a_instrucciones(camino_actual)
+                longitud_sin_simplificar = longitud_camino_actual
+                if SIMPLIFICAR_CAMINOS.get(data_camino_info["solver"]):
+                    camino_simple = simplificar_camino(camino_actual)
+                    if len(camino_simple) < longitud_camino_actual:
+                        instrucciones_simples = convertir_camino_a_instrucciones(camino_simple)
+                        print(f"   Instrucciones sin simplificar: {instrucciones_camino}")
+                        print(f"   Simplificado: {longitud_camino_actual} -> {len(camino_simple)} celdas, "
+                              f"{contar_giros(instrucciones_camino)} -> {contar_giros(instrucciones_simples)} giros")
+                        camino_actual, instrucciones_camino = camino_simple, instrucciones_simples
+                        longitud_camino_actual = len(camino_simple)
+                    if any(datos["coordenadas"] == camino_actual for datos in info_caminos_para_ordenar):
+                        print("   Ya simplificado es idéntico a un camino anterior; se omite.")
+                        continue
                 print(f"   Instrucciones: {instrucciones_camino}")
+                tiempo_camino_s = estimar_tiempo_instrucciones_ms(instrucciones_camino) / 1000.0
+                instrucciones_envio = comprimir_instrucciones(instrucciones_camino) if COMPRIMIR_INSTRUCCIONES else instrucciones_camino
                 info_caminos_para_ordenar.append({
                     "nombre": nombre_del_camino, "longitud": longitud_camino_actual,
-                    "instrucciones": instrucciones_camino, "coordenadas": camino_actual
+                    "instrucciones": instrucciones_camino, "coordenadas": camino_actual,
+                    "tiempo_s": tiempo_camino_s, "instrucciones_envio": instrucciones_envio,
+                    "longitud_sin_simplificar": longitud_sin_simplificar
                 })
-                if plt.get_backend(): # Solo intentar graficar si hay backend
+                if plt is not None and plt.get_backend(): # Solo intentar graficar si hay backend
                     G_camino, pos_layout, edge_labels = camino_a_grafo_ponderado(camino_actual)
                     if G_camino.nodes():
                         titulo_grafo = f"Grafo: {nombre_del_camino} (Celdas: {longitud_camino_actual})"
                         visualizar_grafo_de_camino(G_camino, pos_layout, edge_labels, titulo_grafo)
             
             if info_caminos_para_ordenar:
-                caminos_ordenados_por_longitud = sorted(info_caminos_para_ordenar, key=lambda x: x["longitud"])
+                if CRITERIO_RANKING == 'tiempo':
+                    caminos_ordenados_por_longitud = sorted(info_caminos_para_ordenar, key=lambda x: (x["tiempo_s"], x["longitud"]))
+                    titulo_ranking = "MENOR A MAYOR TIEMPO ESTIMADO"
+                else:
+                    caminos_ordenados_por_longitud = sorted(info_caminos_para_ordenar, key=lambda x: x["longitud"])
+                    titulo_ranking = "MENOR A MAYOR LONGITUD"
                 print("\n\n═══════════════════════════════════════════════════════════════")
-                print("  LISTA DE CAMINOS ORDENADOS POR EFICIENCIA (MENOR A MAYOR LONGITUD)  ")
+                print(f"  LISTA DE CAMINOS ORDENADOS POR EFICIENCIA ({titulo_ranking})  ")
                 print("═══════════════════════════════════════════════════════════════")
                 for idx, datos in enumerate(caminos_ordenados_por_longitud):
                     print(f"\n{idx}. Camino: {datos['nombre']} (Ranking {idx})") # Ranking 0-based
-                    print(f"   Longitud (Celdas): {datos['longitud']}")
+                    print(f"   Longitud (Celdas): {datos['longitud']} | Tiempo estimado: {datos['tiempo_s']:.1f} s")
+                    if datos['longitud_sin_simplificar'] != datos['longitud']:
+                        print(f"   Simplificado desde {datos['longitud_sin_simplificar']} celdas")
                     print(f"   Instrucciones: {datos['instrucciones']}")
+                    if datos['instrucciones_envio'] != datos['instrucciones']:
+                        print(f"   Para enviar (RLE): {datos['instrucciones_envio']} ({len(datos['instrucciones_envio'])} de {len(datos['instrucciones'])} caracteres)")
+                    if len(datos['instrucciones_envio']) > MAX_LONGITUD_EEPROM:
+                        print(f"   Aviso: {len(datos['instrucciones_envio'])} caracteres no caben en la EEPROM (máx. {MAX_LONGITUD_EEPROM}); !S no la guardará, use !T.")
                     print("---------------------------------------------------------------")
+                if cache_soluciones is not None and caminos_finales_para_mostrar and not busqueda_cortada: # Solo lo recién resuelto y completo
+                    cache_soluciones.guardar(clave_soluciones, caminos_ordenados_por_longitud)
+                if EXPORTAR_IMAGENES:
+                    import os
+                    import laberinth_render
+                    rutas_png = laberinth_render.exportar_caminos(laberinto_real, caminos_ordenados_por_longitud, EXPORTAR_IMAGENES, prefijo="ranking")
+                    rutas_png.append(laberinth_render.hoja_de_contactos(laberinto_real, caminos_ordenados_por_longitud,
+                                                                        os.path.join(EXPORTAR_IMAGENES, "ranking_hoja.png")))
+                    print(f"\n{len(rutas_png)} imágenes de los caminos rankeados guardadas en {EXPORTAR_IMAGENES}.")
             else:
                 print("\nNo hay caminos procesados para ordenar y enviar.")
 
+            terminar_perfil() # El perfil cubre la resolución, no la espera de comandos del usuario
+
             # --- Sección de Envío a Arduino ---
-            if caminos_ordenados_por_longitud: # Solo si hay caminos para enviar
+            serial = None # pyserial se importa solo si hay algo que enviar
+            if caminos_ordenados_por_longitud:
+                try:
+                    import serial    # Para la comunicación con Arduino
+                    from path_sender import abrir_conexion, enviar_instrucciones, enviar_instrucciones_streaming # Envío y lectura de feedback del Arduino
+                except ImportError as e_import:
+                    print(f"\nNo se puede enviar al Arduino ({e_import}); instale pyserial para habilitar el envío.")
+            if serial is not None: # Solo si hay caminos para enviar y pyserial está disponible
                 print("\n--- ENVÍO DE INSTRUCCIONES A ARDUINO ---")
                 try:
                     # Reemplaza '/dev/ttyUSB0' con tu puerto correcto (ej. 'COM3' en Windows)
                     # Elige el puerto correcto para tu sistema operativo y conexión Arduino.
                     # Puedes listarlos con: python -m serial.tools.list_ports
+                    # Para varios robots a la vez, ver robot_dispatcher.py
                     puerto_arduino = '/dev/ttyUSB0' # Ejemplo para Linux, o '/dev/ttyUSB0'
                     # puerto_arduino = 'COM3' # Ejemplo para Windows
-                    
-                    print(f"Intentando conectar a Arduino en {puerto_arduino}...")
-                    arduino_conn = serial.Serial(port=puerto_arduino, baudrate=9600, timeout=1)
-                    print(f"Conectado a Arduino en {arduino_conn.name}.")
-                    print("Esperando 2 segundos para que Arduino se inicialice...")
-                    time.sleep(2) 
-                    while arduino_conn.in_waiting > 0: # Limpiar buffer inicial
-                        init_msg = arduino_conn.readline().decode('utf-8', errors='ignore').rstrip()
-                        if init_msg: print(f"Arduino (inicio): {init_msg}")
+                    arduino_conn = abrir_conexion(puerto_arduino)
 
                     # (dentro de la sección de Envío a Arduino, después de conectar con el Arduino)
                     while True:
@@ -417,6 +1270,7 @@ if __name__ == "__main__":
                             # Mensaje de entrada actualizado para mayor claridad
                             prompt_message = (
                                 f"RANKING (0 a {len(caminos_ordenados_por_longitud)-1}) o '!S<ranking>' (ej: !S0) para GUARDAR ruta,\n"
+                                f"'!T<ranking>' (ej: !T0) para EJECUTAR por streaming (sin límite de longitud),\n"
                                 f"'!E' para EJECUTAR memoria, '!C' para CALIBRAR, o 's' para SALIR: "
                             )
                             rank_input_original = input(prompt_message)
@@ -440,7 +1294,7 @@ if __name__ == "__main__":
                                     rank = int(rank_str)
                                     if 0 <= rank < len(caminos_ordenados_por_longitud):
                                         path_to_send = caminos_ordenados_por_longitud[rank]
-                                        instrucciones_con_prefijo = "!S" + path_to_send['instrucciones']
+                                        instrucciones_con_prefijo = "!S" + path_to_send['instrucciones_envio']
                                         print(f"Enviando para GUARDAR en Arduino el camino '{path_to_send['nombre']}' (Ranking {rank}) con comando: {instrucciones_con_prefijo}")
                                         enviar_instrucciones(arduino_conn, instrucciones_con_prefijo)
                                     else:
@@ -448,13 +1302,27 @@ if __name__ == "__main__":
                                 except ValueError:
                                     print(f"No se pudo entender el número de ranking en '{rank_input_original}'. Use formato como '!S0', '!S1', etc.")
                             
+                            elif rank_input_upper.startswith("!T") and len(rank_input_upper) > 2:
+                                # Streaming: la ruta se manda por fragmentos y no se guarda en EEPROM
+                                rank_str = rank_input_original[2:]
+                                try:
+                                    rank = int(rank_str)
+                                    if 0 <= rank < len(caminos_ordenados_por_longitud):
+                                        path_to_send = caminos_ordenados_por_longitud[rank]
+                                        print(f"Enviando por STREAMING el camino '{path_to_send['nombre']}' (Ranking {rank})")
+                                        enviar_instrucciones_streaming(arduino_conn, path_to_send['instrucciones_envio'])
+                                    else:
+                                        print(f"Ranking numérico '{rank_str}' fuera de rango. Válidos: 0 a {len(caminos_ordenados_por_longitud)-1}.")
+                                except ValueError:
+                                    print(f"No se pudo entender el número de ranking en '{rank_input_original}'. Use formato como '!T0', '!T1', etc.")
+
                             else:
                                 # Intentar interpretar la entrada como un número de ranking directo (ej: 0, 1, 2)
                                 try:
                                     rank = int(rank_input_original)
                                     if 0 <= rank < len(caminos_ordenados_por_longitud):
                                         path_to_send = caminos_ordenados_por_longitud[rank]
-                                        instrucciones_con_prefijo = "!S" + path_to_send['instrucciones']
+                                        instrucciones_con_prefijo = "!S" + path_to_send['instrucciones_envio']
                                         print(f"Enviando para GUARDAR en Arduino el camino '{path_to_send['nombre']}' (Ranking {rank}) con comando: {instrucciones_con_prefijo}")
                                         enviar_instrucciones(arduino_conn, instrucciones_con_prefijo)
                                     else:
@@ -483,7 +1351,9 @@ if __name__ == "__main__":
                         print(f"  (Error al listar puertos: {e_list_ports})")
 
 
-            if plt.get_backend() and caminos_finales_para_mostrar:
+            if plt is None:
+                print("\nScript finalizado (sin gráficos).")
+            elif plt.get_backend() and caminos_finales_para_mostrar:
                  print("\nTodas las visualizaciones de grafos han sido preparadas.")
                  print("Mostrando todas las ventanas de gráficos. Ciérralas para que el script termine completamente.")
                  plt.show() 
@@ -499,6 +1369,9 @@ if __name__ == "__main__":
         print(f"Ocurrió un error inesperado: {e_gen}")
         traceback.print_exc()
     finally:
+        terminar_perfil()
+        if cache_soluciones is not None:
+            cache_soluciones.cerrar()
         if arduino_conn and arduino_conn.isOpen():
             arduino_conn.close()
             print("Conexión serial con Arduino cerrada por Python.")
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""Resolución por lotes de laberintos sin interacción.
+
+Uso:
+    python laberinth_batch.py laberintos/ otros/*.txt -s k_cortos tiempo -k 6 -o resultados.jsonl
+
+Cada archivo es un laberinto en texto, una fila por línea, con el mismo formato que `laberinto_real`.
+Los archivos se reparten entre procesos (ProcessPoolExecutor) y se escribe una línea JSON por
+laberinto en cuanto está resuelto, en el mismo orden de entrada. Con --cache los resultados se
+guardan en laberinth_cache y un laberinto ya resuelto con la misma configuración no se vuelve a
+resolver. Con --profile cada línea lleva además las métricas de laberinth_metricas de ese laberinto
+y al final se imprime en stderr el reporte sumado de todo el lote. Este módulo nunca importa
+matplotlib ni pyserial.
+"""
+import argparse
+import concurrent.futures
+import functools
+import glob
+import json
+import os
+import sys
+import time
+
+from laberinth_algorithms import (parse_laberinto, encontrar_camino_seguidor_pared, encontrar_N_caminos_bfs,
+                                  encontrar_N_caminos_dfs, k_caminos_mas_cortos, encontrar_camino_tiempo_minimo,
+                                  convertir_camino_a_instrucciones, comprimir_instrucciones,
+                                  estimar_tiempo_instrucciones_ms, simplificar_camino, rellenar_callejones,
+                                  encontrar_camino_mas_corto, ConjuntoCaminos)
+import laberinth_graph
+import laberinth_metricas as metricas
+from laberinth_cache import CacheSoluciones, clave_cache, RUTA_CACHE
+
+SOLVERS = ('k_cortos', 'corto', 'tiempo', 'pared_izquierda', 'pared_derecha', 'bfs', 'dfs')
+EXTENSION_LABERINTO = '.txt' # Extensión que se busca al recibir un directorio
+
+
+def buscar_archivos(entradas):
+    """Expande directorios (archivos EXTENSION_LABERINTO dentro, ordenados) y patrones glob a una
+    lista de rutas sin repetidos, respetando el orden en que se dieron."""
+    rutas = []
+    vistas = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatas = sorted(os.path.join(entrada, nombre) for nombre in os.listdir(entrada)
+                                if nombre.endswith(EXTENSION_LABERINTO))
+        elif os.path.isfile(entrada):
+            candidatas = [entrada]
+        else:
+            candidatas = sorted(glob.glob(entrada, recursive=True))
+        for ruta in candidatas:
+            if os.path.isfile(ruta) and ruta not in vistas:
+                vistas.add(ruta); rutas.append(ruta)
+    return rutas
+
+
+def leer_laberinto(ruta):
+    """Lee un archivo de laberinto como lista de strings (una por fila), sin líneas vacías al final."""
+    with open(ruta, encoding='utf-8') as f:
+        filas = f.read().splitlines()
+    while filas and not filas[-1]:
+        filas.pop()
+    return filas
+
+
+def _caminos_del_solver(solver, laberinto_num, inicio, fin, alto, ancho, grafo, k, vistos):
+    """Devuelve la lista de (nombre, camino) que produce `solver`. Con `grafo` se usan las versiones
+    sobre el grafo de cruces, igual que USAR_GRAFO_CRUCES en laberinth_algorithms."""
+    if solver == 'k_cortos':
+        if grafo is not None:
+            caminos = [laberinth_graph.expandir_camino(grafo, c) for c in laberinth_graph.k_caminos_mas_cortos_grafo(grafo, k)]
+        else:
+            caminos = k_caminos_mas_cortos(laberinto_num, inicio, fin, k)
+        return [(f"K-Corto {i+1}", c) for i, c in enumerate(caminos)]
+    if solver == 'corto':
+        return [("Más Corto", encontrar_camino_mas_corto(laberinto_num, inicio, fin, alto, ancho))]
+    if solver == 'tiempo':
+        return [("Tiempo Mínimo", encontrar_camino_tiempo_minimo(laberinto_num, inicio, fin, alto, ancho))]
+    if solver in ('pared_izquierda', 'pared_derecha'):
+        tipo = solver.split('_')[1]
+        if grafo is not None:
+            camino = laberinth_graph.expandir_camino(grafo, laberinth_graph.encontrar_camino_seguidor_pared_grafo(grafo, tipo, alto, ancho))
+        else:
+            camino = encontrar_camino_seguidor_pared(laberinto_num, inicio, fin, alto, ancho, tipo)
+        return [(f"Pared {tipo.capitalize()}", camino)]
+    if solver == 'bfs':
+        if grafo is not None:
+            caminos = [laberinth_graph.expandir_camino(grafo, c) for c in laberinth_graph.encontrar_N_caminos_bfs_grafo(grafo, k, vistos)]
+        else:
+            caminos = encontrar_N_caminos_bfs(laberinto_num, inicio, fin, alto, ancho, k, vistos)
+        return [(f"BFS {i+1}", c) for i, c in enumerate(caminos)]
+    if solver == 'dfs':
+        if grafo is not None:
+            caminos = [laberinth_graph.expandir_camino(grafo, c) for c in laberinth_graph.encontrar_N_caminos_dfs_grafo(grafo, k, vistos)]
+        else:
+            caminos = encontrar_N_caminos_dfs(laberinto_num, inicio, fin, alto, ancho, k, vistos)
+        return [(f"DFS {i+1}", c) for i, c in enumerate(caminos)]
+    raise ValueError(f"Solver desconocido: {solver}")
+
+
+def resolver_archivo(ruta, solvers, k=6, usar_grafo=True, usar_numpy=False, incluir_coordenadas=True, simplificar=(),
+                     rellenar=False, ruta_cache=None, refrescar=False, perfilar=False):
+    """Resuelve un archivo de laberinto y devuelve un dict serializable a JSON con los caminos
+    (sin repetidos, en el orden de `solvers`) y los tiempos de cada etapa en ms. Los caminos de los
+    solvers en `simplificar` pasan antes por simplificar_camino y con `rellenar` los callejones sin
+    salida se vuelven muro antes de buscar. Si el laberinto no se puede leer o parsear, o algún solver
+    lanza una excepción, el dict lleva la clave 'error' en vez de caminos.
+
+    Con `ruta_cache` se busca primero el resultado en esa caché (el dict devuelto lleva
+    "cache": True si salió de ahí) y los resultados sin error se guardan; `refrescar` ignora lo
+    guardado y lo reemplaza. Con `perfilar` el dict lleva además "metricas" (Metricas.a_dict) con los
+    contadores y tiempos de esta resolución; no se guardan en la caché."""
+    if perfilar:
+        metricas.activar()
+        try:
+            resultado = resolver_archivo(ruta, solvers, k, usar_grafo, usar_numpy, incluir_coordenadas, simplificar,
+                                         rellenar, ruta_cache, refrescar)
+        finally:
+            datos_metricas = metricas.desactivar().a_dict()
+        return {**resultado, "metricas": datos_metricas}
+    if ruta_cache is None:
+        return _resolver_archivo(ruta, solvers, k, usar_grafo, usar_numpy, incluir_coordenadas, simplificar, rellenar)
+    try:
+        filas = leer_laberinto(ruta)
+    except (OSError, UnicodeDecodeError) as e:
+        return {"archivo": ruta, "error": f"{type(e).__name__}: {e}"}
+    # usar_numpy no cambia los caminos, así que no forma parte de la clave
+    clave = clave_cache(filas, {"solvers": list(solvers), "k": k, "grafo_cruces": usar_grafo,
+                                "coordenadas": incluir_coordenadas, "simplificar": sorted(simplificar), "rellenar": rellenar})
+    with CacheSoluciones(ruta_cache) as cache:
+        if not refrescar:
+            resultado = cache.obtener(clave)
+            if resultado is not None:
+                return {"archivo": ruta, **resultado, "cache": True}
+        resultado = _resolver_archivo(ruta, solvers, k, usar_grafo, usar_numpy, incluir_coordenadas, simplificar, rellenar)
+        if "error" not in resultado:
+            cache.guardar(clave, {etapa: valor for etapa, valor in resultado.items() if etapa != "archivo"})
+    return resultado
+
+
+def _resolver_archivo(ruta, solvers, k, usar_grafo, usar_numpy, incluir_coordenadas, simplificar, rellenar):
+    resultado = {"archivo": ruta}
+    tiempos_ms = {}
+    try:
+        t0 = time.perf_counter()
+        if usar_numpy:
+            from laberinth_grid import parse_laberinto_np
+            with open(ruta, 'rb') as f:
+                laberinto_num, inicio, fin, alto, ancho = parse_laberinto_np(f.read())
+        else:
+            laberinto_num, inicio, fin, alto, ancho = parse_laberinto(leer_laberinto(ruta))
+        tiempos_ms["parse"] = (time.perf_counter() - t0) * 1000.0
+
+        if rellenar:
+            t0 = time.perf_counter()
+            laberinto_num, resultado["celdas_rellenadas"] = rellenar_callejones(laberinto_num, inicio, fin, alto, ancho)
+            tiempos_ms["rellenar"] = (time.perf_counter() - t0) * 1000.0
+
+        grafo = None
+        if usar_grafo:
+            t0 = time.perf_counter()
+            grafo = laberinth_graph.construir_grafo_cruces(laberinto_num, inicio, fin, alto, ancho)
+            tiempos_ms["grafo"] = (time.perf_counter() - t0) * 1000.0
+    except Exception as e:
+        resultado["error"] = f"{type(e).__name__}: {e}"
+        return resultado
+
+    resultado.update({"alto": alto, "ancho": ancho, "inicio": list(inicio), "fin": list(fin)})
+    caminos = []
+    vistos = ConjuntoCaminos()
+    for solver in solvers:
+        t0 = time.perf_counter()
+        try:
+            encontrados = _caminos_del_solver(solver, laberinto_num, inicio, fin, alto, ancho, grafo, k, vistos)
+        except Exception as e:
+            # Un solver que falla en este laberinto no debe tirar el lote (ni el pool de procesos)
+            resultado["error"] = f"{solver}: {type(e).__name__}: {e}"
+            return resultado
+        tiempos_ms[solver] = (time.perf_counter() - t0) * 1000.0
+        for nombre, camino in encontrados:
+            if not camino: continue
+            longitud_sin_simplificar = len(camino)
+            if solver in simplificar: camino = simplificar_camino(camino)
+            if camino in vistos: continue
+            vistos.add(camino)
+            instrucciones = convertir_camino_a_instrucciones(camino)
+            datos = {
+                "nombre": nombre, "solver": solver, "longitud": len(camino), "longitud_sin_simplificar": longitud_sin_simplificar,
+                "instrucciones": instrucciones, "instrucciones_envio": comprimir_instrucciones(instrucciones),
+                "tiempo_s": estimar_tiempo_instrucciones_ms(instrucciones) / 1000.0
+            }
+            if incluir_coordenadas:
+                datos["coordenadas"] = [list(coord) for coord in camino]
+            caminos.append(datos)
+    resultado["caminos"] = caminos
+    resultado["tiempos_ms"] = {etapa: round(ms, 3) for etapa, ms in tiempos_ms.items()}
+    return resultado
+
+
+def resolver_lote(rutas, solvers, k=6, usar_grafo=True, usar_numpy=False, incluir_coordenadas=True, simplificar=(),
+                  rellenar=False, procesos=None, tamano_tanda=4, ruta_cache=None, refrescar=False, perfilar=False):
+    """Generador con el resultado de resolver_archivo para cada ruta, en orden. Con `procesos` == 1
+    todo corre en el proceso actual; si no, se reparte entre un ProcessPoolExecutor (None: un
+    proceso por núcleo) en tandas de `tamano_tanda` archivos."""
+    tarea = functools.partial(resolver_archivo, solvers=tuple(solvers), k=k, usar_grafo=usar_grafo,
+                              usar_numpy=usar_numpy, incluir_coordenadas=incluir_coordenadas, simplificar=tuple(simplificar),
+                              rellenar=rellenar, ruta_cache=ruta_cache, refrescar=refrescar, perfilar=perfilar)
+    if procesos == 1:
+        yield from map(tarea, rutas)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=procesos) as executor:
+        yield from executor.map(tarea, rutas, chunksize=tamano_tanda)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resuelve laberintos en lote y escribe una línea JSON por laberinto.")
+    parser.add_argument("entradas", nargs="+", help=f"Archivos, directorios (se toman los *{EXTENSION_LABERINTO}) o patrones glob")
+    parser.add_argument("-s", "--solvers", nargs="+", choices=SOLVERS, default=['k_cortos', 'tiempo'], help="Solvers a ejecutar, en orden")
+    parser.add_argument("-k", type=int, default=6, help="Caminos a buscar con k_cortos, bfs y dfs (por defecto 6)")
+    parser.add_argument("-o", "--salida", help="Archivo JSON Lines de salida (por defecto stdout)")
+    parser.add_argument("-p", "--procesos", type=int, default=None, help="Procesos en paralelo (por defecto uno por núcleo; 1 = sin pool)")
+    parser.add_argument("--tanda", type=int, default=4, help="Archivos que se mandan juntos a cada proceso")
+    parser.add_argument("--celdas", action="store_true", help="Usar los solvers por celdas en vez del grafo de cruces")
+    parser.add_argument("--numpy", action="store_true", help="Parsear con parse_laberinto_np (requiere numpy)")
+    parser.add_argument("--simplificar", nargs="+", choices=SOLVERS, default=(), help="Solvers cuyos caminos se simplifican (ciclos, callejones y rodeos)")
+    parser.add_argument("--rellenar", action="store_true", help="Volver muro los callejones sin salida antes de buscar")
+    parser.add_argument("--sin-coordenadas", action="store_true", help="No incluir las coordenadas de cada camino")
+    parser.add_argument("--cache", nargs="?", const=RUTA_CACHE, default=None, metavar="RUTA",
+                        help=f"Reutilizar y guardar resultados en una caché SQLite (por defecto {os.path.basename(RUTA_CACHE)})")
+    parser.add_argument("--refrescar", action="store_true", help="Con --cache, volver a resolver todo y reemplazar lo guardado")
+    parser.add_argument("--profile", action="store_true", help="Agregar contadores y tiempos por etapa a cada línea e imprimir el total en stderr")
+    args = parser.parse_args(argv)
+
+    rutas = buscar_archivos(args.entradas)
+    if not rutas:
+        print("No se encontraron archivos de laberinto.", file=sys.stderr)
+        return 1
+
+    salida = open(args.salida, 'w', encoding='utf-8') if args.salida else sys.stdout
+    inicio = time.perf_counter()
+    errores = 0
+    desde_cache = 0
+    total_metricas = metricas.Metricas() if args.profile else None
+    try:
+        for resultado in resolver_lote(rutas, args.solvers, k=args.k, usar_grafo=not args.celdas, usar_numpy=args.numpy,
+                                       incluir_coordenadas=not args.sin_coordenadas, simplificar=args.simplificar, rellenar=args.rellenar,
+                                       procesos=args.procesos, tamano_tanda=args.tanda,
+                                       ruta_cache=args.cache, refrescar=args.refrescar, perfilar=args.profile):
+            if "error" in resultado: errores += 1
+            if resultado.get("cache"): desde_cache += 1
+            if total_metricas is not None: total_metricas.combinar(resultado["metricas"])
+            salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            salida.flush()
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    print(f"{len(rutas)} laberintos resueltos en {time.perf_counter() - inicio:.2f} s ({errores} con error, {desde_cache} desde la caché).", file=sys.stderr)
+    if total_metricas is not None:
+        print(total_metricas.reporte(), file=sys.stderr)
+    return 0 if errores == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
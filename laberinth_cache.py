@@ -0,0 +1,133 @@
+"""Caché persistente de soluciones en SQLite.
+
+La clave es un sha256 del contenido del laberinto (las filas, que ya incluyen S y E) y de los
+parámetros del solver, así que mover S/E, cambiar una pared o pedir otra configuración da una
+entrada distinta. Cada entrada guarda los caminos ya procesados y rankeados (coordenadas e
+instrucciones) en JSON. Cuando el total pasa de `max_bytes` se borran las entradas usadas hace más
+tiempo (LRU por tamaño).
+
+Uso desde la línea de comandos:
+    python laberinth_cache.py            # estadísticas
+    python laberinth_cache.py --limpiar  # borra todas las entradas
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'laberinth_cache.sqlite3')
+MAX_BYTES_CACHE = 64 * 1024 * 1024 # Tamaño máximo de los datos guardados antes de desalojar
+FORMATO_CACHE = 2 # Se mezcla en la clave; subirlo invalida todo lo guardado con un formato anterior
+
+
+def clave_cache(laberinto_str_list, parametros):
+    """Clave hexadecimal para un laberinto (lista de strings) y un dict de parámetros del solver
+    serializable a JSON. El orden de las claves del dict no afecta el resultado."""
+    h = hashlib.sha256()
+    h.update(f"{FORMATO_CACHE}\n{len(laberinto_str_list)}\n".encode('utf-8'))
+    h.update("\n".join(laberinto_str_list).encode('utf-8'))
+    h.update(b"\0")
+    h.update(json.dumps(parametros, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return h.hexdigest()
+
+
+def caminos_desde_cache(caminos):
+    """JSON no tiene tuplas: devuelve las coordenadas de cada camino como lista de tuplas (r, c),
+    igual que las generan los solvers."""
+    for datos in caminos:
+        if "coordenadas" in datos:
+            datos["coordenadas"] = [tuple(coord) for coord in datos["coordenadas"]]
+    return caminos
+
+
+class CacheSoluciones:
+    """Almacén clave -> valor JSON sobre un archivo SQLite, con desalojo LRU por tamaño.
+
+    Se puede usar como context manager para cerrar la conexión al salir."""
+
+    def __init__(self, ruta=RUTA_CACHE, max_bytes=MAX_BYTES_CACHE):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        # timeout: varios procesos (laberinth_batch) pueden escribir a la vez; SQLite serializa con un lock
+        self.conexion = sqlite3.connect(ruta, timeout=30)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS soluciones ("
+            " clave TEXT PRIMARY KEY, datos TEXT NOT NULL, tamano INTEGER NOT NULL, ultimo_uso REAL NOT NULL)")
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_uso ON soluciones (ultimo_uso)")
+        self.conexion.commit()
+
+    def obtener(self, clave):
+        """Valor guardado para `clave`, o None si no está. Marca la entrada como recién usada."""
+        fila = self.conexion.execute("SELECT datos FROM soluciones WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            return None
+        with self.conexion:
+            self.conexion.execute("UPDATE soluciones SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave))
+        return json.loads(fila[0])
+
+    def guardar(self, clave, valor):
+        """Guarda (o reemplaza) `valor` y desaloja las entradas menos usadas si se pasa de max_bytes.
+        Un valor que por sí solo no cabe no se guarda; devuelve si quedó guardado."""
+        datos = json.dumps(valor, ensure_ascii=False, separators=(',', ':'))
+        tamano = len(datos.encode('utf-8'))
+        if tamano > self.max_bytes:
+            return False
+        with self.conexion:
+            self.conexion.execute("INSERT OR REPLACE INTO soluciones (clave, datos, tamano, ultimo_uso) VALUES (?, ?, ?, ?)",
+                                  (clave, datos, tamano, time.time()))
+            self._desalojar()
+        return True
+
+    def _desalojar(self):
+        total = self.conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM soluciones").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        a_borrar = []
+        for clave, tamano in self.conexion.execute("SELECT clave, tamano FROM soluciones ORDER BY ultimo_uso"):
+            if total <= self.max_bytes: break
+            a_borrar.append((clave,))
+            total -= tamano
+        self.conexion.executemany("DELETE FROM soluciones WHERE clave = ?", a_borrar)
+
+    def invalidar(self, clave=None):
+        """Borra la entrada de `clave`, o todas si es None. Devuelve cuántas se borraron."""
+        with self.conexion:
+            if clave is None:
+                cursor = self.conexion.execute("DELETE FROM soluciones")
+            else:
+                cursor = self.conexion.execute("DELETE FROM soluciones WHERE clave = ?", (clave,))
+        return cursor.rowcount
+
+    def estadisticas(self):
+        """(número de entradas, bytes de datos guardados)."""
+        return self.conexion.execute("SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM soluciones").fetchone()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta o limpia la caché de soluciones.")
+    parser.add_argument("--ruta", default=RUTA_CACHE, help="Archivo SQLite de la caché")
+    parser.add_argument("--limpiar", action="store_true", help="Borrar todas las entradas")
+    args = parser.parse_args(argv)
+
+    with CacheSoluciones(args.ruta) as cache:
+        if args.limpiar:
+            print(f"{cache.invalidar()} entradas borradas de {args.ruta}.")
+        entradas, tamano = cache.estadisticas()
+        print(f"{args.ruta}: {entradas} entradas, {tamano / 1024:.1f} KiB (máx. {cache.max_bytes / 1024:.0f} KiB).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
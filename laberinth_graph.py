@@ -0,0 +1,359 @@
+import heapq
+
+import laberinth_metricas as metricas
+from laberinth_algorithms import _construir_vecinos, ConjuntoCaminos, codigo_celda, BASE_HUELLA, MOD_HUELLA
+
+# Un arco es un pasillo recorrido en un sentido:
+# (origen, destino, celdas_intermedias, longitud, giros, dir_salida, dir_llegada)
+# Las celdas son índices r*width+c; longitud son los pasos del pasillo y las direcciones usan 0:N, 1:E, 2:S, 3:W.
+ORIGEN, DESTINO, CELDAS, LONGITUD, GIROS, DIR_SALIDA, DIR_LLEGADA = range(7)
+
+
+class GrafoCruces:
+    """Laberinto comprimido: los nodos son cruces, callejones sin salida, S y E; las aristas son los
+    pasillos entre ellos con su longitud en celdas y su número de giros.
+
+    `adyacencia[nodo]` lista los arcos que salen del nodo ordenados como NEIGHBOR_ORDER_global según su
+    primer paso, así que recorrerla equivale a mirar los vecinos de la celda en ese orden. Los
+    buscadores de este módulo devuelven caminos como listas de índices de arco; expandir_camino los
+    convierte a coordenadas solo cuando hace falta."""
+
+    def __init__(self, inicio, fin, width, arcos, adyacencia, celdas_transitables):
+        self.inicio = inicio
+        self.fin = fin
+        self.width = width
+        self.inicio_idx = inicio[0] * width + inicio[1]
+        self.fin_idx = fin[0] * width + fin[1]
+        self.arcos = arcos
+        self.adyacencia = adyacencia
+        self.celdas_transitables = celdas_transitables
+        self._huellas_arcos = None
+
+    def num_nodos(self):
+        return len(self.adyacencia)
+
+    def num_pasillos(self):
+        return len(self.arcos) // 2
+
+    def huellas_arcos(self):
+        """Por cada arco, (BASE_HUELLA^longitud, huella de sus celdas sin el origen): con eso la huella de
+        un camino se extiende un arco entero en O(1). Se calcula la primera vez que se pide."""
+        if self._huellas_arcos is None:
+            self._huellas_arcos = []
+            for arco in self.arcos:
+                huella = 0
+                for idx in arco[CELDAS] + (arco[DESTINO],):
+                    huella = (huella * BASE_HUELLA + codigo_celda(*divmod(idx, self.width))) % MOD_HUELLA
+                self._huellas_arcos.append((pow(BASE_HUELLA, arco[LONGITUD], MOD_HUELLA), huella))
+        return self._huellas_arcos
+
+
+def _direccion_paso(desde, hasta, width):
+    diferencia = hasta - desde
+    if diferencia == -width: return 0
+    if diferencia == 1: return 1
+    if diferencia == width: return 2
+    return 3
+
+
+@metricas.medido('grafo_cruces')
+def construir_grafo_cruces(laberinto_num, inicio, fin, height, width):
+    """Recorre el laberinto una sola vez y lo comprime en un GrafoCruces."""
+    vecinos = _construir_vecinos(laberinto_num, height, width)
+    inicio_idx = inicio[0] * width + inicio[1]
+    fin_idx = fin[0] * width + fin[1]
+    es_nodo = [len(v) != 2 and len(v) > 0 for v in vecinos]
+    es_nodo[inicio_idx] = True
+    es_nodo[fin_idx] = True
+
+    arcos = []
+    adyacencia = {}
+    for nodo, nodo_es_cruce in enumerate(es_nodo):
+        if not nodo_es_cruce: continue
+        salientes = adyacencia.setdefault(nodo, [])
+        for primero in vecinos[nodo]:
+            anterior, actual = nodo, primero
+            celdas = []
+            giros = 0
+            dir_actual = dir_salida = _direccion_paso(nodo, primero, width)
+            while not es_nodo[actual]:
+                celdas.append(actual)
+                siguiente = vecinos[actual][0] if vecinos[actual][0] != anterior else vecinos[actual][1]
+                dir_nueva = _direccion_paso(actual, siguiente, width)
+                if dir_nueva != dir_actual: giros += 1
+                dir_actual = dir_nueva
+                anterior, actual = actual, siguiente
+            salientes.append(len(arcos))
+            arcos.append((nodo, actual, tuple(celdas), len(celdas) + 1, giros, dir_salida, dir_actual))
+    celdas_transitables = sum(1 for v in vecinos if v)
+    if metricas.ACTIVAS is not None:
+        metricas.ACTIVAS.sumar('grafo.nodos', len(adyacencia))
+        metricas.ACTIVAS.sumar('grafo.pasillos', len(arcos) // 2)
+    return GrafoCruces(inicio, fin, width, arcos, adyacencia, celdas_transitables)
+
+
+def expandir_camino(grafo, camino_arcos):
+    """Convierte una lista de arcos en la lista de coordenadas (r, c) que usan los demás módulos."""
+    if camino_arcos is None: return None
+    width = grafo.width
+    camino = [grafo.inicio]
+    for id_arco in camino_arcos:
+        arco = grafo.arcos[id_arco]
+        camino.extend(divmod(idx, width) for idx in arco[CELDAS])
+        camino.append(divmod(arco[DESTINO], width))
+    return camino
+
+
+def longitud_camino(grafo, camino_arcos):
+    """Número de celdas del camino expandido, sin expandirlo."""
+    return 1 + sum(grafo.arcos[id_arco][LONGITUD] for id_arco in camino_arcos)
+
+
+def _extender_huella(huella, id_arco, huellas_arcos):
+    potencia, huella_arco = huellas_arcos[id_arco]
+    return (huella * potencia + huella_arco) % MOD_HUELLA
+
+
+def _es_nuevo(grafo, camino_arcos, vistos, huella=None):
+    """Comprueba contra el ConjuntoCaminos `vistos` con la huella del camino (calculada arco por arco si
+    no se pasa); solo se expande a coordenadas si la huella coincide con la de otro camino."""
+    if not vistos: return True
+    if huella is None:
+        huellas_arcos = grafo.huellas_arcos()
+        huella = codigo_celda(*grafo.inicio)
+        for id_arco in camino_arcos: huella = _extender_huella(huella, id_arco, huellas_arcos)
+    return not vistos.contiene(huella, lambda: expandir_camino(grafo, camino_arcos))
+
+
+# --- Buscadores sobre el grafo ---
+@metricas.medido('seguidor_pared_grafo')
+def encontrar_camino_seguidor_pared_grafo(grafo, tipo_seguidor, height, width):
+    """Seguidor de pared saltando de cruce en cruce. Da el mismo camino que
+    encontrar_camino_seguidor_pared sobre las celdas: el estado es el arco por el que se llega (cruce
+    y orientación), así que si un arco se repite el seguidor está en un ciclo y se devuelve None."""
+    arcos = grafo.arcos
+    salientes = grafo.adyacencia.get(grafo.inicio_idx, [])
+    if not salientes: return None
+    # Primer paso: la primera dirección abierta en NEIGHBOR_ORDER_global, como en la versión por celdas.
+    id_arco = salientes[0]
+    camino_arcos = []
+    recorridos = bytearray(len(arcos))
+    por_direccion = {nodo: {arcos[a][DIR_SALIDA]: a for a in ids} for nodo, ids in grafo.adyacencia.items()}
+    if tipo_seguidor == 'izquierda': giros_prueba = (3, 0, 1, 2)
+    else: giros_prueba = (1, 0, 3, 2)
+    while True:
+        arco = arcos[id_arco]
+        camino_arcos.append(id_arco)
+        if arco[DESTINO] == grafo.fin_idx: return camino_arcos
+        if recorridos[id_arco]: return None
+        recorridos[id_arco] = 1
+        opciones = por_direccion[arco[DESTINO]]
+        id_arco = None
+        for giro in giros_prueba:
+            id_arco = opciones.get((arco[DIR_LLEGADA] + giro) % 4)
+            if id_arco is not None: break
+        if id_arco is None: return None
+
+
+@metricas.medido('dfs_grafo')
+def encontrar_N_caminos_dfs_grafo(grafo, N_caminos_max, caminos_existentes_coords_set):
+    """DFS con retroceso sobre el grafo: mismos caminos y mismo orden que encontrar_N_caminos_dfs. La
+    huella de cada prefijo se lleva en una pila paralela (solo si hay caminos existentes)."""
+    caminos = []
+    vistos = ConjuntoCaminos.desde(caminos_existentes_coords_set)
+    if grafo.inicio_idx == grafo.fin_idx:
+        if _es_nuevo(grafo, [], vistos): caminos.append([])
+        return caminos
+    arcos = grafo.arcos
+    huellas_arcos = grafo.huellas_arcos() if vistos else None
+    huellas = [codigo_celda(*grafo.inicio)] if vistos else None
+    en_camino = {grafo.inicio_idx}
+    camino_arcos = []
+    pila = [reversed(grafo.adyacencia[grafo.inicio_idx])]
+    while pila:
+        for id_arco in pila[-1]:
+            if arcos[id_arco][DESTINO] not in en_camino: break
+        else:
+            pila.pop()
+            if camino_arcos:
+                en_camino.discard(arcos[camino_arcos.pop()][DESTINO])
+                if huellas is not None: huellas.pop()
+            continue
+        destino = arcos[id_arco][DESTINO]
+        if destino == grafo.fin_idx:
+            candidato = camino_arcos + [id_arco]
+            if huellas is None or _es_nuevo(grafo, candidato, vistos, _extender_huella(huellas[-1], id_arco, huellas_arcos)):
+                caminos.append(candidato)
+                if len(caminos) >= N_caminos_max: return caminos
+            continue
+        en_camino.add(destino)
+        camino_arcos.append(id_arco)
+        if huellas is not None: huellas.append(_extender_huella(huellas[-1], id_arco, huellas_arcos))
+        pila.append(reversed(grafo.adyacencia[destino]))
+    return caminos
+
+
+def _arcos_hasta(nodo_busqueda):
+    camino_arcos = []
+    while nodo_busqueda[2] is not None:
+        camino_arcos.append(nodo_busqueda[1]); nodo_busqueda = nodo_busqueda[2]
+    camino_arcos.reverse()
+    return camino_arcos
+
+
+@metricas.medido('bfs_grafo')
+def encontrar_N_caminos_bfs_grafo(grafo, N_caminos_max, caminos_existentes_coords_set):
+    """Equivalente de encontrar_N_caminos_bfs: caminos simples en orden de longitud en celdas. Como los
+    arcos pesan distinto, la cola es un heap por longitud; cada camino parcial es un nodo
+    (nodo_grafo, arco, padre) que comparte su prefijo."""
+    caminos = []
+    vistos = ConjuntoCaminos.desde(caminos_existentes_coords_set)
+    if grafo.inicio_idx == grafo.fin_idx: return caminos
+    arcos = grafo.arcos
+    contador = 0
+    heap = [(0, contador, (grafo.inicio_idx, None, None))]
+    while heap:
+        longitud, _, parcial = heapq.heappop(heap)
+        nodo = parcial[0]
+        if nodo == grafo.fin_idx:
+            candidato = _arcos_hasta(parcial)
+            if _es_nuevo(grafo, candidato, vistos):
+                caminos.append(candidato)
+                if len(caminos) >= N_caminos_max: return caminos
+            continue
+        en_camino = set()
+        ancestro = parcial
+        while ancestro is not None:
+            en_camino.add(ancestro[0]); ancestro = ancestro[2]
+        for id_arco in grafo.adyacencia[nodo]:
+            destino = arcos[id_arco][DESTINO]
+            if destino in en_camino: continue
+            contador += 1
+            heapq.heappush(heap, (longitud + arcos[id_arco][LONGITUD], contador, (destino, id_arco, parcial)))
+    return caminos
+
+
+def _distancias_dijkstra(grafo, origen):
+    distancias = {origen: 0}
+    heap = [(0, origen)]
+    arcos = grafo.arcos
+    while heap:
+        d, nodo = heapq.heappop(heap)
+        if d > distancias[nodo]: continue
+        for id_arco in grafo.adyacencia[nodo]:
+            destino = arcos[id_arco][DESTINO]
+            d_sig = d + arcos[id_arco][LONGITUD]
+            if d_sig < distancias.get(destino, d_sig + 1):
+                distancias[destino] = d_sig
+                heapq.heappush(heap, (d_sig, destino))
+    return distancias
+
+
+def _buscar_desvio_grafo(grafo, dist_fin, spur, bloqueados, prohibidos):
+    """A* ponderado desde `spur` hasta el fin sin pasar por `bloqueados` ni salir por los arcos
+    `prohibidos`; la heurística es la distancia exacta al fin en el grafo completo."""
+    arcos = grafo.arcos
+    g = {spur: 0}
+    padres = {spur: None}
+    cerrados = set()
+    heap = [(dist_fin[spur], 0, spur)]
+    while heap:
+        _, menos_g, nodo = heapq.heappop(heap)
+        if nodo in cerrados: continue
+        if nodo == grafo.fin_idx:
+            desvio = []
+            while padres[nodo] is not None:
+                desvio.append(padres[nodo]); nodo = arcos[padres[nodo]][ORIGEN]
+            desvio.reverse()
+            return desvio
+        cerrados.add(nodo)
+        for id_arco in grafo.adyacencia[nodo]:
+            destino = arcos[id_arco][DESTINO]
+            if destino in bloqueados or destino in cerrados or destino not in dist_fin: continue
+            if nodo == spur and id_arco in prohibidos: continue
+            g_sig = -menos_g + arcos[id_arco][LONGITUD]
+            if g_sig < g.get(destino, g_sig + 1):
+                g[destino] = g_sig; padres[destino] = id_arco
+                heapq.heappush(heap, (g_sig + dist_fin[destino], -g_sig, destino))
+    return None
+
+
+@metricas.medido('k_cortos_grafo')
+def k_caminos_mas_cortos_grafo(grafo, k):
+    """Versión de k_caminos_mas_cortos sobre el grafo de cruces (Yen/Lawler perezoso). Devuelve hasta k
+    caminos de arcos en orden no decreciente de longitud en celdas."""
+    if k <= 0: return []
+    arcos = grafo.arcos
+    dist_fin = _distancias_dijkstra(grafo, grafo.fin_idx)
+    if grafo.inicio_idx not in dist_fin: return []
+
+    # Camino más corto: descenso directo por el árbol de Dijkstra inverso.
+    primero = []
+    nodo = grafo.inicio_idx
+    while nodo != grafo.fin_idx:
+        id_arco = next(a for a in grafo.adyacencia[nodo]
+                       if arcos[a][DESTINO] in dist_fin and dist_fin[arcos[a][DESTINO]] + arcos[a][LONGITUD] == dist_fin[nodo])
+        primero.append(id_arco); nodo = arcos[id_arco][DESTINO]
+
+    caminos = []          # caminos aceptados como listas de arcos
+    origen_desvio = []    # (id del camino padre, índice de desvío)
+    desvios = {}          # (dueño del prefijo, i) -> arcos ya usados desde ese prefijo por otros caminos
+    aceptados = set()
+    heap = []
+    contador = 0
+
+    def duenio_prefijo(id_camino, i):
+        while origen_desvio[id_camino][0] != -1 and i <= origen_desvio[id_camino][1]:
+            id_camino = origen_desvio[id_camino][0]
+        return id_camino
+
+    def prohibidos_en(id_camino, i):
+        duenio = duenio_prefijo(id_camino, i)
+        prohibidos = set(desvios.get((duenio, i), ()))
+        prohibidos.add(caminos[duenio][i])
+        return prohibidos
+
+    def longitud_prefijo(camino, i):
+        return sum(arcos[a][LONGITUD] for a in camino[:i])
+
+    def aceptar(camino, id_padre, i_desvio):
+        nonlocal contador
+        id_camino = len(caminos)
+        caminos.append(camino); origen_desvio.append((id_padre, i_desvio)); aceptados.add(tuple(camino))
+        if id_padre != -1:
+            desvios.setdefault((duenio_prefijo(id_padre, i_desvio), i_desvio), set()).add(camino[i_desvio])
+        bloqueados = set(arcos[a][ORIGEN] for a in camino[:i_desvio])
+        recorrido = longitud_prefijo(camino, i_desvio)
+        for i in range(i_desvio, len(camino)):
+            spur = arcos[camino[i]][ORIGEN]
+            bloqueados.add(spur)
+            prohibidos = prohibidos_en(id_camino, i)
+            cota = None
+            for id_arco in grafo.adyacencia[spur]:
+                destino = arcos[id_arco][DESTINO]
+                if id_arco in prohibidos or destino in bloqueados or destino not in dist_fin: continue
+                cota_arco = arcos[id_arco][LONGITUD] + dist_fin[destino]
+                if cota is None or cota_arco < cota: cota = cota_arco
+            if cota is not None:
+                contador += 1
+                heapq.heappush(heap, (recorrido + cota, contador, id_camino, i, None))
+            recorrido += arcos[camino[i]][LONGITUD]
+
+    aceptar(primero, -1, 0)
+    while heap and len(caminos) < k:
+        costo, _, id_camino, i, candidato = heapq.heappop(heap)
+        if candidato is not None and tuple(candidato) in aceptados: candidato = None
+        if candidato is None:
+            camino = caminos[id_camino]
+            bloqueados = set(arcos[a][ORIGEN] for a in camino[:i])
+            spur = arcos[camino[i]][ORIGEN]
+            desvio = _buscar_desvio_grafo(grafo, dist_fin, spur, bloqueados, prohibidos_en(id_camino, i))
+            if desvio is None: continue
+            candidato = camino[:i] + desvio
+            costo_real = longitud_prefijo(candidato, len(candidato))
+            if costo_real > costo:
+                contador += 1
+                heapq.heappush(heap, (costo_real, contador, id_camino, i, candidato))
+                continue
+        aceptar(candidato, id_camino, i)
+    return caminos
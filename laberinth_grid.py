@@ -0,0 +1,139 @@
+import numpy as np
+
+from laberinth_algorithms import (WALL_CHAR, PATH_CHAR, START_CHAR, END_CHAR,
+                                  WALL, PATH, START, END, IDX_TO_DR_DC, _GRADO_MASCARA, _rellenar_desde)
+
+# --- Tabla de conversión caracter -> valor numérico para bytes.translate (lo no reconocido es muro) ---
+_TABLA_CHARS = bytearray([WALL]) * 256
+_TABLA_CHARS[ord(PATH_CHAR)] = PATH
+_TABLA_CHARS[ord(START_CHAR)] = START
+_TABLA_CHARS[ord(END_CHAR)] = END
+_TABLA_CHARS = bytes(_TABLA_CHARS)
+_CHARS_RECONOCIDOS = (WALL_CHAR + PATH_CHAR + START_CHAR + END_CHAR).encode('latin-1')
+_GRADO_POR_MASCARA = np.array(_GRADO_MASCARA, dtype=np.uint8)
+
+
+class LaberintoGrid:
+    """Laberinto numérico sobre un array uint8 con un borde de muros alrededor.
+
+    `datos` tiene forma (height+2, width+2), así que los vecinos de cualquier celda interior siempre
+    existen y no hacen falta comprobaciones de límites. `mascaras` (height, width) guarda en el bit i
+    si la celda está abierta hacia IDX_TO_DR_DC[i] (0:N, 1:E, 2:S, 3:W); los muros tienen máscara 0.
+    `grid[r][c]` funciona igual que con la lista de listas de parse_laberinto."""
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.height = datos.shape[0] - 2
+        self.width = datos.shape[1] - 2
+        self.mascaras = self._calcular_mascaras()
+
+    def _calcular_mascaras(self):
+        abierto = (self.datos != WALL).view(np.uint8)
+        h, w = self.height, self.width
+        mascaras = np.zeros((h, w), dtype=np.uint8)
+        for dir_idx, (dr, dc) in IDX_TO_DR_DC.items():
+            mascaras |= abierto[1 + dr:1 + dr + h, 1 + dc:1 + dc + w] << np.uint8(dir_idx)
+        mascaras *= abierto[1:-1, 1:-1]
+        return mascaras
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, r):
+        # Vista de la fila sin el borde, para código que indexa laberinto_num[r][c].
+        return self.datos[r + 1, 1:-1]
+
+    def rellenar_callejones(self, inicio, fin):
+        """Versión vectorizada de rellenar_callejones: devuelve (LaberintoGrid reducido, celdas rellenadas).
+
+        Cada pasada cuenta los vecinos abiertos de todas las celdas con desplazamientos del array y
+        rellena a la vez todas las de grado <= 1 (el frente de cada callejón avanza una celda por
+        pasada). Cuando una pasada ya rellena pocas celdas quedan solo los callejones largos, y esos se
+        terminan con el barrido lineal con cola."""
+        datos = self.datos.copy()
+        h, w = self.height, self.width
+        interior = datos[1:-1, 1:-1]
+        conservar = (inicio[0] * w + inicio[1], fin[0] * w + fin[1])
+        protegidas = np.zeros((h, w), dtype=bool)
+        for idx in conservar:
+            protegidas.flat[idx] = True
+        umbral = max(64, h * w // 200) # Por debajo de esto una pasada completa cuesta más que la cola
+        rellenadas = 0
+        while True:
+            abierto = datos != WALL
+            grado = np.zeros((h, w), dtype=np.uint8)
+            for dr, dc in IDX_TO_DR_DC.values():
+                grado += abierto[1 + dr:1 + dr + h, 1 + dc:1 + dc + w]
+            callejones = abierto[1:-1, 1:-1] & (grado <= 1) & ~protegidas
+            cantidad = int(np.count_nonzero(callejones))
+            interior[callejones] = WALL
+            rellenadas += cantidad
+            if cantidad < umbral: break
+        reducido = LaberintoGrid(datos)
+        if cantidad:
+            mascaras = bytearray(reducido.mascaras.tobytes())
+            candidatas = memoryview(np.flatnonzero((interior != WALL) & (_GRADO_POR_MASCARA[reducido.mascaras] <= 1)))
+            resto = _rellenar_desde(mascaras, w, candidatas, conservar)
+            if resto:
+                interior.flat[resto] = WALL
+                reducido.mascaras = reducido._calcular_mascaras()
+                rellenadas += len(resto)
+        return reducido, rellenadas
+
+
+def _bytes_a_planos(contenido):
+    """Valida bytes crudos (filas separadas por '\n') y devuelve (bytes sin saltos de línea, height, width)."""
+    contenido = contenido.replace(b'\r', b'').rstrip(b'\n')
+    if not contenido:
+        return b'', 0, 0
+    height = contenido.count(b'\n') + 1
+    width = contenido.find(b'\n') if height > 1 else len(contenido)
+    if len(contenido) != height * (width + 1) - 1 or \
+       (height > 1 and contenido[width::width + 1] != b'\n' * (height - 1)):
+        for r_idx, fila in enumerate(contenido.split(b'\n')):
+            if len(fila) != width:
+                raise ValueError(f"Todas las filas deben tener la misma longitud. Fila {r_idx} tiene {len(fila)}, se esperaba {width}")
+    return contenido.replace(b'\n', b''), height, width
+
+
+def _strings_a_planos(laberinto_str_list):
+    height = len(laberinto_str_list)
+    width = len(laberinto_str_list[0]) if height > 0 else 0
+    for r_idx, fila_str in enumerate(laberinto_str_list):
+        if len(fila_str) != width:
+            raise ValueError(f"Todas las filas deben tener la misma longitud. Fila {r_idx} tiene {len(fila_str)}, se esperaba {width}")
+    # latin-1 mantiene un byte por caracter; lo que no entra se vuelve '?' y se trata como muro.
+    return "".join(laberinto_str_list).encode('latin-1', errors='replace'), height, width
+
+
+def _buscar_unico(planos, char, width, error_multiple, error_ausente):
+    marca = char.encode('latin-1')
+    pos = planos.find(marca)
+    if pos == -1:
+        raise ValueError(error_ausente)
+    if planos.find(marca, pos + 1) != -1:
+        raise ValueError(error_multiple)
+    return divmod(pos, width)
+
+
+def parse_laberinto_np(laberinto):
+    """Versión vectorizada de parse_laberinto: acepta la lista de strings o los bytes crudos del archivo
+    y devuelve (LaberintoGrid, pos_inicio, pos_fin, height, width). Todo el trabajo por celda se hace
+    con operaciones de bytes en C (translate/find) y numpy, sin bucles de Python."""
+    if isinstance(laberinto, (bytes, bytearray, memoryview)):
+        planos, height, width = _bytes_a_planos(bytes(laberinto))
+    else:
+        planos, height, width = _strings_a_planos(laberinto)
+
+    if planos.translate(None, _CHARS_RECONOCIDOS):
+        chars = np.frombuffer(planos, dtype=np.uint8)
+        for pos in np.flatnonzero(~np.isin(chars, np.frombuffer(_CHARS_RECONOCIDOS, dtype=np.uint8))):
+            r_idx, c_idx = divmod(int(pos), width)
+            print(f"Advertencia: Caracter '{chr(chars[pos])}' no reconocido en ({r_idx},{c_idx}). Tratado como muro.")
+
+    datos = np.full((height + 2, width + 2), WALL, dtype=np.uint8)
+    datos[1:-1, 1:-1] = np.frombuffer(planos.translate(_TABLA_CHARS), dtype=np.uint8).reshape(height, width)
+
+    pos_inicio = _buscar_unico(planos, START_CHAR, width, "Múltiples puntos de inicio 'S' encontrados.", "No se encontró el punto de inicio 'S' en el laberinto.")
+    pos_fin = _buscar_unico(planos, END_CHAR, width, "Múltiples puntos de fin 'E' encontrados.", "No se encontró el punto de fin 'E' en el laberinto.")
+    return LaberintoGrid(datos), pos_inicio, pos_fin, height, width
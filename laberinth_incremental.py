@@ -0,0 +1,232 @@
+"""Replanificación incremental (D* Lite) para cuando cambia alguna celda del laberinto.
+
+El planificador busca desde E hacia S y guarda su estado (g, rhs y la cola de prioridad) entre
+llamadas. Al abrir o cerrar celdas solo se recalculan las celdas cuya distancia a E cambia, así que
+una modificación pequeña no paga un nuevo parseo ni una búsqueda completa. Cuando el cambio afecta a
+tantas celdas que la replanificación costaría más que empezar de nuevo (p. ej. cerrar un pasillo
+cerca de E, que cambia la distancia de casi todo el laberinto), se descarta el estado y se rehace con
+un BFS desde E. También admite que el robot avance (mover_inicio) sin descartar lo calculado.
+
+Uso:
+    planificador = PlanificadorDStarLite(laberinto_num, pos_inicio, pos_fin, alto, ancho)
+    camino = planificador.camino()
+    camino = planificador.actualizar_celdas({(3, 5): False})  # el pasillo en (3,5) quedó bloqueado
+"""
+import heapq
+
+from laberinth_algorithms import (WALL, IDX_TO_DR_DC, DIR_TO_IDX, DIRECTIONS_map, NEIGHBOR_ORDER_global,
+                                  PATH_CHAR, START_CHAR, END_CHAR, parse_laberinto, _mascaras_vecinos)
+
+INFINITO = float('inf')
+# Una replanificación que expande más que esta fracción de las celdas abiertas se abandona y se
+# reconstruye el estado con un BFS desde E. Una expansión de D* Lite (heap y claves) cuesta unas 15
+# veces lo que una visita del BFS, y los cambios que llegan a ese punto suelen terminar tocando buena
+# parte del laberinto: en 801x801 trenzados, 1% dejó la peor replanificación en ~0.3 s (5% en ~0.6 s).
+FRACCION_REINICIO = 0.01
+EXPANSIONES_MINIMAS_REINICIO = 1000 # En laberintos chicos no vale la pena cortar
+
+
+class PlanificadorDStarLite:
+    """Camino más corto (en celdas) de S a E que se mantiene al abrir o cerrar celdas.
+
+    g[idx] es la distancia a E ya consolidada y rhs[idx] la que se deduce de los vecinos; las celdas
+    donde difieren están en la cola y son las únicas que se vuelven a expandir. Las celdas son
+    índices r*width+c y `mascaras` guarda, como _mascaras_vecinos, hacia dónde está abierta cada una.
+    `expansiones` cuenta las celdas sacadas de la cola desde que se creó el planificador y
+    `reconstrucciones` las veces que el estado se rehízo con un BFS (la primera es el plan inicial)."""
+
+    def __init__(self, laberinto_num, inicio, fin, height, width):
+        self.height = height
+        self.width = width
+        self.mascaras = _mascaras_vecinos(laberinto_num, height, width)
+        datos = getattr(laberinto_num, 'datos', None)
+        if datos is not None: # LaberintoGrid
+            self.abierto = bytearray((datos[1:-1, 1:-1] != WALL).tobytes())
+        else:
+            self.abierto = bytearray(celda != WALL for fila in laberinto_num for celda in fila)
+        desplazamiento_idx = {0: -width, 1: 1, 2: width, 3: -1}
+        orden_idx = [DIR_TO_IDX[DIRECTIONS_map[d]] for d in NEIGHBOR_ORDER_global]
+        self._por_mascara = [tuple(desplazamiento_idx[i] for i in orden_idx if mascara >> i & 1) for mascara in range(16)]
+
+        self.inicio_idx = inicio[0] * width + inicio[1]
+        self.fin_idx = fin[0] * width + fin[1]
+        self._ultimo_inicio = self.inicio_idx
+        self.km = 0 # Suma de lo que se movió el inicio; corrige las claves que ya están en la cola
+        self.g = [INFINITO] * (height * width)
+        self.rhs = [INFINITO] * (height * width)
+        self._cola = []
+        self._clave_en_cola = {} # idx -> clave vigente; las entradas de _cola que no coinciden están obsoletas
+        self.expansiones = 0
+        self.reconstrucciones = 0
+        self._celdas_abiertas = sum(self.abierto)
+        self._reconstruir()
+
+    @classmethod
+    def desde_laberinto(cls, laberinto_str_list):
+        laberinto_num, pos_inicio, pos_fin, alto, ancho = parse_laberinto(laberinto_str_list)
+        return cls(laberinto_num, pos_inicio, pos_fin, alto, ancho)
+
+    def _vecinos(self, idx):
+        return [idx + d for d in self._por_mascara[self.mascaras[idx]]]
+
+    def _clave(self, idx):
+        m = min(self.g[idx], self.rhs[idx])
+        r, c = divmod(idx, self.width)
+        ri, ci = divmod(self.inicio_idx, self.width)
+        return (m + abs(r - ri) + abs(c - ci) + self.km, m)
+
+    def _calcular_rhs(self, idx):
+        if idx == self.fin_idx:
+            return 0 if self.abierto[idx] else INFINITO
+        g = self.g
+        return min([g[v] for v in self._vecinos(idx)], default=INFINITO) + 1
+
+    def _actualizar_vertice(self, idx):
+        if self.g[idx] != self.rhs[idx]:
+            clave = self._clave(idx)
+            self._clave_en_cola[idx] = clave
+            heapq.heappush(self._cola, (clave, idx))
+        else:
+            self._clave_en_cola.pop(idx, None)
+
+    def _tope(self):
+        cola, vigentes = self._cola, self._clave_en_cola
+        while cola:
+            clave, idx = cola[0]
+            if vigentes.get(idx) == clave: return clave, idx
+            heapq.heappop(cola)
+        return None, None
+
+    def _reconstruir(self):
+        """Búsqueda nueva: BFS desde E por todas las celdas alcanzables. Deja g == rhs (la distancia
+        exacta) en todas las celdas y la cola vacía, que es un estado consistente de D* Lite."""
+        n = self.height * self.width
+        g = [INFINITO] * n
+        if self.abierto[self.fin_idx]:
+            mascaras, por_mascara = self.mascaras, self._por_mascara
+            g[self.fin_idx] = 0
+            frontera = [self.fin_idx]
+            distancia = 0
+            while frontera:
+                distancia += 1
+                siguiente = []
+                for idx in frontera:
+                    for d in por_mascara[mascaras[idx]]:
+                        v = idx + d
+                        if g[v] == INFINITO:
+                            g[v] = distancia
+                            siguiente.append(v)
+                frontera = siguiente
+        self.g = g
+        self.rhs = list(g)
+        self._cola = []
+        self._clave_en_cola = {}
+        self.km = 0 # Sin claves en la cola no hay nada que corregir
+        self._ultimo_inicio = self.inicio_idx
+        self.reconstrucciones += 1
+
+    def _calcular_camino_mas_corto(self):
+        g, rhs, inicio_idx = self.g, self.rhs, self.inicio_idx
+        limite = max(EXPANSIONES_MINIMAS_REINICIO, int(FRACCION_REINICIO * self._celdas_abiertas))
+        expandidas = 0
+        while True:
+            clave_vieja, idx = self._tope()
+            if idx is None or not (clave_vieja < self._clave(inicio_idx) or rhs[inicio_idx] > g[inicio_idx]):
+                return
+            if expandidas >= limite:
+                self._reconstruir()
+                return
+            heapq.heappop(self._cola)
+            expandidas += 1
+            self.expansiones += 1
+            clave_nueva = self._clave(idx)
+            if clave_vieja < clave_nueva:
+                self._clave_en_cola[idx] = clave_nueva
+                heapq.heappush(self._cola, (clave_nueva, idx))
+            elif g[idx] > rhs[idx]:
+                # Sobreconsistente: la distancia bajó, se consolida y se propaga a los vecinos
+                g[idx] = rhs[idx]
+                del self._clave_en_cola[idx]
+                g_vecino = g[idx] + 1
+                for v in self._vecinos(idx):
+                    if g_vecino < rhs[v]:
+                        rhs[v] = g_vecino
+                        self._actualizar_vertice(v)
+            else:
+                # Subconsistente: la distancia subió; los vecinos que dependían de esta celda se recalculan
+                g_viejo = g[idx] + 1
+                g[idx] = INFINITO
+                for v in self._vecinos(idx) + [idx]:
+                    if v == idx or rhs[v] == g_viejo:
+                        rhs[v] = self._calcular_rhs(v)
+                    self._actualizar_vertice(v)
+
+    def camino(self):
+        """Camino más corto actual como lista de (r, c) de S a E, o None si E no es alcanzable."""
+        self._calcular_camino_mas_corto()
+        idx, fin_idx, g = self.inicio_idx, self.fin_idx, self.g
+        if self.rhs[idx] == INFINITO: return None
+        camino = [divmod(idx, self.width)]
+        while idx != fin_idx:
+            vecinos = self._vecinos(idx)
+            if not vecinos: return None
+            idx = min(vecinos, key=g.__getitem__) # min se queda con el primero en NEIGHBOR_ORDER_global si hay empate
+            if g[idx] == INFINITO: return None
+            camino.append(divmod(idx, self.width))
+        return camino
+
+    def actualizar_celdas(self, cambios):
+        """Aplica celdas abiertas o cerradas y devuelve el nuevo camino (como camino()).
+
+        `cambios` es un dict {(r, c): abierta} o un iterable de pares ((r, c), abierta); las celdas que
+        ya estaban en ese estado se ignoran."""
+        if isinstance(cambios, dict): cambios = cambios.items()
+        width, height, abierto, mascaras = self.width, self.height, self.abierto, self.mascaras
+        afectadas = set()
+        for (r, c), abierta in cambios:
+            if not (0 <= r < height and 0 <= c < width):
+                raise ValueError(f"La celda {(r, c)} está fuera del laberinto ({height}x{width}).")
+            idx = r * width + c
+            if bool(abierta) == bool(abierto[idx]): continue
+            abierto[idx] = 1 if abierta else 0
+            self._celdas_abiertas += 1 if abierta else -1
+            afectadas.add(idx)
+            for dir_idx, (dr, dc) in IDX_TO_DR_DC.items():
+                nr, nc = r + dr, c + dc
+                if not (0 <= nr < height and 0 <= nc < width): continue
+                vecino = nr * width + nc
+                if abierta and abierto[vecino]:
+                    mascaras[idx] |= 1 << dir_idx
+                    mascaras[vecino] |= 1 << (dir_idx ^ 2)
+                else:
+                    mascaras[idx] &= ~(1 << dir_idx)
+                    mascaras[vecino] &= ~(1 << (dir_idx ^ 2))
+                afectadas.add(vecino)
+        for idx in afectadas:
+            self.rhs[idx] = self._calcular_rhs(idx)
+            self._actualizar_vertice(idx)
+        return self.camino()
+
+    def mover_inicio(self, nuevo_inicio):
+        """El robot avanzó hasta `nuevo_inicio`; los próximos caminos parten de ahí sin rehacer la búsqueda."""
+        nuevo_idx = nuevo_inicio[0] * self.width + nuevo_inicio[1]
+        r0, c0 = divmod(self._ultimo_inicio, self.width)
+        self.km += abs(nuevo_inicio[0] - r0) + abs(nuevo_inicio[1] - c0)
+        self._ultimo_inicio = self.inicio_idx = nuevo_idx
+
+
+def diferencias_laberinto(anterior, nuevo):
+    """Compara dos laberintos en strings del mismo tamaño y devuelve {(r, c): abierta} con las celdas
+    que pasaron de muro a transitable o al revés, listo para actualizar_celdas. S y E cuentan como
+    celdas abiertas y, como en parse_laberinto, cualquier caracter no reconocido es muro; si S se
+    movió, use mover_inicio."""
+    transitables = (PATH_CHAR, START_CHAR, END_CHAR)
+    if len(anterior) != len(nuevo) or any(len(a) != len(b) for a, b in zip(anterior, nuevo)):
+        raise ValueError("Los laberintos deben tener las mismas dimensiones.")
+    cambios = {}
+    for r, (fila_anterior, fila_nueva) in enumerate(zip(anterior, nuevo)):
+        if fila_anterior == fila_nueva: continue
+        for c, (antes, despues) in enumerate(zip(fila_anterior, fila_nueva)):
+            if (antes in transitables) != (despues in transitables):
+                cambios[(r, c)] = despues in transitables
+    return cambios
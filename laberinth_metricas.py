@@ -0,0 +1,107 @@
+"""Instrumentación de los solvers: contadores, máximos y tiempos con nombre.
+
+Mientras ACTIVAS es None (lo normal) cada función instrumentada solo hace una comparación extra por
+llamada: los solvers no cuentan nada dentro de sus bucles, sino que al terminar reportan lo que ya
+tienen en sus propias estructuras (nodos creados, niveles, caminos materializados...). Los nombres
+llevan el prefijo del solver, p. ej. 'bfs.nodos' o 'iterar.desvios'.
+
+Uso:
+    import laberinth_metricas as metricas
+    metricas.activar()
+    ... resolver ...
+    print(metricas.desactivar().reporte())
+"""
+import functools
+import time
+
+ACTIVAS = None # Metricas en curso, o None si la instrumentación está apagada
+
+
+class Metricas:
+    """Acumulador de una corrida. `tiempos_s` y `llamadas` vienen de las funciones decoradas con
+    medido(); los tiempos son inclusivos (una función medida que llama a otra cuenta ambos)."""
+
+    def __init__(self):
+        self.contadores = {}
+        self.maximos = {}
+        self.tiempos_s = {}
+        self.llamadas = {}
+
+    def sumar(self, nombre, cantidad=1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def maximo(self, nombre, valor):
+        if valor > self.maximos.get(nombre, valor - 1):
+            self.maximos[nombre] = valor
+
+    def tiempo(self, nombre, segundos):
+        self.tiempos_s[nombre] = self.tiempos_s.get(nombre, 0.0) + segundos
+        self.llamadas[nombre] = self.llamadas.get(nombre, 0) + 1
+
+    def combinar(self, datos):
+        """Suma otra corrida ya serializada con a_dict (p. ej. la de un proceso de laberinth_batch)."""
+        for nombre, valor in datos.get("contadores", {}).items(): self.sumar(nombre, valor)
+        for nombre, valor in datos.get("maximos", {}).items(): self.maximo(nombre, valor)
+        for nombre, etapa in datos.get("tiempos", {}).items():
+            self.tiempos_s[nombre] = self.tiempos_s.get(nombre, 0.0) + etapa["total_ms"] / 1000.0
+            self.llamadas[nombre] = self.llamadas.get(nombre, 0) + etapa["llamadas"]
+
+    def a_dict(self):
+        return {
+            "tiempos": {nombre: {"llamadas": self.llamadas[nombre], "total_ms": round(segundos * 1000.0, 3)}
+                        for nombre, segundos in self.tiempos_s.items()},
+            "contadores": dict(self.contadores),
+            "maximos": dict(self.maximos),
+        }
+
+    def reporte(self):
+        """Tabla de texto: etapas de mayor a menor tiempo y luego contadores y máximos por nombre."""
+        lineas = ["--- PERFIL ---", f"{'etapa':<36}{'llamadas':>10}{'total ms':>12}{'media ms':>12}"]
+        for nombre, segundos in sorted(self.tiempos_s.items(), key=lambda item: -item[1]):
+            llamadas = self.llamadas[nombre]
+            lineas.append(f"{nombre:<36}{llamadas:>10}{segundos * 1000.0:>12.3f}{segundos * 1000.0 / llamadas:>12.3f}")
+        if self.contadores or self.maximos:
+            lineas.append(f"{'contador':<36}{'valor':>10}")
+            for nombre, valor in sorted(self.contadores.items()):
+                lineas.append(f"{nombre:<36}{valor:>10}")
+            for nombre, valor in sorted(self.maximos.items()):
+                lineas.append(f"{nombre + ' (máx.)':<36}{valor:>10}")
+        return "\n".join(lineas)
+
+
+def activar():
+    """Empieza una corrida nueva y la devuelve."""
+    global ACTIVAS
+    ACTIVAS = Metricas()
+    return ACTIVAS
+
+
+def desactivar():
+    """Apaga la instrumentación y devuelve lo acumulado (None si no estaba activa)."""
+    global ACTIVAS
+    metricas, ACTIVAS = ACTIVAS, None
+    return metricas
+
+
+def contar(nombre, cantidad=1):
+    if ACTIVAS is not None: ACTIVAS.sumar(nombre, cantidad)
+
+
+def registrar_maximo(nombre, valor):
+    if ACTIVAS is not None: ACTIVAS.maximo(nombre, valor)
+
+
+def medido(nombre):
+    """Decorador que acumula el tiempo y las llamadas de la función bajo `nombre` si hay métricas activas."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            metricas = ACTIVAS
+            if metricas is None: return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                metricas.tiempo(nombre, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
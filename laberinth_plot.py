@@ -0,0 +1,45 @@
+"""Grafos de caminos (networkx) y su dibujo (matplotlib), separados de los solvers.
+
+Importar este módulo no carga networkx ni matplotlib: cada función los importa al usarse por primera
+vez, así que laberinth_algorithms resuelve y genera instrucciones sin ellos.
+"""
+
+
+def camino_a_grafo_ponderado(camino_coordenadas):
+    import networkx as nx
+    if not camino_coordenadas or len(camino_coordenadas) < 2: return nx.Graph(), {}, {}
+    G = nx.Graph(); pos_layout = {}; edge_labels = {}
+    nodo_grafo_actual = camino_coordenadas[0]
+    G.add_node(nodo_grafo_actual)
+    pos_layout[nodo_grafo_actual] = (camino_coordenadas[0][1], -camino_coordenadas[0][0])
+    pasos_segmento = 0
+    dr_seg, dc_seg = (camino_coordenadas[1][0] - camino_coordenadas[0][0], camino_coordenadas[1][1] - camino_coordenadas[0][1])
+    dir_actual_segmento = (dr_seg, dc_seg)
+    for i in range(len(camino_coordenadas) - 1):
+        pasos_segmento += 1
+        coord_sig = camino_coordenadas[i+1]
+        es_final = (i + 1 == len(camino_coordenadas) - 1)
+        cambio_dir = False
+        if not es_final:
+            dr_prox, dc_prox = (camino_coordenadas[i+2][0] - coord_sig[0], camino_coordenadas[i+2][1] - coord_sig[1])
+            if (dr_prox, dc_prox) != dir_actual_segmento: cambio_dir = True
+        if es_final or cambio_dir:
+            nuevo_nodo = coord_sig
+            G.add_node(nuevo_nodo); pos_layout[nuevo_nodo] = (nuevo_nodo[1], -nuevo_nodo[0])
+            G.add_edge(nodo_grafo_actual, nuevo_nodo, weight=pasos_segmento)
+            edge_labels[(nodo_grafo_actual, nuevo_nodo)] = pasos_segmento
+            nodo_grafo_actual = nuevo_nodo; pasos_segmento = 0
+            if not es_final: dir_actual_segmento = (dr_prox, dc_prox)
+    return G, pos_layout, edge_labels
+
+
+def visualizar_grafo_de_camino(G, pos, edge_labels, title):
+    import matplotlib.pyplot as plt
+    import networkx as nx
+    if not G.nodes(): print(f"Grafo para '{title}' vacío."); return
+    plt.figure(num=title, figsize=(9, 7)) 
+    node_labels = {node: f"({node[0]},{node[1]})" for node in G.nodes()}
+    nx.draw(G, pos, with_labels=True, labels=node_labels, node_color='lightgreen', node_size=1000, font_size=7, font_weight='normal')
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_color='darkred', font_size=7)
+    plt.title(title, fontsize=10) 
+    plt.draw(); plt.pause(0.01) 
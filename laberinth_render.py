@@ -0,0 +1,201 @@
+"""Renderizado raster de laberintos y caminos con numpy y el backend Agg de matplotlib.
+
+El laberinto se convierte una sola vez en una imagen RGBA (una tabla de colores indexada por el valor
+numérico de cada celda) y cada camino se pinta encima con indexación de arrays, así que el costo no
+depende de cuántos nodos tenga el camino como en visualizar_grafo_de_camino. Los laberintos más
+grandes que `lado_max_px` se reducen en bloques de factor x factor celdas (cada bloque toma un tono
+entre muro y pasillo según la fracción de celdas abiertas) y los caminos se pintan en el bloque que
+les toca, así que un camino de una celda de ancho sigue visible.
+
+RenderizadorLaberinto crea una única Figure (sin pyplot: no abre ventanas ni queda registrada) y la
+reutiliza para cada imagen. Uso desde la línea de comandos, sobre la salida de laberinth_batch.py:
+    python laberinth_render.py resultados.jsonl -o imagenes/            # un PNG por camino
+    python laberinth_render.py resultados.jsonl -o imagenes/ --hoja     # además una hoja de contactos
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from laberinth_algorithms import WALL, PATH, START, END
+from laberinth_grid import _strings_a_planos, _TABLA_CHARS
+
+LADO_MAX_PX = 2048 # Por encima se reduce el laberinto en bloques de factor x factor celdas
+LADO_MIN_PX = 600  # Los laberintos chicos se amplían hasta aquí (cada celda es un bloque de píxeles)
+DPI = 100
+COMPRESION_PNG = 1 # Nivel zlib de los PNG: con el 6 por defecto, comprimir un laberinto grande tarda más que dibujarlo
+# Color RGBA de cada valor numérico de celda (WALL, PATH, START, END). Las imágenes son RGBA uint8
+# porque es el formato que Agg compone sin convertir.
+COLORES_CELDA = np.zeros((4, 4), dtype=np.uint8)
+COLORES_CELDA[WALL] = (40, 40, 48, 255)
+COLORES_CELDA[PATH] = (245, 245, 240, 255)
+COLORES_CELDA[START] = (30, 160, 60, 255)
+COLORES_CELDA[END] = (200, 40, 40, 255)
+# Colores de los caminos en orden de ranking (los de tab10 sin el verde ni el rojo de S y E)
+PALETA_CAMINOS = np.array([(31, 119, 180, 255), (255, 127, 14, 255), (148, 103, 189, 255), (140, 86, 75, 255),
+                           (227, 119, 194, 255), (127, 127, 127, 255), (188, 189, 34, 255), (23, 190, 207, 255)], dtype=np.uint8)
+
+
+def grid_numerico(laberinto):
+    """Array uint8 (alto, ancho) con WALL/PATH/START/END a partir de la lista de strings, el laberinto
+    numérico de parse_laberinto o un LaberintoGrid."""
+    datos = getattr(laberinto, 'datos', None)
+    if datos is not None: # LaberintoGrid
+        return datos[1:-1, 1:-1]
+    if laberinto and isinstance(laberinto[0], str):
+        planos, alto, ancho = _strings_a_planos(laberinto)
+        return np.frombuffer(planos.translate(_TABLA_CHARS), dtype=np.uint8).reshape(alto, ancho)
+    return np.asarray(laberinto, dtype=np.uint8)
+
+
+def _reducir(celdas, factor):
+    """Imagen RGBA del laberinto con un píxel por bloque de factor x factor celdas (1: sin reducir)."""
+    if factor == 1: return COLORES_CELDA[celdas]
+    alto, ancho = celdas.shape
+    alto_r, ancho_r = math.ceil(alto / factor), math.ceil(ancho / factor)
+    abierto = np.zeros((alto_r * factor, ancho_r * factor), dtype=np.float32)
+    abierto[:alto, :ancho] = celdas != WALL
+    fraccion = abierto.reshape(alto_r, factor, ancho_r, factor).mean(axis=(1, 3))[..., None]
+    muro, pasillo = COLORES_CELDA[WALL].astype(np.float32), COLORES_CELDA[PATH].astype(np.float32)
+    return (muro + (pasillo - muro) * fraccion).astype(np.uint8)
+
+
+def _coordenadas(camino):
+    """Array (n, 2) de filas y columnas de un camino (lista de (r, c) o dict con "coordenadas")."""
+    if isinstance(camino, dict): camino = camino["coordenadas"]
+    return np.fromiter(itertools.chain.from_iterable(camino), dtype=np.intp, count=2 * len(camino)).reshape(-1, 2)
+
+
+def _titulo(i, camino):
+    if isinstance(camino, dict) and "nombre" in camino:
+        return f"{i}. {camino['nombre']} ({len(camino['coordenadas'])} celdas)"
+    return f"{i}. ({len(camino)} celdas)"
+
+
+class RenderizadorLaberinto:
+    """Dibuja un laberinto con caminos superpuestos en una Figure Agg que se reutiliza entre imágenes.
+
+    `imagen(caminos)` devuelve el array RGBA; `dibujar` lo pone en la figura (un solo imshow cuyo contenido
+    se reemplaza) y `guardar` lo escribe como PNG. Con varios caminos, el primero queda encima."""
+
+    def __init__(self, laberinto, lado_max_px=LADO_MAX_PX, lado_min_px=LADO_MIN_PX, dpi=DPI):
+        celdas = grid_numerico(laberinto)
+        alto, ancho = celdas.shape
+        self.factor = max(1, math.ceil(max(alto, ancho) / lado_max_px))
+        self._base = _reducir(celdas, self.factor)
+        # S y E se pintan al final para que no los tape un camino ni los pierda la reducción
+        self._extremos = [(tuple(np.argwhere(celdas == valor)[:1].ravel() // self.factor), COLORES_CELDA[valor])
+                          for valor in (START, END) if (celdas == valor).any()]
+        alto_img, ancho_img = self._base.shape[:2]
+        escala = max(1, lado_min_px // max(alto_img, ancho_img, 1))
+        self.dpi = dpi
+        self.figura = Figure(figsize=(ancho_img * escala / dpi, alto_img * escala / dpi), dpi=dpi)
+        FigureCanvasAgg(self.figura)
+        self.ejes = self.figura.add_axes((0, 0, 1, 1))
+        self.ejes.set_axis_off()
+        self._imshow = self.ejes.imshow(self._base, interpolation='none')
+        self._titulo = self.figura.text(0.01, 0.99, "", va='top', ha='left', fontsize=9,
+                                        bbox={'facecolor': 'white', 'alpha': 0.8, 'edgecolor': 'none'})
+
+    def imagen(self, caminos=()):
+        """Array RGBA uint8 del laberinto reducido con `caminos` pintados con PALETA_CAMINOS en orden."""
+        imagen = self._base.copy()
+        for i in reversed(range(len(caminos))):
+            coords = _coordenadas(caminos[i]) // self.factor
+            imagen[coords[:, 0], coords[:, 1]] = PALETA_CAMINOS[i % len(PALETA_CAMINOS)]
+        for posicion, color in self._extremos:
+            imagen[posicion] = color
+        return imagen
+
+    def dibujar(self, caminos=(), titulo=""):
+        self._imshow.set_data(self.imagen(caminos))
+        self._titulo.set_text(titulo)
+        self._titulo.set_visible(bool(titulo))
+        return self.figura
+
+    def guardar(self, ruta, caminos=(), titulo=""):
+        self.dibujar(caminos, titulo).savefig(ruta, dpi=self.dpi, pil_kwargs={'compress_level': COMPRESION_PNG})
+        return ruta
+
+
+def exportar_caminos(laberinto, caminos, directorio, prefijo="camino", juntos=True):
+    """Guarda un PNG por camino (`prefijo`_00.png, ... en el orden de `caminos`) y, con `juntos`, uno más
+    con todos superpuestos. `caminos` son listas de (r, c) o los dicts rankeados con "coordenadas" y
+    "nombre". Devuelve las rutas escritas."""
+    os.makedirs(directorio, exist_ok=True)
+    renderizador = RenderizadorLaberinto(laberinto)
+    rutas = [renderizador.guardar(os.path.join(directorio, f"{prefijo}_{i:02d}.png"), [camino], _titulo(i, camino))
+             for i, camino in enumerate(caminos)]
+    if juntos and caminos:
+        rutas.append(renderizador.guardar(os.path.join(directorio, f"{prefijo}_todos.png"), caminos,
+                                          f"{len(caminos)} caminos (el 0 encima)"))
+    return rutas
+
+
+def hoja_de_contactos(laberinto, caminos, ruta, columnas=None, lado_miniatura_px=400, dpi=DPI):
+    """Un solo PNG con una miniatura por camino en una grilla de `columnas` (por defecto la más cuadrada
+    posible). Las miniaturas se arman en un array y se dibujan con un único imshow."""
+    if not caminos: return None
+    renderizador = RenderizadorLaberinto(laberinto, lado_max_px=lado_miniatura_px, lado_min_px=0)
+    miniaturas = [renderizador.imagen([camino]) for camino in caminos]
+    alto, ancho = miniaturas[0].shape[:2]
+    escala = max(1, lado_miniatura_px // max(alto, ancho))
+    columnas = columnas or math.ceil(math.sqrt(len(miniaturas)))
+    filas = math.ceil(len(miniaturas) / columnas)
+    margen = max(2, (alto + ancho) // 40, math.ceil(16 / escala)) # Deja lugar para el título arriba de cada miniatura
+    hoja = np.full((filas * (alto + margen) + margen, columnas * (ancho + margen) + margen, 4), 255, dtype=np.uint8)
+    for i, miniatura in enumerate(miniaturas):
+        fila, columna = divmod(i, columnas)
+        r0, c0 = margen + fila * (alto + margen), margen + columna * (ancho + margen)
+        hoja[r0:r0 + alto, c0:c0 + ancho] = miniatura
+    figura = Figure(figsize=(hoja.shape[1] * escala / dpi, hoja.shape[0] * escala / dpi), dpi=dpi)
+    FigureCanvasAgg(figura)
+    ejes = figura.add_axes((0, 0, 1, 1))
+    ejes.set_axis_off()
+    ejes.imshow(hoja, interpolation='none')
+    for i, camino in enumerate(caminos):
+        fila, columna = divmod(i, columnas)
+        ejes.text(margen + columna * (ancho + margen), margen + fila * (alto + margen) - 0.5, _titulo(i, camino),
+                  va='bottom', ha='left', fontsize=8)
+    figura.savefig(ruta, dpi=dpi, pil_kwargs={'compress_level': COMPRESION_PNG})
+    return ruta
+
+
+def main(argv=None):
+    from laberinth_batch import leer_laberinto
+    parser = argparse.ArgumentParser(description="Dibuja como PNG los caminos de la salida JSON Lines de laberinth_batch.py.")
+    parser.add_argument("resultados", help="Archivo JSON Lines de laberinth_batch.py (con coordenadas)")
+    parser.add_argument("-o", "--directorio", default=".", help="Directorio de salida (por defecto el actual)")
+    parser.add_argument("--hoja", action="store_true", help="Además una hoja de contactos por laberinto")
+    parser.add_argument("--solo-hoja", action="store_true", help="Solo la hoja de contactos, sin un PNG por camino")
+    args = parser.parse_args(argv)
+
+    escritos = 0
+    with open(args.resultados, encoding='utf-8') as f:
+        for linea in f:
+            resultado = json.loads(linea)
+            caminos = [c for c in resultado.get("caminos", []) if "coordenadas" in c]
+            if not caminos:
+                if "caminos" in resultado:
+                    print(f"{resultado['archivo']}: sin coordenadas (¿se usó --sin-coordenadas?).", file=sys.stderr)
+                continue
+            laberinto = leer_laberinto(resultado["archivo"])
+            prefijo = os.path.splitext(os.path.basename(resultado["archivo"]))[0]
+            if not args.solo_hoja:
+                escritos += len(exportar_caminos(laberinto, caminos, args.directorio, prefijo))
+            if args.hoja or args.solo_hoja:
+                os.makedirs(args.directorio, exist_ok=True)
+                hoja_de_contactos(laberinto, caminos, os.path.join(args.directorio, f"{prefijo}_hoja.png"))
+                escritos += 1
+    print(f"{escritos} imágenes escritas en {args.directorio}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,7 @@
+import array
+import itertools
+import random
+
 laberinto_str = [
     "#####E#",
     "# # # #",
@@ -48,11 +52,245 @@ def convertir_laberinto(laberinto_str):
         raise ValueError("El laberinto debe tener un punto de Inicio (S) y Fin (E)")
     return mapa_numerico, pos_inicio, pos_fin
 
-# Uso:
-#laberinto_numerico, pos_inicio, pos_fin = convertir_laberinto(laberinto_str)
-#print(laberinto_numerico)
-#print("Inicio:", pos_inicio, "Fin:", pos_fin)
+# --- Generadores de laberintos ---
+# Trabajan sobre un bytearray plano de la rejilla de caracteres con un borde extra de CENTINELA, de modo
+# que las celdas (posiciones de fila y columna impares en el laberinto) están a 2 posiciones de sus
+# vecinas, el muro entre dos celdas es el punto medio y nunca hace falta comprobar límites.
+MURO_B = ord('#')
+CAMINO_B = ord(' ')
+CENTINELA_B = ord('X') # Nunca queda en el resultado
+ALGORITMOS_GENERADOR = ('backtracker', 'kruskal')
+
+_PERMUTACIONES_DIR = list(itertools.permutations(range(4)))
+_TABLA_PERMUTACION = bytes(i % len(_PERMUTACIONES_DIR) for i in range(256))
+
+
+def _rejilla_vacia(filas_celdas, columnas_celdas):
+    """Rejilla (2*filas+1) x (2*columnas+1) toda de muro, rodeada de centinela. Devuelve (rejilla, ancho_con_borde)."""
+    alto_c, ancho_c = 2 * filas_celdas + 1, 2 * columnas_celdas + 1
+    ancho_b = ancho_c + 2
+    fila_centinela = bytes([CENTINELA_B]) * ancho_b
+    fila_muro = bytes([CENTINELA_B]) + bytes([MURO_B]) * ancho_c + bytes([CENTINELA_B])
+    return bytearray(fila_centinela + fila_muro * alto_c + fila_centinela), ancho_b
+
+
+def _pos_celda(ancho_b, r, c):
+    """Posición en la rejilla con borde de la celda (r, c) (coordenadas de celda, no de caracter)."""
+    return (2 * r + 2) * ancho_b + 2 * c + 2
+
+
+def _generar_backtracker(rejilla, ancho_b, filas_celdas, columnas_celdas, rng):
+    """Backtracker recursivo en versión iterativa. Cada celda recibe al azar una de las 24 órdenes de
+    las 4 direcciones y guarda cuántas ya probó, así la pila solo contiene posiciones."""
+    pasos = (-2 * ancho_b, 2, 2 * ancho_b, -2)
+    ordenes = [tuple(pasos[d] for d in perm) for perm in _PERMUTACIONES_DIR]
+    eleccion = rng.randbytes(len(rejilla)).translate(_TABLA_PERMUTACION)
+    probadas = bytearray(len(rejilla))
+
+    inicio = _pos_celda(ancho_b, 0, 0)
+    rejilla[inicio] = CAMINO_B
+    pila = [inicio]
+    while pila:
+        actual = pila[-1]
+        k = probadas[actual]
+        if k == 4:
+            pila.pop()
+            continue
+        probadas[actual] = k + 1
+        vecina = actual + ordenes[eleccion[actual]][k]
+        if rejilla[vecina] == MURO_B: # Celda sin visitar (fuera del laberinto hay centinela)
+            rejilla[vecina] = CAMINO_B
+            rejilla[(actual + vecina) >> 1] = CAMINO_B
+            pila.append(vecina)
+
+
+def _generar_kruskal(rejilla, ancho_b, filas_celdas, columnas_celdas, rng):
+    """Kruskal: recorre los muros internos en orden aleatorio y tumba los que unen dos componentes
+    distintas. Con numpy el orden sale de np.random.default_rng(...).permutation y el árbol se arma con
+    _muros_kruskal_np; sin numpy se usa union-find en Python sobre el mismo tipo de orden aleatorio."""
+    for r in range(filas_celdas):
+        base = _pos_celda(ancho_b, r, 0)
+        rejilla[base:base + 2 * columnas_celdas:2] = bytes([CAMINO_B]) * columnas_celdas
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        # Se siembra desde rng para que cualquier semilla de random.Random (también strings) funcione
+        muros = _muros_kruskal_np(np, ancho_b, filas_celdas, columnas_celdas, np.random.default_rng(rng.getrandbits(64)))
+        np.frombuffer(rejilla, dtype=np.uint8)[muros] = CAMINO_B
+        return
+
+    # union-find con compresión por mitades. padre[x] == 0 significa que x es raíz; ninguna celda está
+    # en la posición 0 porque la rejilla tiene borde.
+    muros = array.array('l')
+    for r in range(filas_celdas):
+        base = _pos_celda(ancho_b, r, 0)
+        muros.extend(range(base + 1, base + 2 * columnas_celdas - 1, 2)) # Entre (r, c) y (r, c+1)
+        if r < filas_celdas - 1:
+            muros.extend(range(base + ancho_b, base + ancho_b + 2 * columnas_celdas, 2)) # Entre (r, c) y (r+1, c)
+    rng.shuffle(muros)
+
+    padre = [0] * len(rejilla)
+    for muro in muros:
+        # Muro horizontal si la posición de la izquierda es celda (camino); si no, vertical
+        paso = 1 if rejilla[muro - 1] == CAMINO_B else ancho_b
+        a = muro - paso
+        pa = padre[a]
+        while pa:
+            abuelo = padre[pa]
+            if not abuelo: a = pa; break
+            padre[a] = abuelo; a = abuelo; pa = padre[a]
+        b = muro + paso
+        pb = padre[b]
+        while pb:
+            abuelo = padre[pb]
+            if not abuelo: b = pb; break
+            padre[b] = abuelo; b = abuelo; pb = padre[b]
+        if a != b:
+            padre[a] = b
+            rejilla[muro] = CAMINO_B
+
+
+def _muros_kruskal_np(np, ancho_b, filas_celdas, columnas_celdas, generador):
+    """Posiciones en la rejilla de los muros que tumba Kruskal con el orden generador.permutation.
+
+    Ese orden da a cada muro un peso distinto, así que el árbol de Kruskal es el único árbol generador
+    mínimo y se puede armar con Borůvka, que es vectorizable: en cada ronda cada componente elige su
+    muro más liviano hacia otra (np.minimum.at), las componentes elegidas se unen por saltos de punteros
+    y se renumeran, y se descartan los muros que quedaron adentro de una componente. Cada ronda al menos
+    divide a la mitad las componentes (unas 11 rondas para 2000x2000 celdas)."""
+    n = filas_celdas * columnas_celdas
+    tipo = np.int32 if 2 * n < 2 ** 31 else np.int64
+    celdas = np.arange(n, dtype=tipo).reshape(filas_celdas, columnas_celdas)
+    # Extremos de cada muro: (r, c)-(r, c+1) y (r, c)-(r+1, c), en el orden de Kruskal
+    orden = generador.permutation(filas_celdas * (columnas_celdas - 1) + (filas_celdas - 1) * columnas_celdas)
+    u = np.concatenate((celdas[:, :-1].ravel(), celdas[:-1, :].ravel()))[orden]
+    v = np.concatenate((celdas[:, 1:].ravel(), celdas[1:, :].ravel()))[orden]
+
+    tumbado = np.zeros(u.size, dtype=bool)
+    comp_u, comp_v, muro = u, v, np.arange(u.size, dtype=tipo) # Muros que todavía unen componentes distintas
+    componentes = n
+    while muro.size:
+        posicion = np.arange(muro.size, dtype=tipo) # La posición en el orden es el peso
+        mejor = np.full(componentes, muro.size, dtype=tipo)
+        np.minimum.at(mejor, comp_u, posicion)
+        np.minimum.at(mejor, comp_v, posicion)
+        tumbado[muro[mejor]] = True
+        # Cada componente apunta a la del otro lado de su muro elegido; los pares que se eligieron
+        # mutuamente (el mismo muro) dejan como raíz la de menor número
+        propia = np.arange(componentes, dtype=tipo)
+        lado_u = comp_u[mejor]
+        sucesor = np.where(lado_u == propia, comp_v[mejor], lado_u)
+        mutuo = (sucesor[sucesor] == propia) & (propia < sucesor)
+        sucesor[mutuo] = propia[mutuo]
+        while True:
+            salto = sucesor[sucesor]
+            if np.array_equal(salto, sucesor): break
+            sucesor = salto
+        es_raiz = sucesor == propia
+        nuevo = np.cumsum(es_raiz, dtype=tipo) - 1
+        etiqueta = nuevo[sucesor]
+        comp_u, comp_v = etiqueta[comp_u], etiqueta[comp_v]
+        sigue = comp_u != comp_v
+        comp_u, comp_v, muro = comp_u[sigue], comp_v[sigue], muro[sigue]
+        componentes = int(nuevo[-1]) + 1
+
+    # El muro es el punto medio entre las posiciones de sus dos celdas en la rejilla
+    u, v = u[tumbado].astype(np.intp), v[tumbado].astype(np.intp)
+    pos_u = (2 * (u // columnas_celdas) + 2) * ancho_b + 2 * (u % columnas_celdas) + 2
+    pos_v = (2 * (v // columnas_celdas) + 2) * ancho_b + 2 * (v % columnas_celdas) + 2
+    return (pos_u + pos_v) >> 1
+
+
+def _trenzar(rejilla, ancho_b, filas_celdas, columnas_celdas, proporcion, rng):
+    """Quita callejones sin salida: a cada uno, con probabilidad `proporcion`, se le abre un muro hacia
+    otra celda (preferentemente otro callejón). El resultado tiene ciclos, que es el caso en que los
+    enumeradores BFS/DFS crecen exponencialmente; con proporcion=1 no queda ningún callejón."""
+    pasos = (-ancho_b, 1, ancho_b, -1)
+    for r in range(filas_celdas):
+        pos = _pos_celda(ancho_b, r, 0)
+        for _ in range(columnas_celdas):
+            abiertos = (rejilla[pos - ancho_b] == CAMINO_B) + (rejilla[pos + 1] == CAMINO_B) + \
+                       (rejilla[pos + ancho_b] == CAMINO_B) + (rejilla[pos - 1] == CAMINO_B)
+            if abiertos == 1 and rng.random() < proporcion:
+                candidatos = [p for p in pasos if rejilla[pos + p] == MURO_B and rejilla[pos + 2 * p] == CAMINO_B]
+                if candidatos:
+                    callejones = [p for p in candidatos if
+                                  (rejilla[pos + 2 * p - ancho_b] == CAMINO_B) + (rejilla[pos + 2 * p + 1] == CAMINO_B) +
+                                  (rejilla[pos + 2 * p + ancho_b] == CAMINO_B) + (rejilla[pos + 2 * p - 1] == CAMINO_B) == 1]
+                    rejilla[pos + rng.choice(callejones or candidatos)] = CAMINO_B
+            pos += 2
+
+
+def _abrir_habitaciones(rejilla, ancho_b, filas_celdas, columnas_celdas, cantidad, rng):
+    """Vacía `cantidad` rectángulos al azar (de 2 celdas hasta un quinto del laberinto por lado),
+    quitando todos los muros de adentro: zonas abiertas con muchísimos caminos equivalentes."""
+    for _ in range(cantidad):
+        alto_h = rng.randint(2, max(2, filas_celdas // 5))
+        ancho_h = rng.randint(2, max(2, columnas_celdas // 5))
+        if alto_h > filas_celdas or ancho_h > columnas_celdas: continue
+        r0 = rng.randrange(filas_celdas - alto_h + 1)
+        c0 = rng.randrange(columnas_celdas - ancho_h + 1)
+        largo = 2 * ancho_h - 1
+        for fila in range(2 * r0 + 2, 2 * (r0 + alto_h - 1) + 3):
+            inicio = fila * ancho_b + 2 * c0 + 2
+            rejilla[inicio:inicio + largo] = bytes([CAMINO_B]) * largo
+
+
+def generar_laberinto(alto, ancho, algoritmo='backtracker', semilla=None, trenzado=0.0, habitaciones=0):
+    """Genera un laberinto de `alto` x `ancho` caracteres como lista de strings, en el formato que
+    aceptan convertir_laberinto y parse_laberinto: 'S' en el borde izquierdo (fila 1) y 'E' en el
+    borde inferior bajo la última celda. Con alto/ancho pares sobra una fila/columna de muro al final.
+
+    algoritmo: 'backtracker' (pasillos largos, pocos cruces) o 'kruskal' (muchos cruces cortos).
+    semilla: el mismo valor produce siempre el mismo laberinto.
+    trenzado: proporción (0 a 1) de callejones sin salida que se abren para formar ciclos.
+    habitaciones: cantidad de zonas rectangulares sin muros interiores.
+    Todo se hace sobre un bytearray plano: 4001x4001 tarda unos 5 s con el backtracker (el trenzado
+    suma menos de 1 s) y unos 3.5 s con kruskal si está numpy (1001x1001 en 0.15 s, 2001x2001 en
+    0.7 s); sin numpy kruskal usa union-find en Python y tarda unos 27 s."""
+    if alto < 3 or ancho < 3:
+        raise ValueError("El laberinto debe medir al menos 3x3.")
+    if algoritmo not in ALGORITMOS_GENERADOR:
+        raise ValueError(f"Algoritmo desconocido: {algoritmo}. Opciones: {', '.join(ALGORITMOS_GENERADOR)}")
+    rng = random.Random(semilla)
+    filas_celdas, columnas_celdas = (alto - 1) // 2, (ancho - 1) // 2
+    rejilla, ancho_b = _rejilla_vacia(filas_celdas, columnas_celdas)
+    if algoritmo == 'backtracker':
+        _generar_backtracker(rejilla, ancho_b, filas_celdas, columnas_celdas, rng)
+    else:
+        _generar_kruskal(rejilla, ancho_b, filas_celdas, columnas_celdas, rng)
+    if trenzado > 0:
+        _trenzar(rejilla, ancho_b, filas_celdas, columnas_celdas, trenzado, rng)
+    if habitaciones > 0:
+        _abrir_habitaciones(rejilla, ancho_b, filas_celdas, columnas_celdas, habitaciones, rng)
+
+    alto_c, ancho_c = 2 * filas_celdas + 1, 2 * columnas_celdas + 1
+    rejilla[2 * ancho_b + 1] = ord('S')
+    rejilla[(alto_c) * ancho_b + 2 * columnas_celdas] = ord('E')
+    extra_col = '#' * (ancho - ancho_c)
+    filas = [rejilla[(r + 1) * ancho_b + 1:(r + 2) * ancho_b - 1].decode('ascii') + extra_col for r in range(alto_c)]
+    filas.extend('#' * ancho for _ in range(alto - alto_c))
+    return filas
+
+
+def guardar_laberinto(filas, ruta):
+    """Escribe el laberinto en un archivo de texto, una fila por línea (el formato de laberinth_batch.py)."""
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write("\n".join(filas) + "\n")
+
+
+if __name__ == "__main__":
+    # Uso:
+    #laberinto_numerico, pos_inicio, pos_fin = convertir_laberinto(laberinto_str)
+    #print(laberinto_numerico)
+    #print("Inicio:", pos_inicio, "Fin:", pos_fin)
+
+    laberinto_numerico, pos_inicio, pos_fin = convertir_laberinto(laberinto_real)
+    print(laberinto_numerico)
+    print("Inicio:", pos_inicio, "Fin:", pos_fin)
 
-laberinto_numerico, pos_inicio, pos_fin = convertir_laberinto(laberinto_real)
-print(laberinto_numerico)
-print("Inicio:", pos_inicio, "Fin:", pos_fin)
+    # Laberinto generado (mismo resultado en cada ejecución gracias a la semilla)
+    for fila in generar_laberinto(11, 21, algoritmo='kruskal', semilla=7, trenzado=0.3):
+        print(fila)
@@ -1,6 +1,9 @@
+import collections
 import serial
 import time
 
+from laberinth_algorithms import estimar_tiempo_instrucciones_ms, expandir_instrucciones
+
 laberinto_real = [
         "############",
         "S    #     #",
@@ -14,76 +17,301 @@ laberinto_real = [
         "#          #",
         "##########E#"] 
         
-def enviar_instrucciones(arduino_serial, instrucciones_str):
-    if not arduino_serial.isOpen():
-        print("La conexión serial no está abierta.")
-        return
-
-    print(f"Enviando instrucciones: {instrucciones_str}")
-    arduino_serial.write((instrucciones_str + '\n').encode('utf-8'))
-    
-    estimated_time_ms = 0
-    tiempo_de_espera_total = 0
-
-    if instrucciones_str.upper() == "!E": # Convertir a mayúsculas por si acaso
-        print("Comando !E detectado, usando tiempo de espera extendido para Arduino.")
-        tiempo_de_espera_total = 20.0 # Esperar 20 segundos (ajusta si tu secuencia es más larga)
-    elif instrucciones_str.upper() == "!C":
-        print("Comando !C detectado, usando tiempo de espera corto.")
-        tiempo_de_espera_total = 3.0 # 3 segundos deberían ser suficientes
-    else: # Para !Sxxxx y otros comandos
-        num_comandos = 0
-        # Si es un comando de guardado como !SFFRF, calculamos para la parte FFRF
-        if instrucciones_str.upper().startswith("!S") and len(instrucciones_str) > 2:
-            comandos_reales = instrucciones_str[2:]
-        else:
-            comandos_reales = instrucciones_str
-
-        for i, char_command in enumerate(comandos_reales):
-            if char_command.upper() == 'F':
-                estimated_time_ms += 500 
-            elif char_command.upper() == 'R' or char_command.upper() == 'L':
-                estimated_time_ms += 1500
-            
-            if i < len(comandos_reales) - 1:
-                estimated_time_ms += 200 # PAUSA_ENTRE_COMANDOS
-        
-        estimated_time_s = estimated_time_ms / 1000.0
-        print(f"Tiempo estimado de ejecución en Arduino (para '{comandos_reales}'): {estimated_time_s:.2f} segundos.")
-        tiempo_de_espera_total = estimated_time_s + 4.0 # 4 segundos de búfer
-
-    print(f"Esperando {tiempo_de_espera_total:.2f} segundos para el feedback de Arduino...")
-    start_time = time.time()
-    
-    while time.time() - start_time < tiempo_de_espera_total:
-        if arduino_serial.in_waiting > 0:
+# --- Líneas de estado que imprime version_arduino.ino ---
+LINEA_ESPERANDO = "Esperando nuevos comandos por Serial..." # Se imprime al terminar cualquier comando
+LINEA_COMPLETADA = "Secuencia de instrucciones completada."
+PREFIJOS_ERROR = ("Error", "No hay", "Comando !S sin secuencia", "Instruccion desconocida")
+PREFIJO_CREDITO = "CREDITO " # Modo streaming (!T): "CREDITO n" autoriza a mandar n comandos más
+
+PUERTO_POR_DEFECTO = '/dev/ttyUSB0' # 'COM3' o similar en Windows; listar con: python -m serial.tools.list_ports
+BAUDIOS = 9600
+ESPERA_REINICIO_S = 2.0 # Abrir el puerto reinicia el Arduino; esto es lo que tarda en volver a escuchar
+TIEMPO_LIMITE_E_S = 120.0 # Red de seguridad para !E: la ruta guardada puede ser larga
+TIEMPO_LIMITE_C_S = 3.0
+MARGEN_TIEMPO_LIMITE_S = 4.0 # Se suma al tiempo estimado de una secuencia
+
+
+def leer_respuestas_arduino(arduino_serial, tiempo_limite_s):
+    """Generador que entrega cada línea del Arduino en cuanto llega y termina justo después de
+    LINEA_ESPERANDO, que el sketch imprime al acabar cualquier comando. `tiempo_limite_s` es solo una
+    red de seguridad por si esa línea nunca llega. Usa readline() con el timeout del puerto acotado al
+    tiempo restante, así que no hay sondeo de in_waiting."""
+    limite = time.monotonic() + tiempo_limite_s
+    timeout_original = arduino_serial.timeout
+    pendiente = b""
+    try:
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0: break
+            arduino_serial.timeout = min(restante, 1.0)
             try:
-                respuesta = arduino_serial.readline().decode('utf-8', errors='ignore').rstrip()
-                print(f"Arduino: {respuesta}")
+                pendiente += arduino_serial.readline()
             except Exception as e:
                 print(f"Error leyendo de Arduino: {e}")
-        time.sleep(0.05)
-    
-    print("Lectura de feedback de Arduino finalizada (o tiempo de espera agotado).")
+                break
+            if not pendiente.endswith(b"\n"): continue
+            linea = pendiente.decode('utf-8', errors='ignore').rstrip(); pendiente = b""
+            if not linea: continue
+            yield linea
+            if linea == LINEA_ESPERANDO: return
+    finally:
+        arduino_serial.timeout = timeout_original
+    # Imprimir cualquier resto en el buffer que no terminó en \n (si es relevante)
+    if pendiente.strip():
+        yield pendiente.decode('utf-8', errors='ignore').strip()
+
+
+def tiempo_limite_para(instrucciones_str):
+    """Tiempo máximo de espera (segundos) para la respuesta a un comando."""
+    if instrucciones_str.upper() == "!E":
+        return TIEMPO_LIMITE_E_S
+    if instrucciones_str.upper() == "!C":
+        return TIEMPO_LIMITE_C_S
+    comandos_reales = instrucciones_str
+    if instrucciones_str.upper().startswith("!S") and len(instrucciones_str) > 2:
+        comandos_reales = instrucciones_str[2:] # Solo la parte de los movimientos
+    return estimar_tiempo_instrucciones_ms(comandos_reales) / 1000.0 + MARGEN_TIEMPO_LIMITE_S
 
-if __name__ == "__main__":
-    arduino_conn = None
-    try:
-        # Reemplaza '/dev/ttyUSB0' con tu puerto correcto si es diferente
-        # El timeout es importante para que readline no bloquee indefinidamente si no hay datos
-        arduino_conn = serial.Serial(port='/dev/ttyUSB0', baudrate=9600, timeout=1)
-        print(f"Conectado a Arduino en {arduino_conn.name}.")
 
-        # Esperar a que Arduino se reinicie después de abrir el puerto serial.
-        # Esto es común. El IDE de Arduino también lo hace.
-        print("Esperando 2 segundos para que Arduino se inicialice...")
-        time.sleep(2) 
+def abrir_conexion(puerto=PUERTO_POR_DEFECTO, baudios=BAUDIOS, espera_reinicio_s=ESPERA_REINICIO_S, registrar=print):
+    """Abre el puerto serial, espera a que el Arduino termine de reiniciarse y descarta (mostrándolo con
+    `registrar`) lo que imprimió al arrancar. El timeout de 1 s es para que readline no bloquee
+    indefinidamente si no hay datos. Lanza serial.SerialException si no se puede abrir."""
+    registrar(f"Intentando conectar a Arduino en {puerto}...")
+    conexion = serial.Serial(port=puerto, baudrate=baudios, timeout=1)
+    registrar(f"Conectado a Arduino en {conexion.name}.")
+    if espera_reinicio_s > 0:
+        registrar(f"Esperando {espera_reinicio_s:g} segundos para que Arduino se inicialice...")
+        time.sleep(espera_reinicio_s)
+    while conexion.in_waiting > 0: # Limpiar buffer inicial
+        mensaje = conexion.readline().decode('utf-8', errors='ignore').rstrip()
+        if mensaje: registrar(f"Arduino (inicio): {mensaje}")
+    return conexion
 
-        # Limpiar buffer de entrada leyendo cualquier mensaje inicial de Arduino (como "Arduino listo...")
-        while arduino_conn.in_waiting > 0:
-            init_msg = arduino_conn.readline().decode('utf-8', errors='ignore').rstrip()
-            print(f"Arduino (inicio): {init_msg}")
 
+def enviar_instrucciones(arduino_serial, instrucciones_str, al_recibir_linea=None, registrar=print, tiempo_limite_s=None):
+    """Envía un comando al Arduino y procesa su feedback línea por línea hasta que el sketch avisa
+    que terminó. `al_recibir_linea(linea)` se llama con cada línea (por defecto se imprime) y
+    `registrar(mensaje)` con los mensajes de estado propios. `tiempo_limite_s` reemplaza al de
+    tiempo_limite_para. Devuelve 'completado', 'error' (terminó pero reportó un error) o
+    'tiempo_agotado'; en este último caso el robot puede seguir ejecutando e imprimiendo."""
+    if not arduino_serial.isOpen():
+        registrar("La conexión serial no está abierta.")
+        return 'error'
+    if al_recibir_linea is None:
+        al_recibir_linea = lambda linea: registrar(f"Arduino: {linea}")
+
+    registrar(f"Enviando instrucciones: {instrucciones_str}")
+    arduino_serial.write((instrucciones_str + '\n').encode('utf-8')) # Añadir terminador de línea
+
+    if tiempo_limite_s is None: tiempo_limite_s = tiempo_limite_para(instrucciones_str)
+    registrar(f"Esperando la respuesta de Arduino (máximo {tiempo_limite_s:.2f} segundos)...")
+    estado = 'tiempo_agotado'
+    hubo_error = False
+    for linea in leer_respuestas_arduino(arduino_serial, tiempo_limite_s):
+        al_recibir_linea(linea)
+        if linea.startswith(PREFIJOS_ERROR): hubo_error = True
+        if linea == LINEA_ESPERANDO: estado = 'error' if hubo_error else 'completado'
+
+    _informar_estado(estado, registrar)
+    return estado
+
+
+def _informar_estado(estado, registrar=print):
+    if estado == 'tiempo_agotado':
+        registrar("Tiempo de espera agotado sin confirmación de Arduino.")
+    elif estado == 'error':
+        registrar("Arduino terminó el comando reportando un error.")
+    else:
+        registrar("Arduino terminó el comando.")
+
+
+def enviar_instrucciones_streaming(arduino_serial, instrucciones_str, al_recibir_linea=None, tamano_fragmento=8, registrar=print,
+                                   tiempo_limite_s=None):
+    """Como enviar_instrucciones, pero usando el modo streaming (!T) del sketch: la ruta se manda en
+    fragmentos ">FFRF" de hasta `tamano_fragmento` comandos, sin pasar nunca de los créditos que el
+    Arduino ha concedido, y se cierra con ".". El robot arranca con el primer fragmento y la longitud
+    de la ruta no está limitada por la RAM ni por la EEPROM. Acepta la ruta comprimida (RLE) o no.
+    `registrar` y `tiempo_limite_s` funcionan como en enviar_instrucciones.
+    Devuelve 'completado', 'error' o 'tiempo_agotado'."""
+    if not arduino_serial.isOpen():
+        registrar("La conexión serial no está abierta.")
+        return 'error'
+    if al_recibir_linea is None:
+        al_recibir_linea = lambda linea: registrar(f"Arduino: {linea}")
+
+    comandos = expandir_instrucciones(instrucciones_str)
+    registrar(f"Enviando {len(comandos)} comandos por streaming...")
+    arduino_serial.write(b"!T\n")
+
+    if tiempo_limite_s is None: tiempo_limite_s = tiempo_limite_para(comandos)
+    registrar(f"Esperando la respuesta de Arduino (máximo {tiempo_limite_s:.2f} segundos)...")
+    estado = 'tiempo_agotado'
+    hubo_error = False
+    creditos = 0
+    enviados = 0
+    stream_iniciado = False
+    fin_enviado = False
+    for linea in leer_respuestas_arduino(arduino_serial, tiempo_limite_s):
+        if linea.startswith(PREFIJO_CREDITO):
+            creditos += int(linea[len(PREFIJO_CREDITO):])
+            stream_iniciado = True
+        else:
+            al_recibir_linea(linea)
+        if linea.startswith(PREFIJOS_ERROR): hubo_error = True
+        if linea == LINEA_ESPERANDO: estado = 'error' if hubo_error else 'completado'
+
+        while creditos > 0 and enviados < len(comandos):
+            n = min(creditos, tamano_fragmento, len(comandos) - enviados)
+            arduino_serial.write(f">{comandos[enviados:enviados + n]}\n".encode('utf-8'))
+            enviados += n
+            creditos -= n
+        if stream_iniciado and enviados == len(comandos) and not fin_enviado:
+            arduino_serial.write(b".\n")
+            fin_enviado = True
+
+    _informar_estado(estado, registrar)
+    return estado
+
+
+class SerialSimulado:
+    """Sustituto en memoria de serial.Serial para probar sin hardware. Cada línea escrita se pasa a
+    `responder(comando)`, que devuelve una lista de (retardo_s, linea); las líneas quedan disponibles
+    para readline() cuando pasa su retardo. Sin `responder` contesta como el sketch, sin demoras."""
+
+    def __init__(self, responder=None, timeout=1.0):
+        self.responder = responder or self._respuesta_sketch
+        self.timeout = timeout
+        self.name = "simulado"
+        self.is_open = True
+        self.escritas = []
+        self._pendientes = collections.deque() # (instante_disponible, bytes)
+        self._entrada = b""
+
+    @staticmethod
+    def _respuesta_sketch(comando):
+        # Modo streaming: cada fragmento se "ejecuta" al llegar y devuelve sus créditos enseguida
+        if comando.startswith(">"):
+            return [(0.0, f"Procesando: {c}") for c in comando[1:]] + [(0.0, f"{PREFIJO_CREDITO}{len(comando) - 1}")]
+        if comando == ".":
+            return [(0.0, LINEA_COMPLETADA), (0.0, LINEA_ESPERANDO)]
+        respuesta = [(0.0, f"Comando recibido por Serial: {comando}")]
+        if comando.upper() == "!T":
+            return respuesta + [(0.0, f"{PREFIJO_CREDITO}32")]
+        if comando.upper() == "!C":
+            respuesta.append((0.0, "Comandos borrados de la EEPROM."))
+        elif comando.upper() != "!E":
+            secuencia = comando[2:] if comando.startswith("!S") else comando
+            respuesta.append((0.0, f"Ejecutando secuencia: {secuencia}"))
+            respuesta.append((0.0, LINEA_COMPLETADA))
+        respuesta.append((0.0, LINEA_ESPERANDO))
+        return respuesta
+
+    def isOpen(self):
+        return self.is_open
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, datos):
+        self._entrada += datos
+        ahora = time.monotonic()
+        while b"\n" in self._entrada:
+            linea, self._entrada = self._entrada.split(b"\n", 1)
+            comando = linea.decode('utf-8', errors='ignore').strip()
+            self.escritas.append(comando)
+            if not comando: continue
+            for retardo_s, respuesta in self.responder(comando):
+                self._pendientes.append((ahora + retardo_s, (respuesta + "\r\n").encode('utf-8')))
+        return len(datos)
+
+    @property
+    def in_waiting(self):
+        ahora = time.monotonic()
+        return sum(len(datos) for instante, datos in self._pendientes if instante <= ahora)
+
+    def readline(self):
+        limite = time.monotonic() + (self.timeout if self.timeout is not None else float('inf'))
+        while True:
+            ahora = time.monotonic()
+            if self._pendientes and self._pendientes[0][0] <= ahora:
+                return self._pendientes.popleft()[1]
+            siguiente = self._pendientes[0][0] if self._pendientes else float('inf')
+            if min(siguiente, limite) <= ahora:
+                return b""
+            time.sleep(min(siguiente, limite) - ahora)
+
+    def read(self, n=1):
+        datos = b""
+        while len(datos) < n and self._pendientes and self._pendientes[0][0] <= time.monotonic():
+            datos += self._pendientes.popleft()[1]
+        return datos
+
+
+class DispositivoPty:
+    """Robot falso detrás de un pseudo-terminal (solo POSIX): `puerto` es la ruta del lado esclavo
+    (/dev/pts/N) y se abre con serial.Serial o abrir_conexion como un Arduino real. Un hilo lee los
+    comandos del lado maestro y contesta con `responder(comando)` -> [(retardo_s, linea)], igual que
+    SerialSimulado (por defecto las respuestas del sketch, sin demoras). Al crearse deja en el buffer
+    las líneas de `inicio`, como el sketch al arrancar."""
+
+    def __init__(self, responder=None, inicio=(LINEA_ESPERANDO,)):
+        import os
+        import pty
+        import threading
+        import tty
+        self.responder = responder or SerialSimulado._respuesta_sketch
+        self.escritas = []
+        self._maestro, self._esclavo = pty.openpty()
+        tty.setraw(self._esclavo) # Sin eco ni traducción de fines de línea, como un puerto serial
+        self.puerto = os.ttyname(self._esclavo)
+        self._abierto = True
+        for linea in inicio:
+            os.write(self._maestro, (linea + "\r\n").encode('utf-8'))
+        self._hilo = threading.Thread(target=self._atender, name=f"pty {self.puerto}", daemon=True)
+        self._hilo.start()
+
+    def _atender(self):
+        import os
+        entrada = b""
+        while self._abierto:
+            try:
+                entrada += os.read(self._maestro, 4096)
+            except OSError: # Se cerró el pty
+                return
+            while b"\n" in entrada:
+                linea, entrada = entrada.split(b"\n", 1)
+                comando = linea.decode('utf-8', errors='ignore').strip()
+                if not comando: continue
+                self.escritas.append(comando)
+                recibido = time.monotonic()
+                for retardo_s, respuesta in self.responder(comando):
+                    espera = recibido + retardo_s - time.monotonic()
+                    if espera > 0: time.sleep(espera)
+                    try:
+                        os.write(self._maestro, (respuesta + "\r\n").encode('utf-8'))
+                    except OSError:
+                        return
+
+    def cerrar(self):
+        import os
+        if not self._abierto: return
+        self._abierto = False
+        os.close(self._esclavo)
+        os.close(self._maestro)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+if __name__ == "__main__":
+    arduino_conn = None
+    try:
+        # Cambia PUERTO_POR_DEFECTO si tu Arduino está en otro puerto
+        arduino_conn = abrir_conexion(PUERTO_POR_DEFECTO)
     except serial.SerialException as e:
         print(f"Error al conectar con Arduino: {e}")
         exit()
@@ -0,0 +1,251 @@
+"""Envío de rutas a varios robots a la vez desde un mismo equipo.
+
+GestorConexiones mantiene un pool de conexiones seriales, una por puerto: cada una se abre una sola
+vez (con la espera de reinicio del Arduino, ESPERA_REINICIO_S) y queda abierta para los comandos
+siguientes. Despachador manda los comandos desde hilos de trabajo (pyserial es bloqueante y cada hilo
+pasa casi todo el tiempo esperando al robot), así que varios robots ejecutan sus rutas en paralelo;
+los comandos a un mismo robot se serializan con el candado de su conexión. El feedback de cada robot
+se entrega por separado a `al_recibir_linea(puerto, linea)` y queda en el resultado de su envío.
+
+Si un comando se queda sin confirmación ('tiempo_agotado'), el robot puede seguir moviéndose e
+imprimiendo: antes del siguiente comando a ese robot se lee lo que quedaba hasta LINEA_ESPERANDO, y si
+no llega se reabre la conexión (lo que reinicia el Arduino).
+
+Las conexiones las crea `abrir(puerto)`, por defecto path_sender.abrir_conexion; con
+arduino_emulator.EmuladorPty o path_sender.DispositivoPty se puede probar todo sin hardware. Uso desde
+la línea de comandos:
+    python robot_dispatcher.py /dev/ttyUSB0=!SF2RFLF /dev/ttyUSB1=!E
+    python robot_dispatcher.py --streaming /dev/ttyUSB0=F2RFLF /dev/ttyUSB1=FFLF
+    python robot_dispatcher.py --pty robot1=!SF2RFLF robot2=FFLF   # Arduinos emulados en pseudo-terminales
+    python robot_dispatcher.py --pty --tiempo-limite 0.1 r1=F20 r1=!SRLR   # tiempo agotado y comando siguiente
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import sys
+import threading
+import time
+
+from path_sender import (BAUDIOS, ESPERA_REINICIO_S, LINEA_ESPERANDO, abrir_conexion, enviar_instrucciones,
+                         enviar_instrucciones_streaming, leer_respuestas_arduino, tiempo_limite_para)
+
+_candado_salida = threading.Lock()
+
+
+def _imprimir(mensaje):
+    """print que no mezcla líneas de distintos hilos."""
+    with _candado_salida:
+        print(mensaje, flush=True)
+
+
+class _Conexion:
+    __slots__ = ("puerto", "serial", "candado", "envios", "pendiente_s")
+
+    def __init__(self, puerto):
+        self.puerto = puerto
+        self.serial = None
+        self.candado = threading.Lock() # Un comando a la vez por robot (y una sola apertura)
+        self.envios = 0
+        self.pendiente_s = None # Tiempo para terminar de leer un comando que quedó sin confirmación
+
+
+class GestorConexiones:
+    """Pool de conexiones seriales por puerto, seguro entre hilos.
+
+    `usar(puerto)` es un context manager que abre la conexión la primera vez (o si se cayó) y la
+    devuelve con uso exclusivo; al salir queda abierta para el siguiente. Si durante el uso salta
+    una excepción, la conexión se cierra y se descarta para que el próximo uso la reabra. Si quien
+    la usó llamó a marcar_pendiente, el próximo uso primero lee (y pasa a `registrar`) la salida que
+    quedaba hasta LINEA_ESPERANDO, y si no llega a tiempo la reabre. Abrir puertos distintos no se
+    bloquea entre sí: las esperas de reinicio de varios robots se solapan."""
+
+    def __init__(self, abrir=None, baudios=BAUDIOS, espera_reinicio_s=ESPERA_REINICIO_S, registrar=_imprimir):
+        if abrir is None:
+            abrir = lambda puerto: abrir_conexion(puerto, baudios, espera_reinicio_s,
+                                                  registrar=lambda mensaje: registrar(f"[{puerto}] {mensaje}"))
+        self._abrir = abrir
+        self._registrar = registrar
+        self._conexiones = {}
+        self._candado = threading.Lock() # Solo protege el dict, no las aperturas
+
+    def _entrada(self, puerto):
+        with self._candado:
+            conexion = self._conexiones.get(puerto)
+            if conexion is None:
+                conexion = self._conexiones[puerto] = _Conexion(puerto)
+            return conexion
+
+    @contextlib.contextmanager
+    def usar(self, puerto):
+        conexion = self._entrada(puerto)
+        with conexion.candado:
+            if conexion.pendiente_s is not None and conexion.serial is not None and conexion.serial.isOpen():
+                self._vaciar(conexion)
+            if conexion.serial is None or not conexion.serial.isOpen():
+                conexion.pendiente_s = None
+                conexion.serial = self._abrir(puerto)
+            try:
+                yield conexion.serial
+            except BaseException:
+                self._descartar(conexion)
+                raise
+            finally:
+                conexion.envios += 1
+
+    def marcar_pendiente(self, puerto, tiempo_limite_s):
+        """Avisa que el último comando en `puerto` terminó sin LINEA_ESPERANDO: el robot puede seguir
+        ejecutándolo hasta `tiempo_limite_s` más. Se llama desde dentro de usar(puerto)."""
+        self._entrada(puerto).pendiente_s = tiempo_limite_s
+
+    def _vaciar(self, conexion):
+        """Lee la salida que quedaba del comando anterior; si no termina, descarta la conexión."""
+        for linea in leer_respuestas_arduino(conexion.serial, conexion.pendiente_s):
+            self._registrar(f"[{conexion.puerto}] Arduino (comando anterior): {linea}")
+            if linea == LINEA_ESPERANDO: conexion.pendiente_s = None
+        if conexion.pendiente_s is not None:
+            self._registrar(f"[{conexion.puerto}] El comando anterior no terminó; se reabre la conexión.")
+            self._descartar(conexion)
+
+    @staticmethod
+    def _descartar(conexion):
+        serial_abierto, conexion.serial = conexion.serial, None
+        if serial_abierto is not None:
+            try:
+                serial_abierto.close()
+            except Exception:
+                pass
+
+    def abiertas(self):
+        """Puertos con una conexión abierta en este momento."""
+        with self._candado:
+            conexiones = list(self._conexiones.values())
+        return [c.puerto for c in conexiones if c.serial is not None and c.serial.isOpen()]
+
+    def cerrar(self, puerto):
+        """Cierra la conexión de `puerto` (espera a que termine el comando en curso, si lo hay)."""
+        with self._candado:
+            conexion = self._conexiones.pop(puerto, None)
+        if conexion is not None:
+            with conexion.candado:
+                self._descartar(conexion)
+
+    def cerrar_todas(self):
+        with self._candado:
+            puertos = list(self._conexiones)
+        for puerto in puertos:
+            self.cerrar(puerto)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar_todas()
+
+
+class Despachador:
+    """Manda comandos a varios robots en paralelo sobre un GestorConexiones.
+
+    `enviar(puerto, instrucciones)` devuelve un Future con el resultado; `despachar({puerto:
+    instrucciones})` los manda todos y espera. Con `streaming` las rutas van por !T (sin !S delante)
+    en lugar de como un solo comando. Cada resultado es un dict con "puerto", "instrucciones",
+    "estado" ('completado', 'error' o 'tiempo_agotado' como enviar_instrucciones), "lineas" (el
+    feedback del robot) y "duracion_s"; si la conexión falla, "estado" es 'error' y "error" el
+    mensaje. Por defecto el feedback se imprime con el puerto delante. `tiempo_limite_s` reemplaza
+    el tiempo de espera estimado de cada comando (tiempo_limite_para)."""
+
+    def __init__(self, gestor=None, max_hilos=None, al_recibir_linea=None, registrar=_imprimir, tiempo_limite_s=None):
+        self.gestor = gestor if gestor is not None else GestorConexiones(registrar=registrar)
+        self.registrar = registrar
+        self.tiempo_limite_s = tiempo_limite_s
+        self.al_recibir_linea = al_recibir_linea or (lambda puerto, linea: registrar(f"[{puerto}] Arduino: {linea}"))
+        self._ejecutor = concurrent.futures.ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="robot")
+
+    def _enviar(self, puerto, instrucciones, streaming):
+        lineas = []
+        def al_recibir(linea):
+            lineas.append(linea)
+            self.al_recibir_linea(puerto, linea)
+        registrar = lambda mensaje: self.registrar(f"[{puerto}] {mensaje}")
+        inicio = time.perf_counter()
+        resultado = {"puerto": puerto, "instrucciones": instrucciones}
+        try:
+            with self.gestor.usar(puerto) as conexion:
+                enviar = enviar_instrucciones_streaming if streaming else enviar_instrucciones
+                estado = enviar(conexion, instrucciones, al_recibir, registrar=registrar, tiempo_limite_s=self.tiempo_limite_s)
+                if estado == 'tiempo_agotado': # Lo que siga imprimiendo el robot no es del próximo comando
+                    self.gestor.marcar_pendiente(puerto, tiempo_limite_para(instrucciones))
+        except Exception as e: # serial.SerialException y los OSError de un puerto que desaparece
+            registrar(f"Error de conexión: {e}")
+            estado = 'error'
+            resultado["error"] = str(e)
+        resultado.update(estado=estado, lineas=lineas, duracion_s=round(time.perf_counter() - inicio, 3))
+        return resultado
+
+    def enviar(self, puerto, instrucciones, streaming=False):
+        return self._ejecutor.submit(self._enviar, puerto, instrucciones, streaming)
+
+    def despachar(self, rutas, streaming=False):
+        """Manda cada ruta de `rutas` ({puerto: instrucciones}) a su robot a la vez y devuelve
+        {puerto: resultado} cuando terminaron todos."""
+        futuros = {puerto: self.enviar(puerto, instrucciones, streaming) for puerto, instrucciones in rutas.items()}
+        return {puerto: futuro.result() for puerto, futuro in futuros.items()}
+
+    def cerrar(self):
+        """Espera los envíos pendientes y cierra todas las conexiones."""
+        self._ejecutor.shutdown(wait=True)
+        self.gestor.cerrar_todas()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def _par_envio(texto):
+    puerto, separador, instrucciones = texto.partition("=")
+    if not separador or not puerto or not instrucciones:
+        raise argparse.ArgumentTypeError(f"se esperaba PUERTO=INSTRUCCIONES, no '{texto}'")
+    return puerto, instrucciones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Envía rutas a varios robots a la vez, cada uno por su puerto serial.")
+    parser.add_argument("envios", nargs="+", type=_par_envio, metavar="PUERTO=INSTRUCCIONES",
+                        help="Comando para cada robot (ej. /dev/ttyUSB0=!SF2RFLF); un mismo puerto puede repetirse")
+    parser.add_argument("--streaming", action="store_true", help="Mandar las rutas por streaming (!T)")
+    parser.add_argument("--espera-reinicio", type=float, default=ESPERA_REINICIO_S,
+                        help=f"Segundos de espera tras abrir cada puerto (por defecto {ESPERA_REINICIO_S:g})")
+    parser.add_argument("--tiempo-limite", type=float, default=None,
+                        help="Segundos de espera por comando (por defecto se estiman a partir de la ruta)")
+    parser.add_argument("--pty", action="store_true",
+                        help="Usar un Arduino emulado (arduino_emulator) en un pseudo-terminal por cada PUERTO, que pasa a ser solo un nombre")
+    parser.add_argument("--escala", type=float, default=0.01, help="Escala de tiempo de los Arduinos emulados con --pty (por defecto 0.01)")
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as pila:
+        # El pool y los resultados usan los nombres del usuario; con --pty cada nombre lleva a su /dev/pts/N
+        puertos = {}
+        for nombre, _ in args.envios:
+            if nombre not in puertos:
+                if args.pty:
+                    from arduino_emulator import EmuladorPty
+                    puertos[nombre] = pila.enter_context(EmuladorPty(args.escala)).puerto
+                else:
+                    puertos[nombre] = nombre
+        abrir = lambda nombre: abrir_conexion(puertos[nombre], espera_reinicio_s=args.espera_reinicio,
+                                              registrar=lambda mensaje: _imprimir(f"[{nombre}] {mensaje}"))
+        gestor = pila.enter_context(GestorConexiones(abrir))
+        despachador = pila.enter_context(Despachador(gestor, max_hilos=len(puertos), tiempo_limite_s=args.tiempo_limite))
+        futuros = [despachador.enviar(nombre, instrucciones, args.streaming) for nombre, instrucciones in args.envios]
+        resultados = [futuro.result() for futuro in futuros]
+
+    print("\n--- RESUMEN ---")
+    for resultado in resultados:
+        print(f"{resultado['puerto']}: {resultado['instrucciones']} -> {resultado['estado']} en {resultado['duracion_s']:.3f} s"
+              + (f" ({resultado['error']})" if "error" in resultado else ""))
+    return 0 if all(r["estado"] == 'completado' for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
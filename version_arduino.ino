@@ -19,10 +19,24 @@ const int PAUSA_ENTRE_COMANDOS = 200;  // Pausa entre la finalización de un com
 const int EEPROM_ADDR_FLAG = 0;          // Dirección para el flag de validez ('V')
 const int EEPROM_ADDR_LENGTH = 1;        // Dirección para guardar la longitud de la cadena
 const int EEPROM_ADDR_STRING_START = 2;  // Dirección donde comienza la cadena de comandos
-const int MAX_COMMAND_LENGTH = 50;       // Longitud máxima de la cadena de comandos a guardar en EEPROM
+const int MAX_COMMAND_LENGTH = 50;       // Longitud máxima de la cadena de comandos a guardar en EEPROM (en formato RLE si viene comprimida)
 
 String comandosParaEjecutarRAM = ""; // Variable para almacenar comandos temporalmente si es necesario
 
+// Modo streaming ('!T'): la ruta llega en fragmentos y se ejecuta desde un buffer circular de tamaño fijo.
+// El control de flujo es por créditos: al entrar se anuncian TAMANO_BUFFER_STREAM créditos (un comando
+// cada uno) y se devuelven con "CREDITO n" a medida que se ejecutan, así el Python nunca manda más de
+// lo que cabe y la ruta puede ser de cualquier longitud.
+const int TAMANO_BUFFER_STREAM = 32;   // Debe ser menor que el buffer de recepción Serial (64 bytes en AVR)
+const int LOTE_CREDITOS = 8;           // Cada cuántos comandos ejecutados se devuelven créditos
+char bufferStream[TAMANO_BUFFER_STREAM];
+int inicioStream = 0;                  // Posición del próximo comando a ejecutar
+int cantidadStream = 0;                // Comandos en el buffer pendientes de ejecutar
+int creditosPorDevolver = 0;
+bool modoStream = false;
+bool finStreamRecibido = false;        // Ya llegó el '.' que cierra la ruta
+bool primerComandoStream = true;
+
 // --- Funciones de Control de Motores ---
 void moverAdelante(int velocidad) {
     digitalWrite(IN1, LOW); digitalWrite(IN2, HIGH); analogWrite(ENA, velocidad);
@@ -48,46 +62,120 @@ void detenerMotores() {
     Serial.println("Motores Detenidos");
 }
 
+// --- Función para Ejecutar un Comando Individual ---
+void ejecutarComando(char instruccion) {
+    Serial.print("Procesando: "); Serial.println(instruccion);
+
+    switch (instruccion) {
+        case 'F':
+            moverAdelante(VELOCIDAD_AVANCE);
+            delay(TIEMPO_AVANCE_F);
+            detenerMotores();
+            break;
+        case 'R':
+            girarDerecha(VELOCIDAD_GIRO);
+            delay(TIEMPO_GIRO_90_GRADOS);
+            detenerMotores();
+            break;
+        case 'L':
+            girarIzquierda(VELOCIDAD_GIRO);
+            delay(TIEMPO_GIRO_90_GRADOS);
+            detenerMotores();
+            break;
+        default:
+            Serial.print("Instruccion desconocida: '"); Serial.print(instruccion); Serial.println("'");
+            break;
+    }
+}
+
 // --- Función para Ejecutar la Secuencia de Instrucciones ---
+// Acepta el formato RLE que genera comprimir_instrucciones en Python: cada comando puede ir seguido
+// de un número de repeticiones (ej: F4RF2 = FFFFRFF). Sin número se ejecuta una vez, así que las
+// secuencias sin comprimir siguen funcionando igual.
 void ejecutarInstrucciones(String instrucciones) {
     if (instrucciones.length() == 0) {
         Serial.println("No hay instrucciones para ejecutar.");
         return;
     }
     Serial.print("Ejecutando secuencia: "); Serial.println(instrucciones);
-    for (int i = 0; i < instrucciones.length(); i++) {
-        char instruccion = instrucciones.charAt(i);
-        Serial.print("Procesando: "); Serial.println(instruccion);
-
-        switch (instruccion) {
-            case 'F':
-                moverAdelante(VELOCIDAD_AVANCE);
-                delay(TIEMPO_AVANCE_F);
-                detenerMotores();
-                break;
-            case 'R':
-                girarDerecha(VELOCIDAD_GIRO);
-                delay(TIEMPO_GIRO_90_GRADOS);
-                detenerMotores();
-                break;
-            case 'L':
-                girarIzquierda(VELOCIDAD_GIRO);
-                delay(TIEMPO_GIRO_90_GRADOS);
-                detenerMotores();
-                break;
-            default:
-                Serial.print("Instruccion desconocida: '"); Serial.print(instruccion); Serial.println("'");
-                break;
+    bool primerComando = true;
+    int i = 0;
+    while (i < instrucciones.length()) {
+        char instruccion = instrucciones.charAt(i++);
+        int repeticiones = 0;
+        while (i < instrucciones.length() && isDigit(instrucciones.charAt(i))) {
+            repeticiones = repeticiones * 10 + (instrucciones.charAt(i) - '0');
+            i++;
         }
-        
-        // Pausa entre comandos, excepto después del último
-        if (i < instrucciones.length() - 1) {
-             delay(PAUSA_ENTRE_COMANDOS);
+        if (repeticiones == 0) repeticiones = 1;
+
+        for (int r = 0; r < repeticiones; r++) {
+            // Pausa entre comandos, excepto antes del primero (equivale a no pausar después del último)
+            if (!primerComando) {
+                delay(PAUSA_ENTRE_COMANDOS);
+            }
+            primerComando = false;
+            ejecutarComando(instruccion);
         }
     }
     Serial.println("Secuencia de instrucciones completada.");
 }
 
+// --- Funciones del Modo Streaming ---
+void iniciarStream() {
+    modoStream = true;
+    finStreamRecibido = false;
+    primerComandoStream = true;
+    inicioStream = 0;
+    cantidadStream = 0;
+    creditosPorDevolver = 0;
+    Serial.print("CREDITO "); Serial.println(TAMANO_BUFFER_STREAM);
+}
+
+void devolverCreditos() {
+    Serial.print("CREDITO "); Serial.println(creditosPorDevolver);
+    creditosPorDevolver = 0;
+}
+
+// Pasa al buffer circular lo que haya llegado por Serial. Los fragmentos vienen como ">FFRF\n";
+// '>' y los saltos de línea se ignoran y '.' marca el final de la ruta. Solo se lee mientras haya
+// espacio: lo demás espera en el buffer de recepción del Serial.
+void recibirStream() {
+    while (!finStreamRecibido && cantidadStream < TAMANO_BUFFER_STREAM && Serial.available() > 0) {
+        char c = Serial.read();
+        if (c == '.') {
+            finStreamRecibido = true;
+        } else if (c == 'F' || c == 'R' || c == 'L') {
+            bufferStream[(inicioStream + cantidadStream) % TAMANO_BUFFER_STREAM] = c;
+            cantidadStream++;
+        }
+    }
+}
+
+// Un paso del modo streaming: ejecuta como mucho un comando y vuelve al loop.
+void atenderStream() {
+    recibirStream();
+    if (cantidadStream > 0) {
+        char instruccion = bufferStream[inicioStream];
+        inicioStream = (inicioStream + 1) % TAMANO_BUFFER_STREAM;
+        cantidadStream--;
+        if (!primerComandoStream) {
+            delay(PAUSA_ENTRE_COMANDOS);
+        }
+        primerComandoStream = false;
+        ejecutarComando(instruccion);
+        creditosPorDevolver++;
+        // Con el buffer vacío se devuelve todo, para no dejar al Python esperando créditos retenidos
+        if (creditosPorDevolver >= LOTE_CREDITOS || (cantidadStream == 0 && !finStreamRecibido)) {
+            devolverCreditos();
+        }
+    } else if (finStreamRecibido) {
+        modoStream = false;
+        Serial.println("Secuencia de instrucciones completada.");
+        Serial.println("Esperando nuevos comandos por Serial...");
+    }
+}
+
 // --- Funciones para Manejo de EEPROM ---
 void guardarStringEnEEPROM(const String& str) {
     if (str.length() == 0 || str.length() > MAX_COMMAND_LENGTH) {
@@ -147,10 +235,11 @@ void setup() {
     Serial.println("-------------------------------------");
     Serial.println("Sistema de Carrito con EEPROM Iniciado");
     Serial.println("Comandos disponibles por Serial:");
-    Serial.println("  'secuencia' (ej: FFRFLF) -> Ejecutar");
-    Serial.println("  '!Ssecuencia' (ej: !SFFRFLF) -> GUARDAR y ejecutar");
+    Serial.println("  'secuencia' (ej: FFRFLF o F2RFLF) -> Ejecutar");
+    Serial.println("  '!Ssecuencia' (ej: !SF2RFLF) -> GUARDAR y ejecutar");
     Serial.println("  '!E' -> Ejecutar desde EEPROM");
     Serial.println("  '!C' -> Borrar EEPROM");
+    Serial.println("  '!T' -> Modo streaming (fragmentos '>FFRF', fin con '.')");
     Serial.println("-------------------------------------");
 
     // Intentar cargar y ejecutar comandos desde EEPROM al inicio
@@ -171,6 +260,10 @@ void setup() {
 
 // --- Bucle Principal (Loop) ---
 void loop() {
+    if (modoStream) {
+        atenderStream();
+        return;
+    }
     if (Serial.available() > 0) {
         String comandoEntrante = Serial.readStringUntil('\n');
         comandoEntrante.trim(); // Limpiar espacios/newlines
@@ -199,6 +292,10 @@ void loop() {
             } else if (comandoEntrante.equalsIgnoreCase("!C")) { 
                 // Borrar EEPROM
                 borrarComandosEEPROM();
+            } else if (comandoEntrante.equalsIgnoreCase("!T")) {
+                // Recibir la ruta por fragmentos; "Esperando nuevos comandos" se imprime al terminarla
+                iniciarStream();
+                return;
             } else { 
                 // Ejecutar directamente la secuencia recibida (no la guarda permanentemente)
                 comandosParaEjecutarRAM = comandoEntrante;
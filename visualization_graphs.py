@@ -1,70 +1,114 @@
-import queue
-import networkx as nx
-import matplotlib.pyplot as plt
-import time
+import collections
+# networkx and matplotlib are only needed to draw, so they are imported inside the functions that
+# draw: order_bfs and order_dfs work on any graph without them.
 
 def order_bfs(graph, start_node):
-    visited = set() # To know which nodes we have already visited
-    q = queue.Queue() # FIFO: First In First Out
-    q.put(start_node) 
+    visited = {start_node} # To know which nodes we have already visited (or queued)
+    q = collections.deque([start_node]) # FIFO: First In First Out
     order = [] # The nodes in the correct order
 
-    while not q.empty():
-        vertex = q.get() # Our vertex will be whatever pops out of 
-        # the queue 
-        if vertex not in visited:
-            order.append(vertex)
-            visited.add(vertex) # To know we already visited it
-            for node in graph[vertex]: # What we do here is that 
-                # for each vertex, we visit the neighboring nodes in
-                # the graph, and add them to the queue by the 
-                # command 'q.put(node)' to be processed in the next
-                # iteration of the loop. 
-                if node not in visited:
-                    q.put(node)
+    while q:
+        vertex = q.popleft() # Our vertex will be whatever pops out of
+        # the queue
+        order.append(vertex)
+        for node in graph[vertex]: # What we do here is that
+            # for each vertex, we visit the neighboring nodes in
+            # the graph, and add them to the queue to be processed
+            # in the next iterations of the loop.
+            if node not in visited:
+                # We mark the node when it enters the queue instead of when it leaves: the order is
+                # the same (a node leaves the queue in the order it first entered), but each node is
+                # queued only once, so the queue never holds more than the number of nodes.
+                visited.add(node)
+                q.append(node)
     return order
 
 def order_dfs(graph, start_node, visited = None):
     if visited is None:
         visited = set()
+    if start_node in visited:
+        return []
 
-    # In this algorithm we use recursion because we have a repeated
-    # task that can be done on progressively smaller parts of the 
-    # problem until it reaches an "end" condition. 
-    order = []
-
-    if start_node not in visited:
-        order.append(start_node)
-        visited.add(start_node)
-        for node in graph[start_node]:
+    # This is the same traversal as the recursive version (go as deep as possible through the first
+    # unvisited neighbor, and when a branch is exhausted come back to the last intersection), but the
+    # "call stack" is an explicit list. Each entry is an iterator over the neighbors of a node on the
+    # current branch, so coming back to an intersection just resumes its iterator where it stopped.
+    # There is no recursion limit and every node is appended once to a single 'order' list, so it
+    # works on graphs with millions of nodes.
+    order = [start_node]
+    visited.add(start_node)
+    stack = [iter(graph[start_node])]
+    while stack:
+        for node in stack[-1]:
             if node not in visited:
-                order.extend(order_dfs(graph, node, visited))
-
-    # Basically we start with the whole graph, we move, and create 
-    # a new subgraph that doesn't contain the node we started with, 
-    # repeating this logic over and over again, until it has moved
-    # through the whole "path" of a branch of the node. Once it has 
-    # done that, it goes "up" in the sense that it comes back to the
-    # last intersection there was, and explores another path, 
-    # effectively "bubbling up" the 'order' variable. 
+                order.append(node)
+                visited.add(node)
+                stack.append(iter(graph[node])) # Go one level deeper
+                break
+        else:
+            stack.pop() # Every neighbor was visited: go back "up" to the previous intersection
     return order
 
-def visualize_search(order, title, G, pos):
-    plt.figure()
-    plt.title(title)
-    for i, node in enumerate(order, start=1):
-        plt.clf()
-        # 'clf' stands for "clear figure". 
-        plt.title(title)
-        nx.draw(G, pos, with_labels = True, node_color=['red' if n == node else 'green' for n in G.nodes])
-        # This creates a sense of animation in which the current node is the red one while all the others
-        # remain green. 
-        plt.draw()
-        plt.pause(1.5)
-    plt.show()
-    time.sleep(0.5)
+# Colors of the animation: nodes not reached yet, the ones being visited in the current frame and the
+# ones already visited.
+COLOR_UNVISITED = 'green'
+COLOR_CURRENT = 'red'
+COLOR_VISITED = 'tab:blue'
+
+def visualize_search(order, title, G, pos, interval_ms=1500, nodes_per_frame=1, output=None, fps=None, with_labels=None):
+    """Animates a traversal order over G: the nodes of the current frame are red, the ones already
+    visited are blue and the rest remain green.
+
+    The graph is drawn only once; each frame just changes the colors of the node collection, so a frame
+    costs the same no matter how big the drawing is. `nodes_per_frame` visits several nodes per frame
+    for big graphs. With `output` ('.gif' with Pillow, anything else such as '.mp4' with ffmpeg) the
+    animation is rendered offline on an Agg canvas, without windows or real-time pauses, and saved
+    there; otherwise it is shown with plt.show(). Returns the FuncAnimation."""
+    import matplotlib.animation as animation
+    import networkx as nx
+    import numpy as np
+    from matplotlib.colors import to_rgba
+
+    if output is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure()
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure()
+        FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_title(title)
+    ax.set_axis_off()
+
+    nodes = list(G.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    colors = np.tile(to_rgba(COLOR_UNVISITED), (len(nodes), 1))
+    nx.draw_networkx_edges(G, pos, ax=ax)
+    collection = nx.draw_networkx_nodes(G, pos, ax=ax, nodelist=nodes, node_color=colors)
+    if with_labels is None: with_labels = len(nodes) <= 100 # Labels are unreadable (and slow) on big graphs
+    if with_labels: nx.draw_networkx_labels(G, pos, ax=ax)
+    current = [] # Indexes of the nodes painted as current in the previous frame
+
+    def update(start):
+        colors[current] = to_rgba(COLOR_VISITED)
+        current[:] = [index[node] for node in order[start:start + nodes_per_frame]]
+        colors[current] = to_rgba(COLOR_CURRENT)
+        collection.set_facecolor(colors)
+        return (collection,)
+
+    anim = animation.FuncAnimation(fig, update, frames=range(0, len(order), nodes_per_frame), interval=interval_ms,
+                                   repeat=False, blit=output is None, init_func=lambda: (collection,))
+    if output is None:
+        plt.show()
+    else:
+        fps = fps or 1000.0 / interval_ms
+        writer = animation.PillowWriter(fps=fps) if output.lower().endswith('.gif') else animation.FFMpegWriter(fps=fps)
+        anim.save(output, writer=writer)
+    return anim
 
 def generate_connected_random_graph(n, m):
+    import networkx as nx
     while True:
         G = nx.gnm_random_graph(n,m)
         if nx.is_connected(G):
@@ -72,14 +116,17 @@ def generate_connected_random_graph(n, m):
 
 
 # --- Examples ---
+if __name__ == "__main__":
+    import networkx as nx
 
-#G = nx.Graph()
-G = generate_connected_random_graph(20,30)
-#G.add_edges_from([('A', 'B'), ('A', 'C'), ('B', 'D'), ('B','E'), ('C','F'), ('C','G')])
-pos = nx.spring_layout(G)
+    #G = nx.Graph()
+    G = generate_connected_random_graph(20,30)
+    #G.add_edges_from([('A', 'B'), ('A', 'C'), ('B', 'D'), ('B','E'), ('C','F'), ('C','G')])
+    pos = nx.spring_layout(G)
 
-#visualize_search(order_bfs(G, start_node='A'), title="BFS Visualization", G=G, pos=pos)
-#visualize_search(order_dfs(G, start_node='A'), title="DFS Visualization", G=G, pos=pos)
+    #visualize_search(order_bfs(G, start_node='A'), title="BFS Visualization", G=G, pos=pos)
+    #visualize_search(order_dfs(G, start_node='A'), title="DFS Visualization", G=G, pos=pos)
 
-#visualize_search(order_bfs(G, start_node=0), title="BFS Visualization", G=G, pos=pos)
-visualize_search(order_dfs(G, start_node=0), title="DFS Visualization", G=G, pos=pos)
+    #visualize_search(order_bfs(G, start_node=0), title="BFS Visualization", G=G, pos=pos)
+    #visualize_search(order_dfs(G, start_node=0), title="DFS Visualization", G=G, pos=pos, output="dfs.gif") # Offline, no window
+    visualize_search(order_dfs(G, start_node=0), title="DFS Visualization", G=G, pos=pos)